@@ -1,9 +1,17 @@
 from .config import SimConfig
-from .data_io import load_projections, load_leverage, load_percentiles, merge_inputs
+from .data_io import (load_projections, load_leverage, load_percentiles, merge_inputs,
+                      load_dk_salaries, ingest, IngestReport, save_snapshot, load_snapshot)
 from .percentiles import QuantileSampler
 from .correlation import build_correlation
-from .lineup import Lineup, is_valid_lineup, apply_cpt_salary, validate_player_pool
+from .factor import FactorCorrelation, factor_loadings
+from .sampling import CopulaSampler
+from .stats_sim import StatSampler
+from .lineup import Lineup, LineupMatrix, is_valid_lineup, apply_cpt_salary, validate_player_pool
 from .generator import CandidateGenerator
 from .opponent import OpponentField
 from .ev import EVSimulator
+from .incremental import IncrementalEV
 from .portfolio import PortfolioOptimizer
+from .batch import Slate, Contest, load_manifest, run_batch
+from .instrument import Instrument
+from .service import WarmSlate, LineupService, ServiceClient
@@ -0,0 +1,195 @@
+import json
+import os
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field, replace
+
+import numpy as np
+import pandas as pd
+
+from .config import SimConfig
+from .correlation import build_correlation
+from .generator import CandidateGenerator
+from .opponent import OpponentField
+from .ev import EVSimulator, SimScores, _field_top, _payouts
+from .payouts import contest_prizes, prize_curve
+from .sketch import sketch_payouts
+from .portfolio import PortfolioOptimizer
+from .run_example import load_players
+
+# SimConfig fields a contest may override. Everything else (sims, seed, correlation,
+# candidates) belongs to the slate, whose simulation every one of its contests shares.
+CONTEST_FIELDS = ('field_size', 'our_entries', 'prize_first', 'payouts', 'dup_penalty', 'max_overlap',
+                  'enforce_unique_cpt', 'select_sims', 'field_model', 'field_portfolio_size',
+                  'field_noise_sd', 'field_sketch', 'sketch_z', 'sketch_pilot')
+
+@dataclass
+class Contest:
+    name: str
+    overrides: dict = field(default_factory=dict)    # CONTEST_FIELDS -> value
+
+@dataclass
+class Slate:
+    name: str
+    proj_csv: str
+    lev_csv: str
+    pct_csv: str
+    dk_csv: str = None
+    snapshot: str = None                             # see run_example.load_players
+    config: dict = field(default_factory=dict)       # slate-wide SimConfig overrides
+    contests: list = field(default_factory=list)     # [Contest]; empty = one contest on the slate config
+
+def _resolve_path(base: str, path):
+    if not path or '://' in path or os.path.isabs(path):
+        return path
+    return os.path.join(base, path)
+
+def load_manifest(path: str) -> list:
+    """JSON manifest -> [Slate]; relative paths resolve against the manifest's directory.
+
+    {"slates": [{"name": "MIN@CHI", "proj": "...", "lev": "...", "pct": "...", "dk": "...",
+                 "snapshot": "min_chi.npz", "config": {"n_sims": 10000},
+                 "contests": [{"name": "milly", "field_size": 100000, "payouts": [[1, 1, 1e6], ...]}]}]}
+    """
+    with open(path) as f:
+        spec = json.load(f)
+    base = os.path.dirname(os.path.abspath(path))
+    slates = []
+    for s in spec['slates']:
+        contests = []
+        for c in s.get('contests', []):
+            c = dict(c)
+            name = c.pop('name')
+            if 'payouts' in c:
+                c['payouts'] = tuple(tuple(row) for row in c['payouts'])
+            contests.append(Contest(name, c))
+        slates.append(Slate(s['name'], *(_resolve_path(base, s.get(k)) for k in ('proj', 'lev', 'pct', 'dk', 'snapshot')),
+                            config=s.get('config', {}), contests=contests))
+    return slates
+
+def _contest_cfg(cfg, contest: Contest):
+    bad = sorted(set(contest.overrides) - set(CONTEST_FIELDS))
+    if bad:
+        raise ValueError(f"Contest {contest.name!r} cannot override slate-wide settings: {bad}")
+    return replace(cfg, **contest.overrides)
+
+def _resolver(sim, ours, field_lineups, dups, cfg, rng):
+    # -> (lineups to score each sim, payouts(our_scores, their_scores)) for one contest
+    if cfg.field_sketch > 0:
+        sketch = sim.field_sketch(field_lineups, rng, cfg)
+        contest = sim._contest(ours, sketch.lineups, dups, cfg)
+        prize_cum = contest['prize_cum'] if contest['prize_cum'] is not None else prize_curve(((1, 1, contest['prize']),))
+        return sketch.lineups, lambda o, f: sketch_payouts(o, f, sketch, prize_cum, contest['dup_adjust'], cfg.sketch_z)[0]
+    contest = sim._contest(ours, field_lineups, dups, cfg)
+    return field_lineups, lambda o, f: _payouts(o, f, **contest)
+
+def shared_expected_values(sim, ours, resolvers, n_sims: int) -> list:
+    """EV accumulators for `ours` in several contests from one simulation.
+
+    Each block of points is drawn and our lineups scored once; every contest then scores only
+    its own field and resolves its own payouts. -> [RunningEV] in `resolvers` order.
+    """
+    accs = [sim._accumulator(ours) for _ in resolvers]
+    for pts in sim.iter_sim_blocks(n_sims):
+        our_scores = ours.scores(pts)
+        for (lineups, pay), acc in zip(resolvers, accs):
+            acc.update(pay(our_scores, lineups.scores(pts)), our_scores)
+    return accs
+
+def shared_selection_sims(sim, ours, fields: list, n_sims: list, prizes: list) -> list:
+    # SimScores per contest from one draw of max(n_sims) sims; contest k uses the first n_sims[k]
+    # (the same sims a lone run would draw, since blocks continue one RNG stream)
+    n = max(n_sims)
+    our_scores = np.empty((n, len(ours)), dtype=sim.sampler.dtype)
+    field_max = [np.full(n, -np.inf) for _ in fields]
+    field_ties = [np.zeros(n) for _ in fields]
+    counts = [f.multiplicity().astype(float) for f in fields]
+    start = 0
+    for pts in sim.iter_sim_blocks(n):
+        stop = start + len(pts)
+        our_scores[start:stop] = ours.scores(pts)
+        for k, f in enumerate(fields):
+            if len(f):
+                field_max[k][start:stop], field_ties[k][start:stop] = _field_top(f.scores(pts), counts[k])
+        start = stop
+    return [SimScores(our_scores[:m], field_max[k][:m], field_ties[k][:m], prizes[k], ours.match_counts(fields[k]))
+            for k, m in enumerate(n_sims)]
+
+def run_slate(slate: Slate, cfg: SimConfig = None, top_n: int = 20):
+    # one slate, all of its contests -> (chosen, top) with Slate / Contest columns
+    cfg = replace(cfg or SimConfig(), **slate.config)
+    cfg = replace(cfg, n_workers=1)   # parallelism is across slates (run_batch)
+    players, report = load_players(slate.proj_csv, slate.lev_csv, slate.pct_csv, slate.dk_csv, slate.snapshot)
+    if report is not None and not report.ok():
+        warnings.warn(f"[{slate.name}]\n{report.summary()}", stacklevel=2)
+
+    C = build_correlation(players, cfg)
+    sim = EVSimulator(players, C, cfg)
+    sketch_rng = np.random.default_rng(cfg.rng_seed + 11)   # own stream: sketches never shift the shared sims
+
+    contests = slate.contests or [Contest('default')]
+    cfgs = [_contest_cfg(cfg, c) for c in contests]
+    banks, fields, opps = {}, [], []
+    for ccfg in cfgs:
+        opp = OpponentField(players, ccfg)
+        # a fresh OpponentField with the same settings rebuilds the same bank, so share it
+        bank_key = (ccfg.field_model, ccfg.field_portfolio_size, ccfg.field_noise_sd)
+        if bank_key not in banks:
+            banks[bank_key] = opp.bank_field_lineups()
+        n_field = ccfg.field_size - ccfg.our_entries
+        fields.append(opp.sample_field_entries(banks[bank_key], n_entries=n_field))
+        opps.append((opp, banks[bank_key], n_field))
+
+    # one candidate set per slate; candidate_mode="search" optimizes for the first contest
+    gen = CandidateGenerator(players, cfgs[0])
+    cands = gen.search(sim, fields[0]) if cfg.candidate_mode == "search" else gen.generate()
+    dups = [opp.expected_duplicates(cands, bank, n_field) for opp, bank, n_field in opps]
+
+    resolvers = [_resolver(sim, cands, f, d, c, sketch_rng) for f, d, c in zip(fields, dups, cfgs)]
+    accs = shared_expected_values(sim, cands, resolvers, cfg.n_sims)
+
+    # joint selection (winner-take-all only), on sims drawn after the EV pass as in run()
+    joint = [k for k, c in enumerate(cfgs) if c.select_sims > 0 and contest_prizes(c)[1] is None]
+    sims = [None] * len(cfgs)
+    if joint:
+        shared = shared_selection_sims(sim, cands, [fields[k] for k in joint],
+                                       [cfgs[k].select_sims for k in joint], [contest_prizes(cfgs[k])[0] for k in joint])
+        for k, s in zip(joint, shared):
+            sims[k] = s
+
+    chosen, top = [], []
+    for contest, ccfg, acc, d, s in zip(contests, cfgs, accs, dups, sims):
+        ev = pd.Series(acc.mean(), name='EV')
+        picked = PortfolioOptimizer(ccfg).select(cands, ev, dups=d, sims=s)
+        best = np.argsort(-acc.mean(), kind='stable')[:top_n]
+        t = cands.take(best).to_frame()
+        t['EV'], t['EV_SE'] = acc.mean()[best], acc.se()[best]
+        t.index = pd.Index(best, name='Candidate')
+        for df in (picked, t):
+            df.insert(0, 'Contest', contest.name)
+            df.insert(0, 'Slate', slate.name)
+        chosen.append(picked)
+        top.append(t.reset_index())
+    return pd.concat(chosen, ignore_index=True), pd.concat(top, ignore_index=True)
+
+def run_batch(slates, cfg: SimConfig = None, n_workers: int = None, top_n: int = 20):
+    """Every slate x contest of a manifest (path or [Slate]) -> (chosen, top), one frame each.
+
+    Per slate, player points are simulated once and feed every contest, each with its own field,
+    payout table and portfolio. Contest EVs match run() with the contest's settings and the same
+    seed, since the sims are the same. stream / early stopping and sim_cache_dir are ignored,
+    and field sketches draw from their own stream. Slates are independent and run on a pool of
+    n_workers processes (default cfg.n_workers); results do not depend on the worker count.
+    """
+    if isinstance(slates, str):
+        slates = load_manifest(slates)
+    cfg = cfg or SimConfig()
+    n_workers = max(1, int(n_workers or cfg.n_workers))
+    if n_workers == 1 or len(slates) <= 1:
+        results = [run_slate(s, cfg, top_n) for s in slates]
+    else:
+        with ProcessPoolExecutor(max_workers=min(n_workers, len(slates))) as pool:
+            results = list(pool.map(run_slate, slates, [cfg] * len(slates), [top_n] * len(slates)))
+    chosen = pd.concat([r[0] for r in results], ignore_index=True)
+    top = pd.concat([r[1] for r in results], ignore_index=True)
+    return chosen, top
@@ -0,0 +1,335 @@
+# Stage benchmarks over synthetic slates (and the bundled CSVs), written as JSON for comparison.
+#   python -m showdown.bench --grid quick --out bench_results
+#   python -m showdown.bench --compare bench_results/old.json bench_results/new.json
+#   python -m showdown.bench --variance     (sims each sampling mode needs for a stable top-K)
+#   python -m showdown.bench --sketch       (field_sketch EV vs exact EV, inside the reported band?)
+import argparse
+import itertools
+import json
+import os
+import time
+import tracemalloc
+from dataclasses import replace
+
+import numpy as np
+import pandas as pd
+
+from .config import SimConfig
+from .correlation import build_correlation, _CACHE as _CORR_CACHE
+from .generator import CandidateGenerator
+from .opponent import OpponentField
+from .ev import EVSimulator, _payouts
+from .payouts import contest_prizes, prize_curve, ranked_payouts
+from .sketch import build_field_sketch, sketch_payouts
+from .portfolio import PortfolioOptimizer
+from .synthetic import synthetic_slate
+from .instrument import environment
+
+STAGES = ('correlation', 'field_bank', 'field_sample', 'candidates', 'expected_value', 'selection_sims', 'portfolio')
+
+# (n_players, n_sims, field_size) axes; every combination is one case
+GRIDS = {
+    'quick': dict(n_players=(24, 48), n_sims=(2000,), field_size=(475, 5000)),
+    'full':  dict(n_players=(24, 48, 96), n_sims=(2000, 10000), field_size=(475, 5000, 50000)),
+}
+
+_SLATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..')
+_BUNDLED = ('rts_nfl_sim_projs_DraftKings_9_8_25.csv', 'leverage_proj_9_8_25.csv',
+            'rts-nfl-percentiles-2-DraftKings (1).csv', 'DKSalaries_9_8_25.csv')
+
+def bundled_players(slate_dir: str = _SLATE_DIR):
+    # the repo's own MIN@CHI slate, or None when the CSVs are not next to the package
+    from .data_io import load_projections, load_leverage, load_percentiles, load_dk_salaries, ingest
+    paths = [os.path.join(slate_dir, f) for f in _BUNDLED]
+    if not all(os.path.exists(p) for p in paths):
+        return None
+    proj, lev, pct, dk = paths
+    players, _ = ingest(load_projections(proj), load_leverage(lev), load_percentiles(pct), load_dk_salaries(dk))
+    return players
+
+def _pipeline(players, cfg):
+    # stage name -> callable(state) returning the stage output, run in STAGES order
+    n_field = cfg.field_size - cfg.our_entries
+
+    def candidates(s):
+        gen = CandidateGenerator(players, cfg)
+        if cfg.candidate_mode == "search":
+            return gen.search(EVSimulator(players, s['correlation'], cfg), s['field_sample'])
+        return gen.generate()
+
+    def correlation(s):
+        _CORR_CACHE.clear()   # time the build, not a cache hit
+        return build_correlation(players, cfg)
+
+    def expected_value(s):
+        s['sim'] = EVSimulator(players, s['correlation'], cfg)
+        s['dups'] = OpponentField(players, cfg).expected_duplicates(s['candidates'], s['field_bank'], n_field)
+        return s['sim'].expected_value(s['candidates'], s['field_sample'], our_dups=s['dups'])
+
+    def selection_sims(s):
+        if cfg.select_sims <= 0 or contest_prizes(cfg)[1] is not None:
+            return None
+        return s['sim'].selection_sims(s['candidates'], s['field_sample'])
+
+    return {
+        'correlation': correlation,
+        'field_bank': lambda s: OpponentField(players, cfg).bank_field_lineups(),
+        'field_sample': lambda s: OpponentField(players, cfg).sample_field_entries(s['field_bank'], n_field),
+        'candidates': candidates,
+        'expected_value': expected_value,
+        'selection_sims': selection_sims,
+        'portfolio': lambda s: PortfolioOptimizer(cfg).select(s['candidates'], s['expected_value'],
+                                                                dups=s['dups'], sims=s['selection_sims']),
+    }
+
+def _size(out) -> int:
+    # rows produced by a stage (lineups, sims, players), for throughput
+    if isinstance(out, tuple):
+        out = out[0]
+    if out is None:
+        return 0
+    if hasattr(out, 'our_scores'):
+        return int(out.our_scores.shape[0])
+    return len(out)
+
+def bench_case(players, cfg, repeat: int = 1, memory: bool = True) -> list:
+    """Time every stage of one slate/config -> [record].
+
+    Each stage runs `repeat` times (seconds: all timings, best: the minimum) on the previous
+    stage's output. With memory=True one more traced run records tracemalloc's peak, i.e. the
+    most Python + numpy memory the stage held at once.
+    """
+    stages = _pipeline(players, cfg)
+    state, records = {}, []
+    for name in STAGES:
+        times = []
+        for _ in range(max(1, repeat)):
+            t = time.perf_counter()
+            out = stages[name](state)
+            times.append(time.perf_counter() - t)
+        peak = None
+        if memory:
+            tracemalloc.start()
+            stages[name](state)
+            peak = tracemalloc.get_traced_memory()[1] / 2**20
+            tracemalloc.stop()
+        state[name] = out
+        records.append(dict(stage=name, seconds=times, best=min(times), peak_mb=peak, rows=_size(out)))
+    return records
+
+def run_grid(grid: dict, cfg: SimConfig = None, repeat: int = 1, memory: bool = True,
+             bundled: bool = True, slate_seed: int = 0, log=print) -> dict:
+    # every (n_players, n_sims, field_size) combination on a synthetic slate, plus the bundled
+    # slate at each (n_sims, field_size) -> {'environment': ..., 'results': [record + case params]}
+    cfg = cfg or SimConfig()
+    cases = []
+    for n_players, n_sims, field_size in itertools.product(grid['n_players'], grid['n_sims'], grid['field_size']):
+        cases.append((f"synthetic-{n_players}", lambda n=n_players: synthetic_slate(n, rng_seed=slate_seed), n_sims, field_size))
+    if bundled:
+        real = bundled_players()
+        if real is not None:
+            for n_sims, field_size in itertools.product(grid['n_sims'], grid['field_size']):
+                cases.append(('bundled', lambda: real, n_sims, field_size))
+    results = []
+    for slate, make, n_sims, field_size in cases:
+        players = make()
+        case_cfg = replace(cfg, n_sims=n_sims, field_size=field_size)
+        case = dict(slate=slate, n_players=len(players), n_sims=n_sims, field_size=field_size)
+        for rec in bench_case(players, case_cfg, repeat, memory):
+            results.append({**case, **rec})
+            log(f"{slate:>14} sims={n_sims:<6} field={field_size:<6} {rec['stage']:<15} "
+                f"{rec['best']:8.3f}s" + (f" {rec['peak_mb']:9.1f} MB" if rec['peak_mb'] is not None else ''))
+    return dict(environment=environment(), config=vars(cfg), results=results)
+
+# name -> (sim_variance, control_variate)
+VARIANCE_MODES = {
+    'mc': ('mc', False),
+    'antithetic': ('antithetic', False),
+    'sobol': ('sobol', False),
+    'mc+cv': ('mc', True),
+    'sobol+cv': ('sobol', True),
+}
+
+def variance_study(players, cfg: SimConfig = None, modes=tuple(VARIANCE_MODES), sims=(512, 1024, 2048, 4096, 8192, 16384),
+                   reps: int = 8, top_k: int = 20, stability: float = 0.8, ref_sims: int = 131072, log=print) -> dict:
+    """How many sims each sampling mode needs before the top-K candidates settle.
+
+    A long plain Monte Carlo run (ref_sims, its own seed) ranks the candidates. Each mode is then
+    run `reps` times with different seeds, and after every checkpoint in `sims` (same run, one
+    stream) the overlap between its top-K and the reference top-K is recorded. Reported per mode:
+    mean overlap by sim count, the first count whose mean overlap reaches `stability`, and the
+    variance-reduction factor vs "mc" (variance of the EV across reps at the largest count,
+    median over the reference top-K).
+    """
+    cfg = cfg or SimConfig()
+    cands = CandidateGenerator(players, cfg).generate()
+    C = build_correlation(players, cfg)
+    opp = OpponentField(players, cfg)
+    bank = opp.bank_field_lineups()
+    n_field = cfg.field_size - cfg.our_entries
+    field = opp.sample_field_entries(bank, n_field)
+    dups = opp.expected_duplicates(cands, bank, n_field)
+    block = min(sims)
+
+    def checkpoints(run_cfg):
+        # EV after each sim count in `sims`, from one stream of `block`-sized steps
+        sim = EVSimulator(players, C, run_cfg)
+        contest = sim._contest(cands, field, dups)
+        acc, out = sim._accumulator(cands), {}
+        for pts in sim.iter_sim_blocks(max(sims), block):
+            our_scores = cands.scores(pts)
+            acc.update(_payouts(our_scores, field.scores(pts), **contest), our_scores)
+            if acc.n in sims:
+                out[acc.n] = acc.mean()
+        return out
+
+    t = time.perf_counter()
+    ref_cfg = replace(cfg, n_sims=ref_sims, rng_seed=cfg.rng_seed + 99991, sim_variance='mc', control_variate=False)
+    ref = EVSimulator(players, C, ref_cfg).expected_value(cands, field, our_dups=dups).to_numpy()
+    ref_top = np.argsort(-ref, kind='stable')[:top_k]
+    log(f"reference: {ref_sims} sims in {time.perf_counter() - t:.1f}s")
+
+    results, final = {}, {}
+    for name in modes:
+        variance, control = VARIANCE_MODES[name]
+        overlap = {n: [] for n in sims}
+        last = []
+        t = time.perf_counter()
+        for r in range(reps):
+            run_cfg = replace(cfg, rng_seed=cfg.rng_seed + 1000 * (r + 1), sim_variance=variance, control_variate=control)
+            for n, ev in checkpoints(run_cfg).items():
+                overlap[n].append(len(set(np.argsort(-ev, kind='stable')[:top_k]) & set(ref_top)) / top_k)
+            last.append(ev[ref_top])
+        final[name] = np.var(np.array(last), axis=0, ddof=1)
+        mean_overlap = {n: float(np.mean(v)) for n, v in overlap.items()}
+        reached = [n for n in sims if mean_overlap[n] >= stability]
+        results[name] = dict(overlap=mean_overlap, sims_to_stability=reached[0] if reached else None,
+                             seconds=time.perf_counter() - t)
+        log(f"{name:>11}: " + ' '.join(f"{n}:{mean_overlap[n]:.2f}" for n in sims)
+            + f"  -> {results[name]['sims_to_stability']}")
+    if 'mc' in final:
+        for name in results:
+            ok = final[name] > 0
+            results[name]['vr_factor'] = float(np.median(final['mc'][ok] / final[name][ok])) if ok.any() else None
+            log(f"{name:>11}: variance reduction vs mc {results[name]['vr_factor']}")
+    return dict(environment=environment(), config=vars(cfg), top_k=top_k, stability=stability, reps=reps,
+                ref_sims=ref_sims, sims=list(sims), modes=results)
+
+# payout tables the sketch check runs: (first rank, last rank, prize) rows
+SKETCH_PAYOUTS = {
+    'winner-take-all': ((1, 1, 1000.0),),
+    'top-heavy': ((1, 1, 1000.0), (2, 5, 200.0), (6, 20, 50.0), (21, 100, 10.0)),
+}
+
+def sketch_check(players, cfg: SimConfig = None, sizes=(500, 1000, 2000), cover: float = 0.8, log=print) -> dict:
+    """field_sketch EV vs exact EV on the same sims, for each size in `sizes` and the full field.
+
+    Per payout table and size: sketch / exact total EV, and the share of lineups with positive
+    exact EV whose exact EV lies in the sketch's [EV_low, EV_high]. Passes when that share
+    reaches `cover` at every size and a sketch of the whole field reproduces the exact EV, both
+    here and through EVSimulator.expected_value.
+    """
+    cfg = cfg or SimConfig(n_sims=2000, field_size=100000, field_portfolio_size=4000, candidate_pool_size=200)
+    cands = CandidateGenerator(players, cfg).generate()
+    opp = OpponentField(players, cfg)
+    field = opp.sample_field_entries(opp.bank_field_lineups(), cfg.field_size - cfg.our_entries)
+    sim = EVSimulator(players, build_correlation(players, cfg), cfg)
+    pts = sim.simulate_points(cfg.n_sims)
+    pilot = sim.sampler.sample(cfg.sketch_pilot, np.random.default_rng(cfg.rng_seed + 1))
+    ours, theirs, count = cands.scores(pts), field.scores(pts), field.multiplicity().astype(float)
+    log(f"field: {len(field)} lineups, {int(count.sum())} entries; {len(cands)} candidates, {cfg.n_sims} sims")
+    results, ok = [], True
+    for name, table in SKETCH_PAYOUTS.items():
+        prize_cum = prize_curve(table)
+        exact = ranked_payouts(ours, theirs, prize_cum, count).mean(axis=0)
+        pos = exact > 0
+        for size in (*sizes, len(field)):
+            sketch = build_field_sketch(field, size, np.random.default_rng(cfg.rng_seed + size), pilot, len(prize_cum) - 1)
+            band = sketch_payouts(ours, sketch.lineups.scores(pts), sketch, prize_cum, z=cfg.sketch_z)
+            est, low, high = (x.mean(axis=0) for x in band)
+            covered = float(((low[pos] <= exact[pos] + 1e-9) & (exact[pos] <= high[pos] + 1e-9)).mean()) if pos.any() else 1.0
+            passed = np.allclose(est, exact) if size >= len(field) else covered >= cover
+            ok &= bool(passed)
+            results.append(dict(payouts=name, size=size, ratio=float(est.sum() / exact.sum()), covered=covered, passed=bool(passed)))
+            log(f"{name:>16} K={size:<6} sketch/exact {results[-1]['ratio']:.3f}  in band {covered:.2f}"
+                + ('' if passed else '  FAIL'))
+    # end to end: expected_value with a whole-field sketch vs the exact run, same seed (prize_first and a table)
+    bank = opp.bank_field_lineups()
+    dups = opp.expected_duplicates(cands, bank, cfg.field_size - cfg.our_entries)
+    for name, table in (('prize_first', ()), ('top-heavy', SKETCH_PAYOUTS['top-heavy'])):
+        c = replace(cfg, payouts=table)
+        exact = EVSimulator(players, build_correlation(players, c), c).expected_value(cands, field, dups)
+        c = replace(c, field_sketch=len(field))
+        est = EVSimulator(players, build_correlation(players, c), c).expected_value(cands, field, dups)
+        passed = bool(np.allclose(est.to_numpy(), exact.to_numpy()))
+        ok &= passed
+        results.append(dict(payouts=name, size=len(field), ratio=float(est.sum() / exact.sum()), covered=1.0,
+                            passed=passed, expected_value=True))
+        log(f"{name:>16} K={len(field):<6} expected_value sketch/exact {results[-1]['ratio']:.6f}"
+            + ('' if passed else '  FAIL'))
+    return dict(environment=environment(), config=vars(cfg), cover=cover, results=results, ok=ok)
+
+def compare(old: dict, new: dict) -> pd.DataFrame:
+    # per (case, stage): best seconds and peak MB before/after, with new/old ratios
+    a = pd.DataFrame(old['results']).set_index(['slate', 'n_sims', 'field_size', 'stage'])[['best', 'peak_mb']].astype(float)
+    b = pd.DataFrame(new['results']).set_index(['slate', 'n_sims', 'field_size', 'stage'])[['best', 'peak_mb']].astype(float)
+    out = a.join(b, lsuffix='_old', rsuffix='_new', how='inner')
+    out['time_ratio'] = out['best_new'] / out['best_old']
+    out['mem_ratio'] = out['peak_mb_new'] / out['peak_mb_old']
+    return out
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description='Benchmark each pipeline stage over a grid of slate sizes.')
+    ap.add_argument('--grid', choices=sorted(GRIDS), default='quick')
+    ap.add_argument('--players', type=int, nargs='*', help='override the grid n_players axis')
+    ap.add_argument('--sims', type=int, nargs='*', help='override the grid n_sims axis')
+    ap.add_argument('--field', type=int, nargs='*', help='override the grid field_size axis')
+    ap.add_argument('--repeat', type=int, default=1)
+    ap.add_argument('--no-memory', action='store_true', help='skip the traced (tracemalloc) run')
+    ap.add_argument('--no-bundled', action='store_true', help='synthetic slates only')
+    ap.add_argument('--out', default='bench_results', help='directory for <label>.json')
+    ap.add_argument('--label', default=None, help='file name (default: timestamp + git revision)')
+    ap.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'), help='compare two result files and exit')
+    ap.add_argument('--copula', choices=('dense', 'factor'), default='dense', help='correlation model (SimConfig.copula)')
+    ap.add_argument('--variance', action='store_true', help='sampling-mode study (sims to a stable top-K) on the bundled slate')
+    ap.add_argument('--reps', type=int, default=8, help='--variance: independent runs per mode')
+    ap.add_argument('--sketch', action='store_true', help='field_sketch EV vs exact EV on a synthetic field (exit 1 on failure)')
+    args = ap.parse_args(argv)
+
+    if args.compare:
+        with open(args.compare[0]) as f, open(args.compare[1]) as g:
+            print(compare(json.load(f), json.load(g)).to_string(float_format=lambda x: f"{x:.3f}"))
+        return
+
+    if args.variance:
+        players = None if args.no_bundled else bundled_players()
+        if players is None:
+            players = synthetic_slate((args.players or [24])[0])
+        report = variance_study(players, reps=args.reps)
+        _write(report, args.out, args.label or f"variance_{report['environment']['time'].replace(':', '')}")
+        return
+
+    if args.sketch:
+        report = sketch_check(synthetic_slate((args.players or [24])[0]))
+        _write(report, args.out, args.label or f"sketch_{report['environment']['time'].replace(':', '')}")
+        if not report['ok']:
+            raise SystemExit(1)
+        return
+
+    grid = dict(GRIDS[args.grid])
+    for axis, override in (('n_players', args.players), ('n_sims', args.sims), ('field_size', args.field)):
+        if override:
+            grid[axis] = tuple(override)
+    report = run_grid(grid, SimConfig(copula=args.copula), repeat=args.repeat, memory=not args.no_memory, bundled=not args.no_bundled)
+    env = report['environment']
+    _write(report, args.out, args.label or f"{env['time'].replace(':', '')}_{env['git_rev'] or 'nogit'}")
+
+def _write(report: dict, out: str, label: str):
+    os.makedirs(out, exist_ok=True)
+    path = os.path.join(out, label + '.json')
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=1)
+    print(f"wrote {path}")
+
+if __name__ == "__main__":
+    main()
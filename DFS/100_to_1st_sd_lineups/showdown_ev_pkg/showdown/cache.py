@@ -0,0 +1,98 @@
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+
+def array_key(*parts) -> str:
+    # sha1 over arrays (dtype, shape and bytes) and plain values (repr)
+    h = hashlib.sha1()
+    for p in parts:
+        if isinstance(p, np.ndarray):
+            p = np.ascontiguousarray(p)
+            h.update(f"{p.dtype.str}{p.shape}".encode())
+            h.update(p.view(np.uint8).ravel() if p.size else b'')
+        else:
+            h.update(repr(p).encode())
+        h.update(b'\x1e')
+    return h.hexdigest()
+
+class SimCache:
+    """Disk cache of simulated points and lineup scores: one directory of .npy files per key.
+
+    Arrays are written through memory-mapped .npy files and read back with mmap_mode='r', so a
+    hit never loads a whole matrix into RAM. Entries carry a small meta.json; a directory's
+    mtime is its last use, and the least recently used entries are deleted once the cache
+    grows past max_bytes.
+    """
+    def __init__(self, root: str, max_bytes: float):
+        self.root = root
+        self.max_bytes = max_bytes
+        os.makedirs(root, exist_ok=True)
+
+    def _dir(self, key: str) -> str:
+        return os.path.join(self.root, key)
+
+    def _file(self, key: str, name: str) -> str:
+        return os.path.join(self._dir(key), name + '.npy')
+
+    def _touch(self, key: str):
+        os.utime(self._dir(key))
+
+    def load(self, key: str, name: str):
+        # -> read-only memmap, or None on a miss
+        path = self._file(key, name)
+        if not os.path.exists(path):
+            return None
+        self._touch(key)
+        return np.load(path, mmap_mode='r')
+
+    def create(self, key: str, name: str, shape, dtype) -> np.memmap:
+        # writable memmap for filling block by block; publish it with commit()
+        os.makedirs(self._dir(key), exist_ok=True)
+        return np.lib.format.open_memmap(self._file(key, name) + '.tmp', mode='w+', dtype=dtype, shape=shape)
+
+    def commit(self, key: str, name: str, arr: np.memmap):
+        arr.flush()
+        tmp = arr.filename
+        del arr
+        os.replace(tmp, self._file(key, name))
+        self._touch(key)
+        self.evict(keep=key)
+
+    def load_meta(self, key: str):
+        path = os.path.join(self._dir(key), 'meta.json')
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            return json.load(f)
+
+    def save_meta(self, key: str, meta: dict):
+        os.makedirs(self._dir(key), exist_ok=True)
+        path = os.path.join(self._dir(key), 'meta.json')
+        with open(path + '.tmp', 'w') as f:
+            json.dump(meta, f)
+        os.replace(path + '.tmp', path)
+
+    def size(self) -> int:
+        return sum(self._entry_size(k) for k in self._entries())
+
+    def _entries(self):
+        return [k for k in os.listdir(self.root) if os.path.isdir(self._dir(k))]
+
+    def _entry_size(self, key: str) -> int:
+        d = self._dir(key)
+        return sum(os.path.getsize(os.path.join(d, f)) for f in os.listdir(d))
+
+    def evict(self, keep: str = None):
+        # drop least recently used entries until the cache fits max_bytes (never `keep`)
+        entries = [(os.path.getmtime(self._dir(k)), k, self._entry_size(k)) for k in self._entries()]
+        total = sum(size for _, _, size in entries)
+        for _, key, size in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            shutil.rmtree(self._dir(key), ignore_errors=True)
+            total -= size
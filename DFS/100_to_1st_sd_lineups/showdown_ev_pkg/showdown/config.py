@@ -7,28 +7,72 @@ class SimConfig:
     field_size: int = 475              # total entries in contest
     our_entries: int = 10              # how many lineups we submit
     prize_first: float = 100.0         # total prize to split among 1st-place ties
-    mode: str = "quantile"             # "quantile" or "stats" (stats placeholder)
-    dup_penalty: float = 0.15          # penalize dup-prone lineups (0..1)
+    payouts: tuple = ()                # full table: ((first_rank, last_rank, prize_each), ...); empty = prize_first only
+    mode: str = "quantile"             # "quantile" (percentile copula) or "stats" (simulated stat lines, stats_sim.py)
+    dup_penalty: float = 0.0           # extra risk discount (0..1) on top of the dup-adjusted EV: ranks by EV*(1-dup_penalty)**expected_dups
     max_salary: int = 50000            # DK cap
     leave_salary_max: int = 3500       # max salary left on table for our candidates
     max_overlap: int = 3               # max shared players among our 10 lineups
     enforce_unique_cpt: bool = False   # can toggle; portfolio optimizer will balance naturally
+    select_sims: int = 2000            # sims for joint (cannibalization-aware) portfolio selection; 0 = rank by standalone EV (1st place only: ignored with a payout table)
     rng_seed: int = 42                 # reproducibility
+    sim_block_size: int = 2000         # sims scored per vectorized block (bounds EV memory)
+    sim_dtype: str = "float64"         # "float32" halves memory/bandwidth for points and scores
+    sim_variance: str = "mc"           # "mc", "antithetic" (normals in pairs Z, -Z) or "sobol" (scrambled quasi-random)
+    control_variate: bool = False      # regress EV on each lineup's score vs its exact mean (EVSimulator.vr_factor)
+    sim_cache_dir: str = ""            # reuse points/score matrices across runs from this directory ("" = off)
+    sim_cache_max_gb: float = 8.0      # evict least recently used cache entries beyond this size
+    run_report: str = ""               # write a JSON stage report (timings, counters) to this path ("" = off)
+    report_memory: bool = False        # report also traces peak memory per stage (tracemalloc: slows the run)
+
+    # Streaming EV: early stopping on top of the block loop; n_sims becomes the cap
+    stream: bool = False
+    ev_se_target: float = 0.0          # stop once EV standard error <= target (EV units); 0 = run all n_sims
+    ev_topk: int = 0                   # >0: target applies to the top-K only, and the top-K set must be stable
+    stream_min_sims: int = 5000        # never stop before this many sims
+
+    # Parallel simulation: sims sharded over a process pool (inputs in shared memory)
+    n_workers: int = 1                 # >1 enables the process pool
+    n_shards: int = 0                  # independent RNG streams; 0 = one per worker (fix it to decouple results from worker count)
 
     # Candidate generation
     candidate_pool_size: int = 4000    # number of candidate lineups for us
     cpt_top_k: int = 15                # limit captain choices to top-K by p50 points
     flex_top_k: int = 35               # limit flex pool by p50 points (per team combined)
+    candidate_mode: str = "sample"     # "sample" (p50-weighted), "enumerate" (every legal lineup) or "search" (simulated EV, search.py)
+    enum_top_n: int = 0                # enumerate: keep only the best N (0 = keep all)
+    enum_rank_by: str = "proj"         # enumerate: rank by "proj" (ProjPts) or "ceiling" (p090)
+    search_sims: int = 4000            # search: sims in the fixed block every lineup is scored on
+    search_batch: int = 2000           # search: lineups sampled per cross-entropy round
+    search_iters: int = 8              # search: cross-entropy rounds
+    search_elite: float = 0.05         # search: top fraction of a round the distributions move toward
+    search_smooth: float = 0.7         # search: weight of the elite's player frequencies in each update
+    search_local: int = 100            # search: best lineups refined by swap-one-player moves (0 = off)
+    search_local_rounds: int = 4       # search: swap rounds per refined lineup
 
     # Correlation knobs for Gaussian copula (used in quantile mode)
+    copula: str = "dense"              # "dense" (n x n heuristic matrix) or "factor" (game / team / pass-run factors: O(n*k) per sim)
     base_same_team: float = 0.20
     qb_receiver_boost: float = 0.25
     dst_vs_opp_offense: float = -0.30
     dsts_mutual: float = -0.20
     k_vs_offense: float = 0.05
     cross_team_baseline: float = 0.05
+    corr_tol: float = 1e-9             # nearest-correlation repair: relative change to stop at
+    corr_max_iter: int = 200           # nearest-correlation repair: iteration cap
+
+    # Stats mode (mode="stats"): team volume / script / efficiency drive every player's stat line
+    stats_pace_cv: float = 0.12        # game pace (plays), shared by both teams
+    stats_team_cv: float = 0.10        # team volume on top of pace
+    stats_script_sd: float = 0.05      # game-script shift of pass rate (the opponent gets the opposite)
+    stats_eff_sd: float = 0.25         # team efficiency: scales TD rates (and yards by its square root)
+    stats_share_conc: float = 30.0     # Dirichlet concentration of target / carry shares (higher = steadier roles)
+    stats_yds_shape: float = 1.5       # gamma shape per catch / carry (lower = more big plays)
 
     # Opponent field modeling
     field_model: str = "A"             # "A" sampling by ownership, "B" optimizer-like
-    field_portfolio_size: int = 8000   # bank of distinct field lineups to sample from
+    field_portfolio_size: int = 8000   # bank of distinct field lineups to sample from ("B": optimizer runs)
     field_noise_sd: float = 2.0        # points of noise in optimizer-like mode
+    field_sketch: int = 0              # >0: approximate EV vs a weighted sample of this many field lineups (huge fields)
+    sketch_z: float = 2.0              # width of the reported sketch error band (standard errors)
+    sketch_pilot: int = 256            # full-field pilot sims that pick the lineups the sketch keeps
@@ -1,61 +1,111 @@
+import hashlib
+from collections import OrderedDict
+
 import numpy as np
 import pandas as pd
 
+from .factor import factor_loadings
+
+OFFENSE = ('QB','WR','TE','RB')
+RECEIVERS = ('WR','TE','RB')
+
+CORR_KNOBS = ('copula', 'base_same_team', 'qb_receiver_boost', 'dst_vs_opp_offense', 'dsts_mutual',
+              'k_vs_offense', 'cross_team_baseline', 'corr_tol', 'corr_max_iter')
+
+_CACHE = OrderedDict()   # correlation_key -> matrix
+_CACHE_MAX = 32
+
 def _pos_group(pos: str) -> str:
     pos = pos.upper()
     if pos in ['QB','RB','WR','TE','K','DST']:
         return pos
     return 'OTH'
 
-def build_correlation(players_df: pd.DataFrame, cfg) -> np.ndarray:
-    n = len(players_df)
-    C = np.eye(n)
-    # Precompute quick lookups
+def correlation_key(players_df: pd.DataFrame, cfg) -> str:
+    # hash of the roster (order matters: rows map to matrix indices), RB volumes + correlation knobs
+    h = hashlib.sha1()
+    for col in ('Player','Team','Pos'):
+        h.update('\x1f'.join(players_df[col].astype(str)).encode())
+        h.update(b'\x1e')
+    for col in ('recvTgts', 'rushAtts'):
+        if col in players_df:
+            h.update(players_df[col].to_numpy(dtype=float).tobytes())
+    h.update(repr(tuple(getattr(cfg, k) for k in CORR_KNOBS)).encode())
+    return h.hexdigest()
+
+def _pair(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    # symmetric mask: (i in a and j in b) or (j in a and i in b)
+    m = a[:, None] & b[None, :]
+    return m | m.T
+
+def heuristic_correlation(players_df: pd.DataFrame, cfg) -> np.ndarray:
+    # Position/team heuristic from vectorized masks (may not be PSD)
     team = players_df['Team'].to_numpy()
     pos  = players_df['Pos'].to_numpy()
-    name = players_df['Player'].to_numpy()
-
-    # Identify QBs by team (for receiver boost)
-    qb_idx_by_team = {}
-    for i,(t,p) in enumerate(zip(team,pos)):
-        if p=='QB': qb_idx_by_team.setdefault(t, []).append(i)
-
-    # Correlation heuristic
-    for i in range(n):
-        for j in range(i+1, n):
-            corr = cfg.cross_team_baseline
-            same_team = team[i]==team[j]
-            if same_team:
-                corr = cfg.base_same_team
-                # boost QB with pass catchers
-                if (pos[i]=='QB' and pos[j] in ('WR','TE','RB')) or (pos[j]=='QB' and pos[i] in ('WR','TE','RB')):
-                    corr += cfg.qb_receiver_boost
-                # mild positive kicker with offense
-                if (pos[i]=='K' and pos[j] in ('QB','WR','TE','RB')) or (pos[j]=='K' and pos[i] in ('QB','WR','TE','RB')):
-                    corr += cfg.k_vs_offense
-                # DSTs on same team with their offense: small (driven by field position/TDs)
-                if (pos[i]=='DST' and pos[j] in ('QB','WR','TE','RB','K')) or (pos[j]=='DST' and pos[i] in ('QB','WR','TE','RB','K')):
-                    corr += 0.05
-            else:
-                # cross-team relations
-                if (pos[i]=='DST' and pos[j] in ('QB','WR','TE','RB')) or (pos[j]=='DST' and pos[i] in ('QB','WR','TE','RB')):
-                    corr = cfg.dst_vs_opp_offense
-                if (pos[i]=='DST' and pos[j]=='DST'):
-                    corr = cfg.dsts_mutual
-                # very slight negative kicker vs opposing DST
-                if (pos[i]=='K' and pos[j]=='DST') or (pos[j]=='K' and pos[i]=='DST'):
-                    corr = min(corr, -0.05)
-
-            C[i,j] = C[j,i] = np.clip(corr, -0.95, 0.95)
-
-    # Ensure positive semidefinite by adding small ridge to diagonal if needed
-    # (nearest PSD via eigenvalue clipping)
-    eigvals, eigvecs = np.linalg.eigh(C)
-    min_e = eigvals.min()
-    if min_e < 1e-6:
-        eigvals = np.maximum(eigvals, 1e-6)
-        C = (eigvecs * eigvals) @ eigvecs.T
-        # normalize diagonal back to 1
-        d = np.sqrt(np.diag(C))
-        C = C / (d[:,None]*d[None,:] + 1e-12)
+    is_qb, is_k, is_dst = pos == 'QB', pos == 'K', pos == 'DST'
+    is_off = np.isin(pos, OFFENSE)
+    is_rec = np.isin(pos, RECEIVERS)
+    same_team = team[:, None] == team[None, :]
+
+    # same team: base + QB/pass-catcher boost + mild kicker/offense + small DST/own offense
+    same = np.full(same_team.shape, cfg.base_same_team)
+    same += cfg.qb_receiver_boost * _pair(is_qb, is_rec)
+    same += cfg.k_vs_offense * _pair(is_k, is_off)
+    same += 0.05 * _pair(is_dst, is_off | is_k)
+
+    # cross team: DST vs opposing offense, DST vs DST, very slight negative K vs opposing DST
+    cross = np.full(same_team.shape, cfg.cross_team_baseline)
+    cross = np.where(_pair(is_dst, is_off), cfg.dst_vs_opp_offense, cross)
+    cross = np.where(_pair(is_dst, is_dst), cfg.dsts_mutual, cross)
+    cross = np.where(_pair(is_k, is_dst), np.minimum(cross, -0.05), cross)
+
+    C = np.clip(np.where(same_team, same, cross), -0.95, 0.95)
+    np.fill_diagonal(C, 1.0)
     return C
+
+def nearest_correlation(A: np.ndarray, tol: float = 1e-9, max_iter: int = 200, eig_floor: float = 1e-6) -> np.ndarray:
+    """Higham (2002) alternating projections with Dykstra's correction: nearest unit-diagonal PSD matrix."""
+    Y = A.copy()
+    dS = np.zeros_like(A)
+    for _ in range(max_iter):
+        R = Y - dS
+        # project onto PSD (eigenvalues floored so the result stays usable as a copula factor)
+        vals, vecs = np.linalg.eigh(R)
+        X = (vecs * np.maximum(vals, eig_floor)) @ vecs.T
+        X = (X + X.T) / 2
+        dS = X - R
+        # project onto unit diagonal
+        Y_prev = Y
+        Y = X.copy()
+        np.fill_diagonal(Y, 1.0)
+        if np.linalg.norm(Y - Y_prev) / max(np.linalg.norm(Y), 1e-12) < tol:
+            break
+    # Y has unit diagonal but may sit marginally outside the PSD cone if stopped early:
+    # one clip + diagonal rescale (a congruence, so PSD is kept) finishes the job
+    vals, vecs = np.linalg.eigh(Y)
+    if vals.min() < eig_floor:
+        Y = (vecs * np.maximum(vals, eig_floor)) @ vecs.T
+        d = np.sqrt(np.diag(Y))
+        Y = Y / (d[:, None] * d[None, :])
+        np.fill_diagonal(Y, 1.0)
+    return Y
+
+def build_correlation(players_df: pd.DataFrame, cfg):
+    # dense n x n matrix, or a FactorCorrelation with cfg.copula == "factor" (EVSimulator takes either)
+    key = correlation_key(players_df, cfg)
+    if key in _CACHE:
+        _CACHE.move_to_end(key)
+        return _CACHE[key].copy()
+
+    if cfg.copula == "factor":
+        C = factor_loadings(players_df, cfg)
+    else:
+        C = heuristic_correlation(players_df, cfg)
+        # Repair only when needed: nearest correlation matrix (PSD with unit diagonal)
+        if len(C) and np.linalg.eigvalsh(C).min() < 1e-6:
+            C = nearest_correlation(C, tol=cfg.corr_tol, max_iter=cfg.corr_max_iter)
+
+    _CACHE[key] = C
+    while len(_CACHE) > _CACHE_MAX:
+        _CACHE.popitem(last=False)
+    return C.copy()
@@ -1,5 +1,14 @@
+import json
+import os
+import re
+import unicodedata
+from dataclasses import dataclass, field, asdict
+
+import numpy as np
 import pandas as pd
 
+from .lineup import validate_player_pool
+
 # Expected headers:
 # Projections CSV:
 # 'RTS ID','player','position','team','salary','rushAtts','rushYds','rushTDs',
@@ -12,6 +21,21 @@ import pandas as pd
 #
 # Percentiles CSV:
 # 'player','position','team','p000','p005',...,'p100'
+#
+# DK salaries CSV (one row per roster slot, CPT and FLEX):
+# 'Position','Name + ID','Name','ID','Roster Position','Salary','Game Info','TeamAbbrev','AvgPointsPerGame'
+
+def parse_number(s: pd.Series) -> pd.Series:
+    # '$9,200' -> 9200.0, '57.00%' -> 0.57 (rates as fractions, like 'Proj Own'), numbers pass through
+    if pd.api.types.is_numeric_dtype(s):
+        return s.astype(float)
+    txt = s.astype(str).str.strip()
+    val = pd.to_numeric(txt.str.replace(r'[$,%\s]', '', regex=True), errors='coerce')
+    return val.where(~txt.str.endswith('%'), val / 100.0)
+
+def _clean_columns(df: pd.DataFrame) -> pd.DataFrame:
+    # strip whitespace and a UTF-8 BOM from headers
+    return df.rename(columns={c: c.strip().lstrip('\ufeff') for c in df.columns})
 
 def load_projections(path: str) -> pd.DataFrame:
     df = pd.read_csv(path)
@@ -37,20 +61,16 @@ def load_projections(path: str) -> pd.DataFrame:
     return df
 
 def load_leverage(path: str) -> pd.DataFrame:
-    df = pd.read_csv(path)
-    cols = {c: c.strip() for c in df.columns}
-    df.rename(columns=cols, inplace=True)
-    # Ensure dtypes
+    df = _clean_columns(pd.read_csv(path))
+    # Ensure dtypes ('$9,200' salaries and '57.00%' rates are common in exports)
     for col in ['FLEX Own','CPT Own','Total Own','FLEX Rate','CPT Rate','Total Rate','CPT Lev','Total Lev']:
         if col in df:
-            df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0.0)
-    df['Salary'] = df['Salary'].astype(int)
+            df[col] = parse_number(df[col]).fillna(0.0)
+    df['Salary'] = parse_number(df['Salary']).astype(int)
     return df
 
 def load_percentiles(path: str) -> pd.DataFrame:
-    df = pd.read_csv(path)
-    cols = {c: c.strip() for c in df.columns}
-    df.rename(columns=cols, inplace=True)
+    df = _clean_columns(pd.read_csv(path))
     df.rename(columns={
         'player': 'Player',
         'position': 'Pos',
@@ -73,6 +93,9 @@ def merge_inputs(proj_df: pd.DataFrame, lev_df: pd.DataFrame, pct_df: pd.DataFra
     df = proj_df.merge(lev_df, on=key_cols+['Salary'], how='left', suffixes=('','_lev'))
     df = df.merge(pct_df, on=key_cols, how='left', suffixes=('','_pct'))
 
+    return _fill_defaults(df)
+
+def _fill_defaults(df: pd.DataFrame) -> pd.DataFrame:
     # Fallback rates if leverage missing
     if 'CPT Rate' not in df: df['CPT Rate'] = 0.0
     if 'FLEX Rate' not in df: df['FLEX Rate'] = 0.0
@@ -93,3 +116,159 @@ def merge_inputs(proj_df: pd.DataFrame, lev_df: pd.DataFrame, pct_df: pd.DataFra
             df['ProjPts'] = 0.0
 
     return df
+
+def load_dk_salaries(path: str) -> pd.DataFrame:
+    # one row per player: FLEX salary/ID plus the CPT slot's salary/ID
+    df = _clean_columns(pd.read_csv(path))
+    df['Name'] = df['Name'].astype(str).str.strip()
+    df['Salary'] = parse_number(df['Salary']).astype(int)
+    slot = df['Roster Position'].astype(str).str.upper()
+    keys = ['Name', 'Position', 'TeamAbbrev']
+    flex = df[slot != 'CPT'][keys + ['ID', 'Salary', 'Game Info']]
+    cpt = df[slot == 'CPT'][keys + ['ID', 'Salary']].rename(columns={'ID': 'DK CPT ID', 'Salary': 'CPT Salary'})
+    out = flex.merge(cpt, on=keys, how='outer')
+    out = out.rename(columns={'Name': 'Player', 'Position': 'Pos', 'TeamAbbrev': 'Team', 'ID': 'DK ID', 'Game Info': 'Game'})
+    for col in ('DK ID', 'DK CPT ID', 'CPT Salary'):
+        out[col] = out[col].fillna(-1).astype(np.int64)
+    # CPT-only rows (rare): fall back to the 1.5x rule
+    out['Salary'] = out['Salary'].fillna(out['CPT Salary'] / 1.5).astype(np.int64)
+    return out.reset_index(drop=True)
+
+_SUFFIX = re.compile(r'\b(jr|sr|ii|iii|iv|v)\b')
+
+def player_key(df: pd.DataFrame) -> pd.Series:
+    """Join key 'name|TEAM' with accents, punctuation and Jr./III-style suffixes removed.
+
+    Defenses are keyed 'dst|TEAM' because sources disagree on their names ('Chicago Bears' vs 'Bears').
+    """
+    name = df['Player'].astype(str).map(lambda n: unicodedata.normalize('NFKD', n).encode('ascii', 'ignore').decode())
+    name = name.str.lower().str.replace(r"[.'\u2019,-]", '', regex=True)
+    name = name.str.replace(_SUFFIX, '', regex=True).str.split().str.join(' ')
+    team = df['Team'].astype(str).str.strip().str.upper()
+    is_dst = df['Pos'].astype(str).str.strip().str.upper().isin(['DST', 'DEF', 'D'])
+    return (name.where(~is_dst, 'dst') + '|' + team).rename('key')
+
+@dataclass
+class IngestReport:
+    """What ingest() could not line up; empty lists mean every source matched the projections."""
+    missing: dict = field(default_factory=dict)          # source -> projected players it has no row for
+    unmatched: dict = field(default_factory=dict)        # source -> its slate players absent from the projections
+    salary_mismatch: list = field(default_factory=list)  # (player, projections salary, source salary, source)
+    dropped: list = field(default_factory=list)          # players removed by validate_player_pool
+    duplicates: list = field(default_factory=list)       # keys repeated within a source (first row kept)
+
+    def ok(self) -> bool:
+        return not (any(self.missing.values()) or self.salary_mismatch or self.duplicates)
+
+    def summary(self) -> str:
+        lines = [f"missing from {src}: {', '.join(v)}" for src, v in self.missing.items() if v]
+        lines += [f"in {src} but not projected: {', '.join(v)}" for src, v in self.unmatched.items() if v]
+        lines += [f"salary {p}: projections {a} vs {src} {b}" for p, a, b, src in self.salary_mismatch]
+        if self.dropped:
+            lines.append(f"dropped (position/missing data): {', '.join(self.dropped)}")
+        if self.duplicates:
+            lines.append(f"duplicate keys: {', '.join(self.duplicates)}")
+        return '\n'.join(lines) or 'all sources matched'
+
+def _keyed(df: pd.DataFrame, name: str, report: IngestReport) -> pd.DataFrame:
+    df = df.copy()
+    df['key'] = player_key(df)
+    dup = df['key'].duplicated()
+    report.duplicates += [f"{name}:{k}" for k in df.loc[dup, 'key']]
+    return df[~dup]
+
+def ingest(proj_df: pd.DataFrame, lev_df: pd.DataFrame, pct_df: pd.DataFrame, dk_df: pd.DataFrame = None):
+    """Normalize every source into one typed player table -> (players, IngestReport).
+
+    Sources join on player_key (not salary or raw spelling), so a salary or name-format
+    difference shows up in the report instead of silently dropping leverage or percentiles.
+    DK salaries, when given, are authoritative for Salary and add CPT Salary / DK IDs. Rows
+    are ordered by key and numbered by 'pid', the integer id every later stage indexes by.
+    """
+    report = IngestReport()
+    base = _keyed(proj_df, 'projections', report)
+    teams = set(base['Team'].astype(str).str.strip().str.upper())
+    key_cols = ['Player', 'Pos', 'Team']
+    for k in key_cols:
+        base[k] = base[k].astype(str).str.strip()
+
+    sources = [('leverage', _keyed(lev_df, 'leverage', report)),
+               ('percentiles', _keyed(pct_df, 'percentiles', report))]
+    if dk_df is not None:
+        sources.append(('dk', _keyed(dk_df, 'dk', report)))
+    df = base
+    for name, src in sources:
+        on_slate = src['Team'].astype(str).str.strip().str.upper().isin(teams)
+        report.missing[name] = sorted(base.loc[~base['key'].isin(src['key']), 'Player'])
+        report.unmatched[name] = sorted(src.loc[on_slate & ~src['key'].isin(base['key']), 'Player'].astype(str))
+        cols = [c for c in src.columns if c not in key_cols and (c not in df or c in ('key', 'Salary'))]
+        src = src[cols].rename(columns={'Salary': f'Salary_{name}'})
+        df = df.merge(src, on='key', how='left')
+        other = f'Salary_{name}'
+        if other in df:
+            bad = df[other].notna() & (df[other] != df['Salary'])
+            report.salary_mismatch += [(p, int(a), int(b), name) for p, a, b in df.loc[bad, ['Player', 'Salary', other]].itertuples(index=False)]
+            if name == 'dk':
+                df['Salary'] = df[other].fillna(df['Salary'])
+            df = df.drop(columns=other)
+    df['Salary'] = df['Salary'].astype(np.int64)
+    df = _fill_defaults(df)
+
+    valid = validate_player_pool(df)
+    report.dropped = sorted(df.loc[~df.index.isin(valid.index), 'Player'])
+    df = valid.sort_values('key', kind='stable').drop(columns='key').reset_index(drop=True)
+    df.insert(0, 'pid', np.arange(len(df), dtype=np.int64))
+    return df, report
+
+def source_stamps(paths) -> dict:
+    # input path -> [size, mtime_ns] (local files) or None (URLs: only the address is known)
+    return {str(p): [os.path.getsize(p), os.stat(p).st_mtime_ns] if os.path.exists(p) else None
+            for p in paths if p}
+
+def save_snapshot(players: pd.DataFrame, path: str, report: IngestReport = None, sources=None):
+    """Columnar snapshot of an ingested player table: .npz (numpy only) or .parquet (needs pyarrow)."""
+    stamps = source_stamps(sources or ())
+    if path.endswith('.parquet'):
+        players.to_parquet(path, index=False)
+        if report is not None:
+            with open(path + '.report.json', 'w') as f:
+                json.dump(asdict(report), f)
+        with open(path + '.sources.json', 'w') as f:
+            json.dump(stamps, f)
+        return
+    cols = {}
+    for c in players.columns:
+        v = players[c]
+        cols[c] = v.to_numpy(dtype=str) if not pd.api.types.is_numeric_dtype(v) else v.to_numpy()
+    meta = json.dumps({'columns': list(players.columns), 'report': asdict(report) if report is not None else None,
+                       'sources': stamps})
+    np.savez(path, __meta__=np.array(meta), **{f'c{i}': cols[c] for i, c in enumerate(players.columns)})
+
+def snapshot_sources(path: str):
+    # -> the source_stamps a snapshot was built from, or None (missing, or written before they were kept)
+    try:
+        if path.endswith('.parquet'):
+            with open(path + '.sources.json') as f:
+                return json.load(f)
+        with np.load(path, allow_pickle=False) as z:
+            return json.loads(str(z['__meta__'])).get('sources')
+    except FileNotFoundError:
+        return None
+
+def load_snapshot(path: str):
+    # -> (players, IngestReport or None); no CSV parsing or joins
+    if path.endswith('.parquet'):
+        players = pd.read_parquet(path)
+        try:
+            with open(path + '.report.json') as f:
+                report = IngestReport(**json.load(f))
+        except FileNotFoundError:
+            report = None
+        return players, report
+    with np.load(path, allow_pickle=False) as z:
+        meta = json.loads(str(z['__meta__']))
+        players = pd.DataFrame({c: z[f'c{i}'] for i, c in enumerate(meta['columns'])})
+    rep = meta['report']
+    if rep is not None:
+        rep['salary_mismatch'] = [tuple(r) for r in rep['salary_mismatch']]
+    return players, (IngestReport(**rep) if rep is not None else None)
@@ -0,0 +1,108 @@
+import numpy as np
+
+from .lineup import CPT_MULT, cpt_salaries
+
+_BLOCK = 1 << 16   # lineups per yielded block
+
+def iter_lineups(salary: np.ndarray, team_id: np.ndarray, max_salary: int, min_salary: int = 0, block: int = _BLOCK):
+    """Stream every legal CPT + 5-FLEX lineup as uint16 (m, 6) blocks (CPT first, FLEX ascending).
+
+    Players are walked in salary order: the first three FLEX slots are a depth-first search
+    pruned by the cheapest possible completion (break: every later player costs more) and the
+    dearest possible one (skip), and the last two slots are matched against all remaining
+    pairs in one vectorized mask.
+    """
+    salary = np.asarray(salary, dtype=np.int64)
+    team_id = np.asarray(team_id)
+    n = len(salary)
+    if n < 6:
+        return
+    order = np.argsort(salary, kind='stable')
+    s = salary[order]
+    t = team_id[order]
+    rank = np.empty(n, dtype=np.intp)
+    rank[order] = np.arange(n)
+    cpt_sal = cpt_salaries(salary)
+
+    # cheapest run of r players starting at i: cs[i+r] - cs[i]; dearest r players overall: big[r]
+    cs = np.concatenate([[0], np.cumsum(s)])
+    big = np.concatenate([[0], np.cumsum(s[::-1])])
+
+    # all (a < b) pairs in salary order, grouped by a
+    pa, pb = np.triu_indices(n, k=1)
+    pair_sal = s[pa] + s[pb]
+    pair_start = np.searchsorted(pa, np.arange(n + 1))
+
+    buf, size = [], 0
+    for c in range(n):
+        rc = rank[c]
+        hi = max_salary - cpt_sal[c]
+        lo = min_salary - cpt_sal[c]
+        tc = team_id[c]
+        for i in range(n - 4):
+            if i == rc:
+                continue
+            s1 = s[i]
+            if s1 + cs[i+5] - cs[i+1] > hi:
+                break
+            if s1 + big[4] < lo:
+                continue
+            for j in range(i + 1, n - 3):
+                if j == rc:
+                    continue
+                s2 = s1 + s[j]
+                if s2 + cs[j+4] - cs[j+1] > hi:
+                    break
+                if s2 + big[3] < lo:
+                    continue
+                for k in range(j + 1, n - 2):
+                    if k == rc:
+                        continue
+                    s3 = s2 + s[k]
+                    if s3 + cs[k+3] - cs[k+1] > hi:
+                        break
+                    if s3 + big[2] < lo:
+                        continue
+                    p0 = pair_start[k + 1]
+                    ps = pair_sal[p0:]
+                    a, b = pa[p0:], pb[p0:]
+                    m = (ps <= hi - s3) & (ps >= lo - s3) & (a != rc) & (b != rc)
+                    if t[i] == tc and t[j] == tc and t[k] == tc:
+                        # both teams must be present
+                        m &= (t[a] != tc) | (t[b] != tc)
+                    hits = np.nonzero(m)[0]
+                    if len(hits) == 0:
+                        continue
+                    rows = np.empty((len(hits), 6), dtype=np.uint16)
+                    rows[:, 0] = c
+                    rows[:, 1] = order[i]
+                    rows[:, 2] = order[j]
+                    rows[:, 3] = order[k]
+                    rows[:, 4] = order[a[hits]]
+                    rows[:, 5] = order[b[hits]]
+                    rows[:, 1:].sort(axis=1)
+                    buf.append(rows)
+                    size += len(rows)
+                    if size >= block:
+                        yield np.concatenate(buf)
+                        buf, size = [], 0
+    if buf:
+        yield np.concatenate(buf)
+
+def lineup_values(idx: np.ndarray, value: np.ndarray) -> np.ndarray:
+    # CPT-weighted sum of a per-player value (projection, ceiling, ...)
+    return CPT_MULT * value[idx[:, 0]] + value[idx[:, 1:]].sum(axis=1)
+
+def top_lineups(blocks, value: np.ndarray, n: int):
+    """Keep the n best lineups by `value` from a stream of blocks; memory stays O(n + block)."""
+    best = np.empty((0, 6), dtype=np.uint16)
+    best_v = np.empty(0, dtype=float)
+    for blk in blocks:
+        best = np.concatenate([best, blk])
+        best_v = np.concatenate([best_v, lineup_values(blk, value)])
+        if len(best_v) > n:
+            keep = np.argpartition(-best_v, n - 1)[:n]
+            best, best_v = best[keep], best_v[keep]
+    # deterministic output: value desc, then lineup indices
+    order = np.lexsort(tuple(best[:, k] for k in range(5, -1, -1)) + (-best_v,))
+    return best[order], best_v[order]
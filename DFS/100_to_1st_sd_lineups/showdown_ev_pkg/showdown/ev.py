@@ -1,29 +1,133 @@
+import json
+import time
+from dataclasses import dataclass
+
 import numpy as np
 import pandas as pd
-from scipy.stats import norm
 
 from .percentiles import QuantileSampler
+from .lineup import LineupMatrix
+from .sampling import CopulaSampler, normal_source
+from .stats_sim import StatSampler, StatStream
+from .payouts import contest_prizes, prize_curve, ranked_payouts
+from .sketch import FieldSketch, build_field_sketch, sketch_payouts
+from .cache import SimCache, array_key
+
+def _first_place_payouts(our_scores: np.ndarray, field_scores: np.ndarray, prize: float,
+                         field_count: np.ndarray = None, dup_adjust: np.ndarray = None) -> np.ndarray:
+    # our_scores: (block, n_ours), field_scores: (block, n_field) -> per-sim payout (block, n_ours)
+    # field_count: multiplicity of each (unique) field lineup; dup_adjust: per-lineup change to
+    # its tie count when it wins (expected minus realized field copies of that exact lineup)
+    if our_scores.shape[1] == 0 or our_scores.shape[0] == 0:
+        return np.zeros(our_scores.shape, dtype=float)
+    top = our_scores.max(axis=1)
+    if field_scores.shape[1] > 0:
+        top = np.maximum(top, field_scores.max(axis=1))
+    thresh = (top - 1e-9)[:, None]
+    ours_tie = our_scores >= thresh
+    field_tie = field_scores >= thresh
+    if field_count is None:
+        total_tie = ours_tie.sum(axis=1) + field_tie.sum(axis=1)
+    else:
+        total_tie = ours_tie.sum(axis=1) + field_tie @ field_count
+    if dup_adjust is None:
+        split = np.where(ours_tie.any(axis=1), prize / np.maximum(total_tie, 1), 0.0)
+        return np.where(ours_tie, split[:, None], 0.0)
+    ties = np.maximum(total_tie[:, None] + dup_adjust[None, :], 1.0)
+    return np.where(ours_tie, prize / ties, 0.0)
+
+def _payouts(our_scores: np.ndarray, field_scores: np.ndarray, prize: float, field_count: np.ndarray = None,
+             dup_adjust: np.ndarray = None, prize_cum: np.ndarray = None) -> np.ndarray:
+    # winner-take-all unless the contest carries a cumulative prize curve (cfg.payouts)
+    if prize_cum is None:
+        return _first_place_payouts(our_scores, field_scores, prize, field_count, dup_adjust)
+    return ranked_payouts(our_scores, field_scores, prize_cum, field_count, dup_adjust)
+
+def _field_top(field_scores: np.ndarray, count: np.ndarray):
+    # best field score per sim and the (multiplicity-weighted) entries within 1e-9 of it
+    fmax = field_scores.max(axis=1)
+    return fmax, (field_scores >= (fmax - 1e-9)[:, None]) @ count
+
+@dataclass
+class SimScores:
+    """Per-sim inputs for joint portfolio selection: our scores plus a summary of the field's top."""
+    our_scores: np.ndarray   # (n_sims, n_ours)
+    field_max: np.ndarray    # (n_sims,) best field score
+    field_ties: np.ndarray   # (n_sims,) field entries within 1e-9 of field_max (multiplicity-weighted)
+    prize: float
+    realized: np.ndarray = None   # (n_ours,) field copies of each of our lineups (already in field_ties)
+
+class RunningEV:
+    """Per-lineup running payout sums; gives EV and its Monte Carlo standard error at any point.
+
+    control_mean: known E[control] per lineup (its mean score). Each update then also takes the
+    lineups' scores, and mean() / se() use the regression control variate
+    EV = mean(payout) - beta * (mean(score) - E[score]), beta = cov(payout, score) / var(score),
+    whose variance is var(payout) * (1 - corr**2); vr_factor() reports the ratio.
+    """
+    def __init__(self, n_lineups: int, control_mean: np.ndarray = None):
+        self.n = 0
+        self.total = np.zeros(n_lineups, dtype=float)
+        self.total_sq = np.zeros(n_lineups, dtype=float)
+        self.control_mean = control_mean
+        if control_mean is not None:
+            # sums of the centered control c = score - E[score] and of c * payout
+            self.c_total = np.zeros(n_lineups, dtype=float)
+            self.c_sq = np.zeros(n_lineups, dtype=float)
+            self.cy = np.zeros(n_lineups, dtype=float)
+
+    def update(self, payouts: np.ndarray, control: np.ndarray = None):
+        # payouts: (block, n_lineups); control: the same lineups' scores (with control_mean)
+        self.n += payouts.shape[0]
+        self.total += payouts.sum(axis=0)
+        self.total_sq += np.einsum('ij,ij->j', payouts, payouts)
+        if self.control_mean is not None:
+            c = np.asarray(control, dtype=float) - self.control_mean
+            self.c_total += c.sum(axis=0)
+            self.c_sq += np.einsum('ij,ij->j', c, c)
+            self.cy += np.einsum('ij,ij->j', c, payouts)
+
+    def merge(self, other: 'RunningEV'):
+        self.n += other.n
+        self.total += other.total
+        self.total_sq += other.total_sq
+        if self.control_mean is not None:
+            self.c_total += other.c_total
+            self.c_sq += other.c_sq
+            self.cy += other.cy
+
+    def _var(self) -> np.ndarray:
+        return np.clip((self.total_sq - self.total**2 / self.n) / (self.n - 1), 0.0, None)
 
-def _mvnorm_to_uniform(corr: np.ndarray, n_draws: int, rng) -> np.ndarray:
-    # Draw correlated normals then map to uniforms via Phi
-    Z = rng.multivariate_normal(mean=np.zeros(corr.shape[0]), cov=corr, size=n_draws)
-    U = 0.5*(1+erf(Z / np.sqrt(2)))  # manual Phi
-    return U
-
-def erf(x):
-    # vectorized error function using np.erf if available, else approximation
-    try:
-        from math import erf as m_erf
-        vfunc = np.vectorize(m_erf)
-        return vfunc(x)
-    except Exception:
-        # Abramowitz & Stegun approximation
-        # Not perfect but fine for our use
-        sign = np.sign(x)
-        a1=0.254829592; a2=-0.284496736; a3=1.421413741; a4=-1.453152027; a5=1.061405429; p=0.3275911
-        t = 1.0/(1.0+p*np.abs(x))
-        y = 1.0 - (((((a5*t + a4)*t) + a3)*t + a2)*t + a1)*t*np.exp(-x*x)
-        return sign*y
+    def _control(self):
+        # -> (beta, residual payout variance) of the regression on the control
+        n = self.n
+        var_c = (self.c_sq - self.c_total**2 / n) / (n - 1)
+        cov = (self.cy - self.total * self.c_total / n) / (n - 1)
+        ok = var_c > 0
+        beta = np.where(ok, cov / np.where(ok, var_c, 1.0), 0.0)
+        return beta, np.clip(self._var() - beta * cov, 0.0, None)
+
+    def mean(self) -> np.ndarray:
+        mean = self.total / max(self.n, 1)
+        if self.control_mean is None or self.n < 2:
+            return mean
+        beta, _ = self._control()
+        return mean - beta * self.c_total / self.n
+
+    def se(self) -> np.ndarray:
+        if self.n < 2:
+            return np.full(self.total.shape, np.inf)
+        var = self._var() if self.control_mean is None else self._control()[1]
+        return np.sqrt(var / self.n)
+
+    def vr_factor(self) -> np.ndarray:
+        # plain variance / control-variate variance per lineup (1 without a control, or no payouts)
+        if self.control_mean is None or self.n < 2:
+            return np.ones(self.total.shape)
+        var = self._var()
+        res = self._control()[1]
+        return np.where(res > 0, var / np.where(res > 0, res, 1.0), 1.0)
 
 class EVSimulator:
     def __init__(self, players_df: pd.DataFrame, corr: np.ndarray, cfg):
@@ -31,73 +135,293 @@ class EVSimulator:
         self.corr = corr
         self.cfg = cfg
         self.rng = np.random.default_rng(cfg.rng_seed+7)
+        self.sketch_rng = np.random.default_rng(cfg.rng_seed+11)   # field sketches: own stream, never shifts the sims
 
-        # Build per-player quantile samplers
         self.samplers = []
-        for _, row in self.df.iterrows():
-            pct = {c: row[c] for c in self.df.columns if c.startswith('p')}
-            self.samplers.append(QuantileSampler(pct))
+        if cfg.mode == "stats":
+            # points from simulated stat lines; correlation comes from the model, not corr
+            if cfg.sim_variance != "mc":
+                raise ValueError("mode='stats' draws from the RNG directly: use sim_variance='mc'")
+            self.sampler = StatSampler(self.df, cfg, dtype=np.dtype(cfg.sim_dtype))
+        elif cfg.mode == "quantile":
+            # Build per-player quantile samplers
+            for _, row in self.df.iterrows():
+                pct = {c: row[c] for c in self.df.columns if c.startswith('p')}
+                self.samplers.append(QuantileSampler(pct))
+
+            # Copula engine: factorization + stacked quantile tables built once
+            self.sampler = CopulaSampler(corr, self.samplers, dtype=np.dtype(cfg.sim_dtype))
+        else:
+            raise ValueError(f"Unknown mode {cfg.mode!r} (expected 'quantile' or 'stats')")
+        # where the copula's normals come from: plain RNG, antithetic pairs or scrambled Sobol
+        # (stats mode: counter-keyed chunks, see StatStream)
+        if cfg.mode == "stats":
+            self.draws = StatStream(self.rng)
+        else:
+            self.draws = normal_source(cfg.sim_variance, self.sampler.n_normals, self.rng)
+
+        # stats from the most recent expected_value call
+        self.sims_completed = 0
+        self.ev_se = None
+        self.ev_band = None   # field_sketch mode: EV_low / EV_high from the sketch's sampling error
+        self.vr_factor = None # control_variate: per-lineup variance reduction (plain / adjusted variance)
+        self.stats = dict(points_drawn=0, points_seconds=0.0)   # points sampling (parallel: workers' time summed; see instrument.py)
+
+        # optional disk cache of points / score matrices (memory-mapped on reuse)
+        self.cache = SimCache(cfg.sim_cache_dir, cfg.sim_cache_max_gb * 2**30) if cfg.sim_cache_dir else None
 
         # helpful map
         self.idx_by_name = {row['Player']: i for i, row in self.df.iterrows()}
 
     def simulate_points(self, n_sims: int):
-        # Gaussian copula to get correlated uniforms, then inverse CDF per player
-        U = self._correlated_uniforms(n_sims)
-        # Map to fantasy points per player (vectorized)
-        pts = np.zeros((n_sims, len(self.df)), dtype=float)
-        for j, sampler in enumerate(self.samplers):
-            pts[:, j] = sampler.sample(U[:, j])
-        return pts  # shape (n_sims, n_players)
+        # Gaussian copula to get correlated uniforms, then one batched inverse CDF over all players
+        t = time.perf_counter()
+        pts = self.sampler.sample(n_sims, self.draws)  # shape (n_sims, n_players)
+        self.stats['points_drawn'] += n_sims
+        self.stats['points_seconds'] += time.perf_counter() - t
+        return pts
+
+    def iter_sim_blocks(self, n_sims: int, block: int = None):
+        # Yield points matrices of at most `block` sims; the RNG stream matches one big draw
+        block = max(1, int(block or self.cfg.sim_block_size))
+        done = 0
+        while done < n_sims:
+            b = min(block, n_sims - done)
+            yield self.simulate_points(b)
+            done += b
 
     def _correlated_uniforms(self, n_sims: int):
-        # Use eigen-decomposition for speed / stability
-        vals, vecs = np.linalg.eigh(self.corr)
-        vals = np.clip(vals, 1e-8, None)
-        A = vecs @ np.diag(np.sqrt(vals))
-        Z = self.rng.standard_normal(size=(n_sims, self.corr.shape[0]))
-        X = Z @ A.T
-        # standard normal CDF
-        U = 0.5 * (1.0 + erf(X / np.sqrt(2)))
-        return U
-
-    def lineup_scores(self, pts_mat: np.ndarray, lineup_df: pd.DataFrame) -> np.ndarray:
-        # lineup_df columns: CPT, FLEX1..FLEX5
-        idx = self.idx_by_name
-        n = len(lineup_df)
-        scores = np.zeros((pts_mat.shape[0], n), dtype=float)
-        for k, row in lineup_df.iterrows():
-            names = [row['CPT'], row['FLEX1'], row['FLEX2'], row['FLEX3'], row['FLEX4'], row['FLEX5']]
-            idcs = [idx[nm] for nm in names]
-            # CPT 1.5x
-            s = 1.5*pts_mat[:, idcs[0]] + pts_mat[:, idcs[1]] + pts_mat[:, idcs[2]] + pts_mat[:, idcs[3]] + pts_mat[:, idcs[4]] + pts_mat[:, idcs[5]]
-            scores[:, k] = s
-        return scores
-
-    def expected_value(self, our_lineups: pd.DataFrame, field_lineups: pd.DataFrame) -> pd.Series:
+        return self.sampler.uniforms(n_sims, self.draws)
+
+    def _draw_state(self) -> dict:
+        # RNG state plus the stream position (sim_variance="sobol", or mode="stats")
+        return dict(rng=self.rng.bit_generator.state, sobol=self.draws.tell() if hasattr(self.draws, 'tell') else None)
+
+    def _restore_draws(self, state: dict):
+        self.rng.bit_generator.state = state['rng']
+        if state['sobol'] is not None:
+            self.draws.seek(state['sobol'])
+
+    def control_means(self, lineups: LineupMatrix) -> np.ndarray:
+        # exact expected score of each lineup (CPT 1.5x) from the players' quantile tables
+        return lineups.scores(self.sampler.means()[None, :])[0].astype(float)
+
+    def _accumulator(self, lineups: LineupMatrix) -> RunningEV:
+        return RunningEV(len(lineups), self.control_means(lineups) if self.cfg.control_variate else None)
+
+    def _finish(self, acc: RunningEV, index=None) -> pd.Series:
+        # record run stats from a finished accumulator -> EV series
+        self.sims_completed = acc.n
+        self.ev_se = pd.Series(acc.se(), index=index, name='EV_SE')
+        self.vr_factor = pd.Series(acc.vr_factor(), index=index, name='VR') if self.cfg.control_variate else None
+        return pd.Series(acc.mean(), index=index, name='EV')
+
+    def _points_key(self, n_sims: int) -> str:
+        # what a fresh draw depends on: percentiles (quantile tables), correlation (its factor),
+        # the draw state (seed, sampling mode and draws so far), sim count and dtype; antithetic pairs
+        # and Sobol points also follow the block size (plain MC matches one big draw)
+        state = json.dumps(self._draw_state(), sort_keys=True)
+        block = None if self.cfg.sim_variance == 'mc' else max(1, int(self.cfg.sim_block_size))
+        return array_key(*self.sampler.key_arrays(), state, self.cfg.sim_variance, n_sims, block)
+
+    def cached_points(self, n_sims: int):
+        # -> (points memmap, cache key); the RNG ends where a fresh draw would leave it
+        key = self._points_key(n_sims)
+        meta = self.cache.load_meta(key)
+        pts = self.cache.load(key, 'points')
+        if pts is not None and meta is not None:
+            self._restore_draws(meta['draws_after'])
+            return pts, key
+        out = self.cache.create(key, 'points', (n_sims, self.sampler.n_players), self.sampler.dtype)
+        start = 0
+        for blk in self.iter_sim_blocks(n_sims):
+            out[start:start+len(blk)] = blk
+            start += len(blk)
+        self.cache.save_meta(key, {'draws_after': self._draw_state()})
+        self.cache.commit(key, 'points', out)
+        return self.cache.load(key, 'points'), key
+
+    def cached_scores(self, n_sims: int, *lineups):
+        # -> one (n_sims, len(lineups)) score memmap per LineupMatrix, or None without a cache.
+        # Scores live next to their points, keyed by the lineups, so reruns with the same
+        # candidates / field never touch the points at all.
+        if self.cache is None:
+            return None
+        pts, key = self.cached_points(n_sims)
+        block = max(1, int(self.cfg.sim_block_size))
+        out = []
+        for lm in lineups:
+            name = 'scores_' + array_key(lm.idx)
+            S = self.cache.load(key, name)
+            if S is None and len(lm) == 0:
+                S = np.zeros((n_sims, 0), dtype=self.sampler.dtype)
+            elif S is None:
+                S = self.cache.create(key, name, (n_sims, len(lm)), self.sampler.dtype)
+                for start in range(0, n_sims, block):
+                    S[start:start+block] = lm.scores(np.asarray(pts[start:start+block]))
+                self.cache.commit(key, name, S)
+                S = self.cache.load(key, name)
+            out.append(S)
+        return out
+
+    def _as_matrix(self, lineups) -> LineupMatrix:
+        if isinstance(lineups, LineupMatrix):
+            return lineups
+        return LineupMatrix.from_frame(lineups, self.df)
+
+    def lineup_scores(self, pts_mat: np.ndarray, lineups) -> np.ndarray:
+        # lineups: LineupMatrix (or a CPT/FLEX1..FLEX5 DataFrame); CPT counts 1.5x
+        return self._as_matrix(lineups).scores(pts_mat)
+
+    def _contest(self, our_lineups: LineupMatrix, field_lineups: LineupMatrix, our_dups=None, cfg=None) -> dict:
+        # payout kwargs: field multiplicities and, given expected field duplicates of our
+        # lineups, the swap of realized copies (already in the field) for the expected count
+        # (cfg: another contest's settings on this simulator's sims, see batch.py)
+        cfg = cfg or self.cfg
+        prize, prize_cum = contest_prizes(cfg)
+        contest = dict(prize=prize, field_count=None, dup_adjust=None, prize_cum=prize_cum)
+        if field_lineups.count is not None:
+            contest['field_count'] = field_lineups.count.astype(float)
+        if our_dups is not None:
+            realized = our_lineups.match_counts(field_lineups)
+            contest['dup_adjust'] = np.asarray(our_dups, dtype=float) - realized
+        return contest
+
+    def field_sketch(self, field_lineups: LineupMatrix, rng, cfg=None) -> FieldSketch:
+        # cfg.field_sketch weighted field lineups; no pilot (or draws) once the sketch holds the whole field
+        cfg = cfg or self.cfg
+        prize_cum = contest_prizes(cfg)[1]
+        n_paid = 1 if prize_cum is None else len(prize_cum) - 1
+        pilot = self.sampler.sample(cfg.sketch_pilot, rng) if cfg.field_sketch < len(field_lineups) else None
+        return build_field_sketch(field_lineups, cfg.field_sketch, rng, pilot, n_paid)
+
+    def expected_value(self, our_lineups, field_lineups, our_dups=None) -> pd.Series:
+        # our_dups: optional expected field copies of each of our lineups (OpponentField.expected_duplicates)
         n_sims = self.cfg.n_sims
-        # Simulate points for all unique players
-        pts = self.simulate_points(n_sims)
-
-        # Scores
-        our_scores = self.lineup_scores(pts, our_lineups)
-        field_scores = self.lineup_scores(pts, field_lineups)
-
-        # For each sim: find best score among field + our 10; tally prize split
-        ev = np.zeros(our_lineups.shape[0], dtype=float)
-
-        for t in range(n_sims):
-            # combine scores
-            all_scores = np.concatenate([our_scores[t], field_scores[t]])
-            top = all_scores.max()
-            # which our lineups tie top?
-            ours_tie = np.where(our_scores[t] >= top - 1e-9)[0]
-            # how many total tied?
-            total_tie = (all_scores >= top - 1e-9).sum()
-
-            if len(ours_tie) > 0:
-                split = self.cfg.prize_first / total_tie
-                ev[ours_tie] += split
-
-        # average across sims
-        return pd.Series(ev / n_sims, index=our_lineups.index, name='EV')
+        index = our_lineups.index if isinstance(our_lineups, pd.DataFrame) else None
+        our_lineups = self._as_matrix(our_lineups)
+        field_lineups = self._as_matrix(field_lineups)
+        if self.cfg.field_sketch > 0:
+            sketch = self.field_sketch(field_lineups, self.sketch_rng)
+            contest = self._contest(our_lineups, sketch.lineups, our_dups)
+            return self._expected_value_sketch(our_lineups, sketch, contest, index)
+        contest = self._contest(our_lineups, field_lineups, our_dups)
+        if self.cfg.n_workers > 1:
+            return self._expected_value_parallel(our_lineups, field_lineups, contest, index)
+        if self.cfg.stream:
+            return self._expected_value_stream(our_lineups, field_lineups, contest, index)
+        if self.cache is None:
+            # same block loop, run to n_sims (early stopping is stream-only)
+            return self._expected_value_stream(our_lineups, field_lineups, contest, index, stop_early=False)
+
+        # same sims, lineups and contest -> reuse the resolved EV outright
+        key = self._points_key(n_sims)
+        ev_name = 'ev_' + array_key(our_lineups.idx, field_lineups.idx, self.cfg.control_variate,
+                                    *(contest[k] for k in sorted(contest)))
+        hit, meta = self.cache.load(key, ev_name), self.cache.load_meta(key)
+        if hit is not None and meta is not None:
+            self._restore_draws(meta['draws_after'])
+            self.sims_completed = n_sims
+            self.ev_se = pd.Series(np.array(hit[1]), index=index, name='EV_SE')
+            self.vr_factor = pd.Series(np.array(hit[2]), index=index, name='VR') if self.cfg.control_variate else None
+            return pd.Series(np.array(hit[0]), index=index, name='EV')
+
+        # score memmaps on disk (built block by block), resolved in blocks of sims
+        our_scores, field_scores = self.cached_scores(n_sims, our_lineups, field_lineups)
+        acc = self._accumulator(our_lineups)
+        block = max(1, int(self.cfg.sim_block_size))
+        for start in range(0, n_sims, block):
+            ours = np.asarray(our_scores[start:start+block])
+            acc.update(_payouts(ours, np.asarray(field_scores[start:start+block]), **contest), ours)
+        out_ev = self._finish(acc, index)
+        out = self.cache.create(key, ev_name, (3, len(our_lineups)), np.float64)
+        out[0], out[1], out[2] = out_ev.to_numpy(), acc.se(), acc.vr_factor()
+        self.cache.commit(key, ev_name, out)
+        return out_ev
+
+    def _stop_early(self, acc: RunningEV, prev_top):
+        # -> (stop?, current top-K set)
+        cfg = self.cfg
+        if cfg.ev_se_target <= 0:
+            return False, None
+        se = acc.se()
+        if cfg.ev_topk > 0:
+            top = np.argsort(-acc.mean(), kind='stable')[:cfg.ev_topk]
+            top_set = frozenset(top.tolist())
+            ok = top_set == prev_top and se[top].max() <= cfg.ev_se_target
+            return ok and acc.n >= cfg.stream_min_sims, top_set
+        return acc.n >= cfg.stream_min_sims and se.max() <= cfg.ev_se_target, None
+
+    def _expected_value_stream(self, our_lineups: LineupMatrix, field_lineups: LineupMatrix, contest: dict, index=None,
+                               stop_early: bool = True) -> pd.Series:
+        # Score block by block: memory is O(block * (ours + field)) regardless of n_sims
+        acc = self._accumulator(our_lineups)
+        prev_top = None
+        for pts in self.iter_sim_blocks(self.cfg.n_sims):
+            our_scores = our_lineups.scores(pts)
+            acc.update(_payouts(our_scores, field_lineups.scores(pts), **contest), our_scores)
+            if stop_early:
+                stop, prev_top = self._stop_early(acc, prev_top)
+                if stop:
+                    break
+        return self._finish(acc, index)
+
+    def _expected_value_sketch(self, our_lineups: LineupMatrix, sketch: FieldSketch, contest: dict, index=None) -> pd.Series:
+        # Block by block, but only the sketch is scored: cost follows cfg.field_sketch, not the field
+        # (early stopping with stream=True, as in _expected_value_stream)
+        prize_cum = contest['prize_cum']
+        if prize_cum is None:
+            prize_cum = prize_curve(((1, 1, contest['prize']),))
+        acc = self._accumulator(our_lineups)
+        low = np.zeros(len(our_lineups))
+        high = np.zeros(len(our_lineups))
+        prev_top = None
+        for pts in self.iter_sim_blocks(self.cfg.n_sims):
+            our_scores = our_lineups.scores(pts)
+            est, lo, hi = sketch_payouts(our_scores, sketch.lineups.scores(pts), sketch,
+                                         prize_cum, contest['dup_adjust'], self.cfg.sketch_z)
+            acc.update(est, our_scores)
+            low += lo.sum(axis=0)
+            high += hi.sum(axis=0)
+            if self.cfg.stream:
+                stop, prev_top = self._stop_early(acc, prev_top)
+                if stop:
+                    break
+        # the band brackets the plain (uncontrolled) sketch estimate
+        self.ev_band = pd.DataFrame({'EV_low': low / max(acc.n, 1), 'EV_high': high / max(acc.n, 1)}, index=index)
+        return self._finish(acc, index)
+
+    def _expected_value_parallel(self, our_lineups: LineupMatrix, field_lineups: LineupMatrix, contest: dict, index=None) -> pd.Series:
+        from .parallel import sharded_expected_value  # lazy: parallel imports this module
+        acc = sharded_expected_value(self, our_lineups, field_lineups, contest)
+        return self._finish(acc, index)
+
+    def _score_blocks(self, n_sims: int, our_lineups: LineupMatrix, field_lineups: LineupMatrix, our_out: np.ndarray):
+        # fresh sims block by block: our scores go into our_out, yields (start, field scores)
+        start = 0
+        for pts in self.iter_sim_blocks(n_sims):
+            our_out[start:start+len(pts)] = our_lineups.scores(pts)
+            yield start, field_lineups.scores(pts)
+            start += len(pts)
+
+    def selection_sims(self, our_lineups, field_lineups, n_sims: int = None) -> SimScores:
+        # Fresh sims for PortfolioOptimizer's joint (cannibalization-aware) selection
+        n_sims = n_sims or self.cfg.select_sims
+        our_lineups = self._as_matrix(our_lineups)
+        field_lineups = self._as_matrix(field_lineups)
+        count = field_lineups.multiplicity().astype(float)
+        cached = self.cached_scores(n_sims, our_lineups, field_lineups)
+        if cached is None:
+            our_scores = np.empty((n_sims, len(our_lineups)), dtype=self.sampler.dtype)
+            blocks = self._score_blocks(n_sims, our_lineups, field_lineups, our_scores)
+        else:
+            our_scores, field_scores = cached
+            block = max(1, int(self.cfg.sim_block_size))
+            blocks = ((start, np.asarray(field_scores[start:start+block])) for start in range(0, n_sims, block))
+        field_max = np.full(n_sims, -np.inf)
+        field_ties = np.zeros(n_sims)
+        for start, fs in blocks:
+            if fs.shape[1]:
+                stop = start + len(fs)
+                field_max[start:stop], field_ties[start:stop] = _field_top(fs, count)
+        return SimScores(our_scores, field_max, field_ties, contest_prizes(self.cfg)[0], our_lineups.match_counts(field_lineups))
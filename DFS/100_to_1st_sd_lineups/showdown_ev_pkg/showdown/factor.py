@@ -0,0 +1,124 @@
+import re
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+_MAX_SHARED = 0.98   # cap on a player's shared variance (sum of squared loadings)
+_RB_RECV_SHARE = 0.2   # RB targets / (targets + carries) when the projection has no stat lines
+
+@dataclass
+class FactorCorrelation:
+    """Low-rank copula: latent_i = loadings[i] @ F + resid[i] * eps_i, with F ~ N(0, I_k).
+
+    Implied correlation = loadings @ loadings.T off the diagonal, 1 on it; it is PSD by
+    construction, so there is nothing to repair, and a sim costs O(n * k) instead of O(n^2).
+    """
+    loadings: np.ndarray   # (n_players, k)
+    resid: np.ndarray      # (n_players,) idiosyncratic sd, sqrt(1 - row sum of squares)
+    factors: list          # factor names, e.g. 'game:CHI@MIN', 'team:CHI', 'script:CHI'
+
+    def __len__(self) -> int:
+        return len(self.resid)
+
+    def dense(self) -> np.ndarray:
+        # the implied n x n correlation matrix (for inspection / comparison only)
+        C = self.loadings @ self.loadings.T
+        np.fill_diagonal(C, 1.0)
+        return C
+
+    def copy(self) -> 'FactorCorrelation':
+        return FactorCorrelation(self.loadings.copy(), self.resid.copy(), list(self.factors))
+
+def opponents(players_df: pd.DataFrame) -> dict:
+    """team -> opponent, from an 'Opp' column, DK 'Game' info ('MIN@CHI ...'), or a two-team slate.
+
+    Teams with no known opponent get None (their own game factor)."""
+    teams = list(dict.fromkeys(players_df['Team'].astype(str)))
+    opp = {t: None for t in teams}
+    if 'Opp' in players_df:
+        for t, o in zip(players_df['Team'].astype(str), players_df['Opp']):
+            if isinstance(o, str) and o:
+                opp[t] = o
+    elif 'Game' in players_df:
+        for g in players_df['Game'].dropna().astype(str):
+            m = re.match(r'\s*([A-Za-z]+)@([A-Za-z]+)', g)
+            if m:
+                a, b = m.groups()
+                opp[a], opp[b] = b, a
+    if len(teams) == 2 and all(v is None for v in opp.values()):
+        opp = {teams[0]: teams[1], teams[1]: teams[0]}
+    return opp
+
+def factor_loadings(players_df: pd.DataFrame, cfg) -> FactorCorrelation:
+    """Game-factor copula with loadings derived from the correlation knobs.
+
+    Factors: one per game (total / pace) and, per team, scoring and game script (+ pass-heavy, - run-heavy).
+      offense  team: a = sqrt(base_same_team - cross_team_baseline), game: c = sqrt(cross_team_baseline),
+               so same-team offense correlates at base_same_team and opposing offense at the baseline
+      script   QB +p_qb, WR/TE +p_rec with p_qb * p_rec = qb_receiver_boost; the QB takes as much
+               as its row allows so receiver pairs pick up the least (p_rec^2) on top of base_same_team.
+               RB p_rec * (receiving - rushing share of its volume): catches on the pass side, carries on the run side
+      DST      opposing team -d with d * a = -dst_vs_opp_offense; own team +s with 2 s d = -dsts_mutual
+      K        game c, own team k with k * a + c^2 = base_same_team + k_vs_offense
+    One factor set cannot carry every pair of the dense heuristic: receiver pairs, DST vs its own
+    offense and K vs the opposing DST (-k * d) drift from it. Rows whose shared variance would pass
+    _MAX_SHARED are scaled down.
+    """
+    team = players_df['Team'].astype(str).to_numpy()
+    pos = players_df['Pos'].astype(str).str.upper().to_numpy()
+    opp = opponents(players_df)
+
+    games, factors = {}, []
+    for t in dict.fromkeys(team):
+        o = opp.get(t)
+        gkey = '@'.join(sorted([t, o])) if o else t
+        if gkey not in games:
+            games[gkey] = len(factors)
+            factors.append(f"game:{gkey}")
+    team_f = {}
+    for t in dict.fromkeys(list(team) + [o for o in opp.values() if o]):
+        team_f[t] = len(factors)
+        factors += [f"team:{t}", f"script:{t}"]
+
+    cross = max(cfg.cross_team_baseline, 0.0)
+    c = np.sqrt(cross)
+    a = np.sqrt(max(cfg.base_same_team - cross, 1e-6))
+    boost = max(cfg.qb_receiver_boost, 0.0)
+    p_qb = np.sqrt(max(0.9 - cfg.base_same_team, boost))
+    p_rec = boost / p_qb if p_qb > 0 else 0.0
+    d = min(max(-cfg.dst_vs_opp_offense, 0.0) / a, 0.9)
+    s = min(max(-cfg.dsts_mutual, 0.0) / (2 * d), 0.5) if d > 0 else 0.0
+    k = (cfg.base_same_team + cfg.k_vs_offense - cross) / a
+
+    if 'recvTgts' in players_df and 'rushAtts' in players_df:
+        tgt = players_df['recvTgts'].to_numpy(dtype=float)
+        vol = tgt + players_df['rushAtts'].to_numpy(dtype=float)
+        recv = np.where(vol > 0, tgt / np.where(vol > 0, vol, 1.0), _RB_RECV_SHARE)
+    else:
+        recv = np.full(len(team), _RB_RECV_SHARE)
+
+    L = np.zeros((len(team), len(factors)))
+    for i, (t, p) in enumerate(zip(team, pos)):
+        o = opp.get(t)
+        g = games['@'.join(sorted([t, o])) if o else t]
+        tf, pf = team_f[t], team_f[t] + 1
+        if p in ('QB', 'RB', 'WR', 'TE'):
+            L[i, g], L[i, tf] = c, a
+            if p == 'QB':
+                L[i, pf] = p_qb
+            elif p == 'RB':
+                L[i, pf] = p_rec * (2 * recv[i] - 1)   # recv - (1 - recv)
+            else:
+                L[i, pf] = p_rec
+        elif p == 'DST':
+            L[i, tf] = s
+            if o:
+                L[i, team_f[o]] = -d
+        elif p == 'K':
+            L[i, g], L[i, tf] = c, k
+    shared = (L ** 2).sum(axis=1)
+    over = shared > _MAX_SHARED
+    L[over] *= np.sqrt(_MAX_SHARED / shared[over])[:, None]
+    resid = np.sqrt(1.0 - (L ** 2).sum(axis=1))
+    return FactorCorrelation(L, resid, factors)
@@ -1,15 +1,21 @@
 import numpy as np
 import pandas as pd
-from itertools import combinations
-from .lineup import is_valid_lineup, apply_cpt_salary
+from .lineup import batch_validate, first_unique_rows, LineupMatrix
+from .enumeration import iter_lineups, top_lineups
+from .search import CandidateSearch
+
+_TRIAL_BATCH = 2048   # flex combos sampled + validated per vectorized pass
 
 class CandidateGenerator:
     def __init__(self, df: pd.DataFrame, cfg):
-        self.df = df.reset_index(drop=True)
+        self.pool = df.reset_index(drop=True)
+        self.df = self.pool.copy()
         self.cfg = cfg
         self.rng = np.random.default_rng(cfg.rng_seed)
+        self.stats = {}   # counters from the last generate() (see instrument.py)
 
-        # Precompute p50 and ranks
+        # Precompute p50 and ranks; 'pid' keeps each player's index into the pool
+        self.df['pid'] = np.arange(len(self.df))
         self.df['p50'] = self.df.get('p050', self.df['ProjPts'])
         self.df.sort_values('p50', ascending=False, inplace=True)
         self.df.reset_index(drop=True, inplace=True)
@@ -34,44 +40,87 @@ class CandidateGenerator:
         leave_salary_max = leave_salary_max if leave_salary_max is not None else self.cfg.leave_salary_max
         target_min_salary = max_salary - leave_salary_max
 
+        if self.cfg.candidate_mode == "enumerate":
+            out = self.enumerate(max_salary, max_salary - leave_salary_max)
+            self.stats = dict(mode='enumerate', candidates=len(out))
+            return out
+        if self.cfg.candidate_mode == "search":
+            raise ValueError("candidate_mode='search' scores lineups on simulated points: use search(sim, field)")
+
         cpt_candidates, flex_pool = self._filtered_pool()
 
-        # Pre-index by player for quick lookups
-        by_name = self.df.set_index('Player')
+        # Player-index arrays for the vectorized validator
+        salary = self.pool['Salary'].to_numpy(dtype=np.int64)
+        team_id = pd.factorize(self.pool['Team'])[0]
+        cpt_ids = cpt_candidates['pid'].to_numpy()
+        flex_ids = flex_pool['pid'].to_numpy()
 
-        # Build candidate flex combinations with pruning via simple greedy sampling
-        names = flex_pool['Player'].tolist()
-        candidates = set()
+        # Randomly bias toward higher p50: Gumbel top-5 == weighted draw of 5 without replacement
+        probs = np.clip(np.nan_to_num(flex_pool['p50'].to_numpy(dtype=float)), 0, None)
+        with np.errstate(divide='ignore'):
+            logp = np.log(probs / probs.sum())
 
         # We'll sample combinations rather than brute-force all C( |pool|, 5 )
         trials = n_samples or self.cfg.candidate_pool_size * 5
+        target = self.cfg.candidate_pool_size
+        candidates = {}
+        done = 0
+        n_pairs = n_valid = n_dups = 0
+        while done < trials and len(candidates) < target:
+            b = min(_TRIAL_BATCH, trials - done)
+            done += b
+            keys = logp[None, :] + self.rng.gumbel(size=(b, len(flex_ids)))
+            picks = np.argpartition(-keys, 4, axis=1)[:, :5]
+            flex = np.sort(flex_ids[picks], axis=1)
 
-        for _ in range(trials):
-            # Randomly bias toward higher p50
-            probs = flex_pool['p50'].to_numpy()
-            probs = probs / probs.sum()
-            picks = self.rng.choice(len(names), size=5, replace=False, p=probs)
-            flex_names = [names[i] for i in picks]
-
-            # Loop CPTs
-            for _, row in cpt_candidates.iterrows():
-                cpt = row['Player']
-                ok, sal, teams = is_valid_lineup(flex_names, cpt, by_name.reset_index(), max_salary)
-                if not ok: 
-                    continue
-                if sal < target_min_salary: 
-                    continue
-                lineup_key = (cpt,) + tuple(sorted(flex_names))
-                candidates.add(lineup_key)
-                if len(candidates) >= self.cfg.candidate_pool_size:
+            # every sampled flex combo against every CPT in one pass
+            ok, _ = batch_validate(cpt_ids, flex, salary, team_id, max_salary, target_min_salary)
+            rows, cols = np.nonzero(ok)   # row-major: same (trial, CPT) order as a nested loop
+            n_pairs += ok.size
+            n_valid += len(rows)
+            if len(rows) == 0:
+                continue
+            lineups = np.column_stack([cpt_ids[cols], flex[rows]]).astype(np.uint16)
+            uniq = lineups[first_unique_rows(lineups)]
+            n_dups += len(lineups) - len(uniq)
+            for row in uniq:
+                n_dups += row.tobytes() in candidates
+                candidates.setdefault(row.tobytes(), row)
+                if len(candidates) >= target:
                     break
-            if len(candidates) >= self.cfg.candidate_pool_size:
-                break
-
-        # Return as DataFrame
-        out = []
-        for key in candidates:
-            cpt = key[0]; flex = key[1:]
-            sal = apply_cpt_salary(int(by_name.loc[cpt,'Salary'])) + int(by_name.loc[list(flex),'Salary'].sum())
-            out.append({'CPT': cpt, 'FLEX1': flex[0], 'FLEX2': flex[1], 'FLEX3': flex[2], 'FLEX4': flex[3], 'FLEX5': flex[4], 'Salary': sal})
-        return pd.DataFrame(out)
+        self.stats = dict(mode='sample', trials=done, pairs_checked=n_pairs, valid=n_valid,
+                          acceptance_rate=n_valid / max(n_pairs, 1), duplicates=n_dups, candidates=len(candidates))
+
+        # Return as index matrix (CPT first, FLEX sorted by pool index)
+        idx = np.array(list(candidates.values()), dtype=np.uint16).reshape(-1, 6)
+        return LineupMatrix.from_indices(idx, self.pool)
+
+    def search(self, sim, field_lineups: LineupMatrix) -> LineupMatrix:
+        # Cross-entropy + local search on the EVSimulator's copula against the sampled field
+        search = CandidateSearch(self.pool, sim, field_lineups, self.cfg)
+        out = search.run()
+        self.stats = dict(mode='search', **search.stats)
+        return out
+
+    def enumerate(self, max_salary: int=None, min_salary: int=None, top_n: int=None) -> LineupMatrix:
+        # Every legal lineup over the full pool (no sampling); optionally only the best top_n
+        max_salary = max_salary or self.cfg.max_salary
+        if min_salary is None:
+            min_salary = max_salary - self.cfg.leave_salary_max
+        top_n = self.cfg.enum_top_n if top_n is None else top_n
+        salary = self.pool['Salary'].to_numpy(dtype=np.int64)
+        team_id = pd.factorize(self.pool['Team'])[0]
+        blocks = iter_lineups(salary, team_id, max_salary, min_salary)
+        if top_n and top_n > 0:
+            idx, _ = top_lineups(blocks, self._rank_values(), top_n)
+        else:
+            idx = np.concatenate(list(blocks) or [np.empty((0, 6), dtype=np.uint16)])
+        return LineupMatrix.from_indices(idx, self.pool)
+
+    def _rank_values(self) -> np.ndarray:
+        # per-player value used to rank enumerated lineups (pool order)
+        if self.cfg.enum_rank_by == "ceiling" and 'p090' in self.pool:
+            col = self.pool['p090']
+        else:
+            col = self.pool['ProjPts']
+        return np.nan_to_num(col.to_numpy(dtype=float))
@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+
+from .percentiles import QuantileSampler
+from .ev import _payouts
+
+class IncrementalEV:
+    """One slate's sims kept in memory so late news re-simulates only what it touches.
+
+    The correlated uniforms U are drawn once. A projection change remaps that player's column
+    of U through the new quantile sampler (a ruled-out player scores 0), only lineups holding
+    the player are rescored, and payouts are re-resolved over the stored score matrices. The
+    same sims are reused, so EVs stay comparable across updates, and match a fresh run with
+    the same seed and inputs.
+    """
+    def __init__(self, sim, our_lineups, field_lineups, our_dups=None, n_sims: int = None):
+        if not hasattr(sim.sampler, 'points_from_uniforms'):
+            raise ValueError("IncrementalEV remaps copula uniforms: needs mode='quantile'")
+        self.sim = sim
+        self.index = our_lineups.index if isinstance(our_lineups, pd.DataFrame) else None
+        self.ours = sim._as_matrix(our_lineups)
+        self.field = sim._as_matrix(field_lineups)
+        self.contest = sim._contest(self.ours, self.field, our_dups)
+        n_sims = n_sims or sim.cfg.n_sims
+        self.U = sim._correlated_uniforms(n_sims)
+        self.pts = sim.sampler.points_from_uniforms(self.U)
+        self.our_scores = self.ours.scores(self.pts)
+        self.field_scores = self.field.scores(self.pts)
+        # lineups holding each player: player -> row indices
+        self._our_rows = self._rows_by_player(self.ours)
+        self._field_rows = self._rows_by_player(self.field)
+        self.ev_se = None
+        self.ev = self._resolve()
+
+    def _rows_by_player(self, lineups):
+        W = lineups.weights().tocsc()
+        return [W.indices[W.indptr[j]:W.indptr[j+1]] for j in range(W.shape[1])]
+
+    def _resolve(self) -> pd.Series:
+        # control means follow the current quantile tables, so late news updates them too
+        acc = self.sim._accumulator(self.ours)
+        block = max(1, int(self.sim.cfg.sim_block_size))
+        for start in range(0, len(self.U), block):
+            stop = start + block
+            acc.update(_payouts(self.our_scores[start:stop], self.field_scores[start:stop], **self.contest),
+                       self.our_scores[start:stop])
+        self.ev_se = pd.Series(acc.se(), index=self.index, name='EV_SE')
+        return pd.Series(acc.mean(), index=self.index, name='EV')
+
+    def update_players(self, news: dict) -> pd.Series:
+        """Apply late news and return the new EV.
+
+        news: player name -> percentiles dict (p000..p100, as in the merged pool) for a changed
+        projection, or None for a player ruled out.
+        """
+        sim = self.sim
+        cols = []
+        for name, pct in news.items():
+            j = sim.idx_by_name[name]
+            # ruled out: a degenerate zero sampler, so sim.samplers stays in step with the table
+            sampler = QuantileSampler({} if pct is None else pct)
+            sim.samplers[j] = sampler
+            sim.sampler.set_player(j, sampler)
+            cols.append(j)
+        if not cols:
+            return self.ev
+        self.pts[:, cols] = sim.sampler.points_from_uniforms(self.U[:, cols], players=cols)
+        for lineups, scores, rows in ((self.ours, self.our_scores, self._our_rows),
+                                      (self.field, self.field_scores, self._field_rows)):
+            hit = np.unique(np.concatenate([rows[j] for j in cols]))
+            if len(hit):
+                scores[:, hit] = lineups.take(hit).scores(self.pts)
+        self.ev = self._resolve()
+        return self.ev
+
+    def rule_out(self, *players) -> pd.Series:
+        return self.update_players({p: None for p in players})
@@ -0,0 +1,104 @@
+import json
+import os
+import platform
+import subprocess
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+# Components keep plain counter dicts (CandidateGenerator.stats, OpponentField.stats,
+# EVSimulator.stats, PortfolioOptimizer.stats) that cost a few integer adds per batch and are
+# always on; an Instrument adds per-stage timers, optional peak memory and hooks around them.
+
+def environment() -> dict:
+    # versions and machine, to tell runs apart when comparing reports
+    try:
+        rev = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        rev = ''
+    import scipy
+    return dict(time=time.strftime('%Y-%m-%dT%H:%M:%S'), git_rev=rev, python=platform.python_version(),
+                numpy=np.__version__, pandas=pd.__version__, scipy=scipy.__version__,
+                cpu_count=os.cpu_count(), machine=platform.machine(), system=platform.system())
+
+def _peak_rss_mb():
+    try:
+        import resource
+    except ImportError:   # Windows
+        return None
+    kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return kb / 2**20 if platform.system() == 'Darwin' else kb / 2**10   # bytes on macOS, KiB elsewhere
+
+def _jsonable(x):
+    if isinstance(x, dict):
+        return {str(k): _jsonable(v) for k, v in x.items()}
+    if isinstance(x, (list, tuple)):
+        return [_jsonable(v) for v in x]
+    if isinstance(x, np.generic):
+        return x.item()
+    if isinstance(x, np.ndarray):
+        return x.tolist()
+    return x
+
+class Instrument:
+    """Stage timers, counters and callbacks for one pipeline run, reported as JSON.
+
+    with inst.stage('candidates') as rec: ...; rec.update(gen.stats) records wall time (and,
+    with memory=True, tracemalloc's peak during the stage) plus whatever counters the stage adds.
+    Each hook is called as hook(event, stage, record) with event 'start' (record holds only the
+    name) and 'end' (record complete). A disabled Instrument only hands out a scratch dict.
+    """
+    def __init__(self, hooks=(), memory: bool = False, enabled: bool = True):
+        self.hooks = list(hooks)
+        self.memory = memory
+        self.enabled = enabled
+        self.stages = []
+        self.info = {}    # run-level fields (config, slate size, ...)
+
+    @contextmanager
+    def stage(self, name: str):
+        rec = {'stage': name}
+        if not self.enabled:
+            yield rec
+            return
+        for hook in self.hooks:
+            hook('start', name, rec)
+        traced = self.memory and not tracemalloc.is_tracing()
+        if traced:
+            tracemalloc.start()
+        elif self.memory:
+            tracemalloc.reset_peak()
+        t = time.perf_counter()
+        try:
+            yield rec
+        finally:
+            rec['seconds'] = time.perf_counter() - t
+            if self.memory:
+                rec['peak_mb'] = tracemalloc.get_traced_memory()[1] / 2**20
+                if traced:
+                    tracemalloc.stop()
+            self.stages.append(rec)
+            for hook in self.hooks:
+                hook('end', name, rec)
+
+    def report(self) -> dict:
+        return _jsonable(dict(environment=environment(), **self.info, stages=self.stages,
+                              total_seconds=sum(r.get('seconds', 0.0) for r in self.stages),
+                              peak_rss_mb=_peak_rss_mb()))
+
+    def save(self, path: str):
+        with open(path, 'w') as f:
+            json.dump(self.report(), f, indent=1)
+
+DISABLED = Instrument(enabled=False)
+
+def print_hook(event, stage, rec):
+    # ready-made hook: one line per finished stage
+    if event == 'end':
+        extra = ' '.join(f"{k}={v:.4g}" if isinstance(v, float) else f"{k}={v}"
+                         for k, v in rec.items() if k not in ('stage', 'seconds'))
+        print(f"{stage:<15} {rec['seconds']:8.3f}s {extra}")
@@ -1,7 +1,8 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import List, Dict, Tuple
 import numpy as np
 import pandas as pd
+import scipy.sparse as sp
 
 ALLOWED_POS = {'QB','WR','RB','TE','K','DST'}
 
@@ -13,9 +14,116 @@ class Lineup:
     teams: Tuple[str,...] # teams present
     players: Tuple[str,...] # all 6 names (CPT duplicates prevented upstream)
 
+CPT_MULT = 1.5
+SLOT_COLS = ['CPT','FLEX1','FLEX2','FLEX3','FLEX4','FLEX5']
+
+@dataclass
+class LineupMatrix:
+    """Array-backed lineups. Row k of `idx` holds player-pool indices: column 0 is the CPT, 1..5 the FLEX."""
+    idx: np.ndarray       # (n_lineups, 6) uint16 indices into the player pool
+    salary: np.ndarray    # (n_lineups,) int32 total salary (CPT at 1.5x)
+    own: np.ndarray       # (n_lineups,) summed Total Rate of the 6 players
+    names: np.ndarray     # (n_players,) player names the indices refer to
+    count: np.ndarray = None  # (n_lineups,) multiplicities, e.g. how often the field played each row (None = 1 each)
+    _w: object = field(default=None, init=False, repr=False, compare=False)
+
+    @classmethod
+    def from_indices(cls, idx, players_df: pd.DataFrame) -> 'LineupMatrix':
+        # players_df row order defines the index space (expects a reset index)
+        idx = np.asarray(idx, dtype=np.uint16).reshape(-1, 6)
+        sal = players_df['Salary'].to_numpy(dtype=np.int64)
+        rate = players_df['Total Rate'].fillna(0.0).to_numpy(dtype=float) if 'Total Rate' in players_df else np.zeros(len(players_df))
+        cpt_sal = cpt_salaries(sal[idx[:, 0]])
+        salary = (cpt_sal + sal[idx[:, 1:]].sum(axis=1)).astype(np.int32)
+        own = rate[idx].sum(axis=1)
+        return cls(idx, salary, own, players_df['Player'].to_numpy())
+
+    @classmethod
+    def from_frame(cls, lineups_df: pd.DataFrame, players_df: pd.DataFrame) -> 'LineupMatrix':
+        # Accepts CPT/FLEX1..FLEX5 columns or CPT + a FLEX tuple column
+        pos = {nm: i for i, nm in enumerate(players_df['Player'])}
+        if 'FLEX1' in lineups_df:
+            rows = lineups_df[SLOT_COLS].to_numpy()
+        else:
+            rows = [[r[0]] + list(r[1]) for r in zip(lineups_df['CPT'], lineups_df['FLEX'])]
+        idx = np.array([[pos[nm] for nm in r] for r in rows], dtype=np.uint16).reshape(-1, 6)
+        return cls.from_indices(idx, players_df)
+
+    def __len__(self) -> int:
+        return self.idx.shape[0]
+
+    def take(self, rows) -> 'LineupMatrix':
+        rows = np.asarray(rows, dtype=np.intp)
+        count = None if self.count is None else self.count[rows]
+        return LineupMatrix(self.idx[rows], self.salary[rows], self.own[rows], self.names, count)
+
+    def multiplicity(self) -> np.ndarray:
+        return np.ones(len(self), dtype=np.int64) if self.count is None else self.count
+
+    def n_entries(self) -> int:
+        return int(self.multiplicity().sum())
+
+    def collapse(self) -> 'LineupMatrix':
+        # unique rows with summed multiplicities (first-occurrence order)
+        if len(self) == 0:
+            return self
+        _, first, inv = np.unique(self.idx, axis=0, return_index=True, return_inverse=True)
+        counts = np.bincount(inv.ravel(), weights=self.multiplicity(), minlength=len(first)).astype(np.int64)
+        order = np.argsort(first, kind='stable')
+        out = self.take(first[order])
+        out.count = counts[order]
+        return out
+
+    def match_counts(self, other: 'LineupMatrix') -> np.ndarray:
+        # for each of our rows: how many entries of `other` are the exact same lineup
+        mult = {}
+        for row, c in zip(other.idx, other.multiplicity()):
+            key = row.tobytes()
+            mult[key] = mult.get(key, 0) + float(c)
+        return np.array([mult.get(row.tobytes(), 0) for row in self.idx], dtype=float)
+
+    def member_masks(self) -> np.ndarray:
+        # (n_lineups, n_words) uint64 player-membership bitsets; overlap = popcount(a & b)
+        n_words = max(1, (len(self.names) + 63) // 64)
+        masks = np.zeros((len(self), n_words), dtype=np.uint64)
+        idx = self.idx.astype(np.int64)
+        rows = np.repeat(np.arange(len(self)), 6)
+        bits = np.left_shift(np.uint64(1), (idx % 64).astype(np.uint64)).ravel()
+        np.bitwise_or.at(masks, (rows, (idx // 64).ravel()), bits)
+        return masks
+
+    def weights(self) -> sp.csr_matrix:
+        # (n_lineups, n_players) slot weights: CPT_MULT on the captain, 1 on each FLEX
+        if self._w is None:
+            n = len(self)
+            vals = np.tile(np.array([CPT_MULT, 1, 1, 1, 1, 1], dtype=float), n)
+            indptr = np.arange(0, 6*n + 1, 6)
+            self._w = sp.csr_matrix((vals, self.idx.ravel().astype(np.int64), indptr), shape=(n, len(self.names)))
+        return self._w
+
+    def scores(self, pts: np.ndarray) -> np.ndarray:
+        """Lineup points for every sim: (n_sims, n_players) -> (n_sims, n_lineups)."""
+        W = self.weights()
+        if W.dtype != pts.dtype:
+            W = W.astype(pts.dtype)
+        return (W @ pts.T).T
+
+    def to_frame(self) -> pd.DataFrame:
+        out = pd.DataFrame(self.names[self.idx], columns=SLOT_COLS)
+        out['Salary'] = self.salary.astype(int)
+        return out
+
+def popcount(x: np.ndarray) -> np.ndarray:
+    # bit count per uint64 element
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(x)
+    x = np.ascontiguousarray(x, dtype=np.uint64)
+    bits = np.unpackbits(x.view(np.uint8).reshape(x.shape + (8,)), axis=-1)
+    return bits.sum(axis=-1)
+
 def apply_cpt_salary(base_salary: int) -> int:
     # EXACT 1.5x (no rounding beyond int)
-    return int(round(1.5 * base_salary))
+    return int(round(CPT_MULT * base_salary))
 
 def is_valid_lineup(names: List[str], cpt_name: str, df: pd.DataFrame, max_salary: int) -> Tuple[bool,int,Tuple[str,...]]:
     # Ensure no duplicate CPT in flex, both teams present, salary cap
@@ -31,6 +139,46 @@ def is_valid_lineup(names: List[str], cpt_name: str, df: pd.DataFrame, max_salar
         return False, salary, ()
     return True, salary, tuple(teams)
 
+def cpt_salaries(salary: np.ndarray) -> np.ndarray:
+    # vectorized apply_cpt_salary
+    return np.round(CPT_MULT * np.asarray(salary, dtype=np.int64)).astype(np.int64)
+
+def batch_validate(cpt: np.ndarray, flex: np.ndarray, salary: np.ndarray, team_id: np.ndarray,
+                   max_salary: int, min_salary: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+    """Vectorized is_valid_lineup over every (flex combo, captain) pair.
+
+    cpt: (K,) captain indices; flex: (B, 5) distinct flex indices; salary/team_id: per-player arrays.
+    Returns ok (B, K) and total salary (B, K). ok also enforces the min_salary floor.
+    """
+    flex_sal = salary[flex].sum(axis=1)
+    total = flex_sal[:, None] + cpt_salaries(salary[cpt])[None, :]
+    # CPT may not also be a FLEX
+    dup = (flex[:, :, None] == cpt[None, None, :]).any(axis=1)
+    # both teams present: the flex already spans 2 teams, or the CPT is from the other one
+    ft = team_id[flex]
+    lo, hi = ft.min(axis=1), ft.max(axis=1)
+    two_teams = (lo != hi)[:, None] | (team_id[cpt][None, :] != lo[:, None])
+    ok = ~dup & two_teams & (total <= max_salary) & (total >= min_salary)
+    return ok, total
+
+def validate_rows(idx: np.ndarray, salary: np.ndarray, team_id: np.ndarray,
+                  max_salary: int, min_salary: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+    # Row-wise is_valid_lineup for (B, 6) index rows (CPT first) -> ok (B,), total salary (B,)
+    total = cpt_salaries(salary[idx[:, 0]]) + salary[idx[:, 1:]].sum(axis=1)
+    srt = np.sort(idx, axis=1)
+    distinct = (np.diff(srt, axis=1) != 0).all(axis=1)
+    t = team_id[idx]
+    two_teams = (t != t[:, :1]).any(axis=1)
+    ok = distinct & two_teams & (total <= max_salary) & (total >= min_salary)
+    return ok, total
+
+def first_unique_rows(idx: np.ndarray) -> np.ndarray:
+    # positions of the first occurrence of each distinct row, in original order
+    if len(idx) == 0:
+        return np.empty(0, dtype=np.intp)
+    _, first = np.unique(idx, axis=0, return_index=True)
+    return np.sort(first)
+
 def validate_player_pool(df: pd.DataFrame) -> pd.DataFrame:
     # Filter to allowed positions and players expected active
     df = df[df['Pos'].isin(ALLOWED_POS)].copy()
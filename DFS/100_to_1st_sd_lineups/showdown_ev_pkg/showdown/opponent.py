@@ -1,12 +1,18 @@
 import numpy as np
 import pandas as pd
-from .lineup import is_valid_lineup, apply_cpt_salary
+from .lineup import validate_rows, first_unique_rows, LineupMatrix
+from .enumeration import iter_lineups, top_lineups
+
+_SAMPLE_BATCH = 4096    # ownership samples drawn + validated per vectorized pass
+_ENTRANT_CHUNK = 256    # model "B" entrants optimized per pass
+_B_POOL_MAX = 50000     # model "B" optimizes over at most this many lineups (best by projection)
 
 class OpponentField:
     def __init__(self, players_df: pd.DataFrame, cfg):
         self.df = players_df.reset_index(drop=True)
         self.cfg = cfg
         self.rng = np.random.default_rng(cfg.rng_seed)
+        self.stats = {}   # counters from the last bank / field build (see instrument.py)
 
         # Rates used for sampling
         self.cpt_rates = np.clip(self.df['CPT Rate'].fillna(0.0).to_numpy(), 0, None)
@@ -21,57 +27,92 @@ class OpponentField:
         self.cpt_rates = self.cpt_rates / (self.cpt_rates.sum() + 1e-9)
         self.flex_rates = self.flex_rates / (self.flex_rates.sum() + 1e-9)
 
-    def _sample_lineup_by_rates(self):
-        names = self.df['Player'].tolist()
-        # pick CPT by CPT rates
-        cpt_idx = self.rng.choice(len(names), p=self.cpt_rates)
-        cpt = names[cpt_idx]
-
-        # pick flex by FLEX rates without replacement
-        # to encourage diversity, draw more than 5 then keep top-5 unique by descending draw prob * random
-        idxs = self.rng.choice(len(names), size=8, replace=False, p=self.flex_rates)
-        flex = []
-        for i in idxs:
-            if names[i]==cpt: continue
-            flex.append(names[i])
-            if len(flex)==5: break
-        if len(flex)<5:
-            # fallback: fill randomly
-            remaining = [n for n in names if n not in flex and n!=cpt]
-            self.rng.shuffle(remaining)
-            flex += remaining[:5-len(flex)]
+        self.salary = self.df['Salary'].to_numpy(dtype=np.int64)
+        self.team_id = pd.factorize(self.df['Team'])[0]
 
-        # check validity
-        ok, sal, teams = is_valid_lineup(flex, cpt, self.df, self.cfg.max_salary)
-        if not ok: return None
-        return (cpt, tuple(sorted(flex)), sal)
+    def _sample_by_rates(self, n: int) -> np.ndarray:
+        # n ownership lineups at once -> (n, 6) indices, CPT first, FLEX ascending (not yet validated)
+        n_players = len(self.df)
+        cpt = self.rng.choice(n_players, size=n, p=self.cpt_rates / self.cpt_rates.sum())
+        # FLEX by FLEX rates without replacement (Gumbel top-5) with the CPT excluded;
+        # zero-rate players only get in as a random fill when too few rated ones remain
+        with np.errstate(divide='ignore'):
+            logw = np.where(self.flex_rates > 0, np.log(self.flex_rates), -1e9)
+        keys = logw[None, :] + self.rng.gumbel(size=(n, n_players))
+        keys[np.arange(n), cpt] = -np.inf
+        flex = np.sort(np.argpartition(-keys, 4, axis=1)[:, :5], axis=1)
+        return np.column_stack([cpt, flex])
 
-    def bank_field_lineups(self, bank_size=None):
+    def bank_field_lineups(self, bank_size=None) -> LineupMatrix:
         bank_size = bank_size or self.cfg.field_portfolio_size
-        seen = set()
-        bank = []
-        tries = 0
-        while len(bank) < bank_size and tries < bank_size*20:
-            line = self._sample_lineup_by_rates()
-            tries += 1
-            if line is None: 
-                continue
-            key = (line[0], line[1])
-            if key in seen: 
-                continue
-            seen.add(key)
-            bank.append({'CPT': line[0], 'FLEX': line[1], 'Salary': line[2]})
-        return pd.DataFrame(bank)
+        if self.cfg.field_model == "B":
+            return self._bank_optimizer_like(bank_size)
+
+        # Model "A": batched ownership sampling, validated and de-duplicated per batch
+        seen = {}
+        tries = n_valid = 0
+        while len(seen) < bank_size and tries < bank_size*20:
+            b = min(_SAMPLE_BATCH, bank_size*20 - tries)
+            rows = self._sample_by_rates(b)
+            tries += b
+            ok, _ = validate_rows(rows, self.salary, self.team_id, self.cfg.max_salary)
+            rows = rows[ok]
+            n_valid += len(rows)
+            for row in rows[first_unique_rows(rows)]:
+                seen.setdefault(row.tobytes(), row)
+                if len(seen) >= bank_size:
+                    break
+        self.stats = dict(model='A', tries=tries, rejects=tries - n_valid, valid=n_valid,
+                          duplicates=n_valid - len(seen), bank=len(seen), hit_try_cap=len(seen) < bank_size)
+        idx = np.array(list(seen.values()), dtype=np.uint16).reshape(-1, 6)
+        return LineupMatrix.from_indices(idx, self.df)
 
-    def sample_field_entries(self, bank: pd.DataFrame, n_entries: int):
-        # Sample with weights influenced by total ownership of the 6 players
+    def _bank_optimizer_like(self, n_entrants: int) -> LineupMatrix:
+        # Model "B": each entrant picks the best legal lineup for projections + N(0, field_noise_sd)
+        # noise. Distinct picks form the bank; `count` is how many entrants landed on each.
+        max_salary = self.cfg.max_salary
+        min_salary = max_salary - self.cfg.leave_salary_max
+        proj = np.nan_to_num(self.df['ProjPts'].to_numpy(dtype=float))
+        pool_idx, _ = top_lineups(iter_lineups(self.salary, self.team_id, max_salary, min_salary), proj, _B_POOL_MAX)
+        pool = LineupMatrix.from_indices(pool_idx, self.df)
+        if len(pool) == 0:
+            return pool
+        # dense (n_players, n_pool) slot weights: one small GEMM + row argmax per entrant chunk
+        WT = np.ascontiguousarray(pool.weights().toarray().T, dtype=np.float32)
+        picks = np.empty(n_entrants, dtype=np.intp)
+        for start in range(0, n_entrants, _ENTRANT_CHUNK):
+            m = min(_ENTRANT_CHUNK, n_entrants - start)
+            V = proj[None, :] + self.rng.normal(0.0, self.cfg.field_noise_sd, size=(m, len(proj)))
+            picks[start:start+m] = (V.astype(np.float32) @ WT).argmax(axis=1)
+        uniq, count = np.unique(picks, return_counts=True)
+        self.stats = dict(model='B', entrants=n_entrants, pool=len(pool), bank=len(uniq))
+        bank = pool.take(uniq)
+        bank.count = count
+        return bank
+
+    def _bank_weights(self, bank: LineupMatrix) -> np.ndarray:
+        # probability of each bank row per field entry: total ownership of the 6 players
+        # (model "B" banks carry optimizer hit counts, which are used instead)
+        w = bank.own if bank.count is None else bank.count.astype(float)
+        return w / w.sum()
+
+    def sample_field_entries(self, bank: LineupMatrix, n_entries: int) -> LineupMatrix:
+        # Sample with replacement, returned collapsed: unique lineups with integer `count`
         if len(bank)==0:
-            return pd.DataFrame(columns=['CPT','FLEX','Salary'])
-        weights = []
-        own_map = self.df.set_index('Player')['Total Rate'].fillna(0.0).to_dict()
-        for _,r in bank.iterrows():
-            pts = sum(own_map.get(p,0.0) for p in ([r['CPT']] + list(r['FLEX'])))
-            weights.append(pts)
-        w = np.array(weights); w = w / (w.sum()+1e-9)
+            return bank
+        w = self._bank_weights(bank)
         idx = np.random.default_rng(self.cfg.rng_seed+1).choice(len(bank), size=n_entries, replace=True, p=w)
-        return bank.iloc[idx].reset_index(drop=True)
+        counts = np.bincount(idx, minlength=len(bank))
+        hit = np.nonzero(counts)[0]
+        self.stats.update(field_entries=n_entries, field_unique=len(hit))
+        field = bank.take(hit)
+        field.count = counts[hit]
+        return field
+
+    def expected_duplicates(self, lineups: LineupMatrix, bank: LineupMatrix, n_entries: int) -> np.ndarray:
+        # expected field copies of each lineup under the same model sample_field_entries draws from
+        # (lineups outside the bank can't be drawn, so they get 0)
+        if len(bank) == 0:
+            return np.zeros(len(lineups))
+        w = {row.tobytes(): p for row, p in zip(bank.idx, self._bank_weights(bank))}
+        return n_entries * np.array([w.get(row.tobytes(), 0.0) for row in lineups.idx])
@@ -0,0 +1,148 @@
+import time
+
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+from .lineup import LineupMatrix
+from .sampling import CopulaSampler, normal_source
+from .ev import RunningEV, _payouts
+
+class SharedArrays:
+    """Shared-memory copies of numpy arrays; workers attach by name instead of unpickling data."""
+    def __init__(self, arrays: dict):
+        self._shm = []
+        self.specs = {}
+        for key, arr in arrays.items():
+            arr = np.ascontiguousarray(arr)
+            shm = shared_memory.SharedMemory(create=True, size=max(arr.nbytes, 1))
+            np.ndarray(arr.shape, dtype=arr.dtype, buffer=shm.buf)[...] = arr
+            self._shm.append(shm)
+            self.specs[key] = (shm.name, arr.shape, arr.dtype.str)
+
+    def close(self):
+        for shm in self._shm:
+            shm.close()
+            shm.unlink()
+        self._shm = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def attach_arrays(specs: dict):
+    # -> ({key: ndarray view}, [SharedMemory handles to keep alive])
+    arrays, handles = {}, []
+    for key, (name, shape, dtype) in specs.items():
+        shm = shared_memory.SharedMemory(name=name)
+        handles.append(shm)
+        arrays[key] = np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+    return arrays, handles
+
+# per-process state set by the pool initializer
+_WORKER = {}
+
+def _init_worker(specs, names, cfg, prize, sampler=None):
+    # sampler: a non-copula sampler (stats mode) pickled to each worker; the copula's arrays are shared
+    arrays, handles = attach_arrays(specs)
+    _WORKER.clear()
+    _WORKER.update(
+        handles=handles,
+        cfg=cfg,
+        contest=dict(prize=prize, field_count=arrays.get('field_count'), dup_adjust=arrays.get('dup_adjust'),
+                     prize_cum=arrays.get('prize_cum')),
+        sampler=sampler or CopulaSampler.from_state(arrays['A'], arrays['q'], arrays['table'], arrays.get('resid')),
+        control_mean=arrays.get('control_mean'),
+        ours=LineupMatrix(arrays['our_idx'], arrays['our_salary'], arrays['our_own'], names),
+        field=LineupMatrix(arrays['field_idx'], arrays['field_salary'], arrays['field_own'], names),
+    )
+
+def _run_shard(task):
+    # One (round, shard) unit of work with its own spawned stream
+    rnd, shard, entropy, n_sims = task
+    cfg = _WORKER['cfg']
+    sampler, ours, field = _WORKER['sampler'], _WORKER['ours'], _WORKER['field']
+    rng = np.random.default_rng(np.random.SeedSequence(entropy, spawn_key=(shard, rnd)))
+    # each unit gets its own antithetic stream / Sobol scramble (randomized QMC across units)
+    draws = normal_source(cfg.sim_variance, sampler.n_normals, rng)
+    acc = RunningEV(len(ours), _WORKER['control_mean'])
+    block = max(1, int(cfg.sim_block_size))
+    done = 0
+    seconds = 0.0
+    while done < n_sims:
+        b = min(block, n_sims - done)
+        t = time.perf_counter()
+        pts = sampler.sample(b, draws)
+        seconds += time.perf_counter() - t
+        our_scores = ours.scores(pts)
+        acc.update(_payouts(our_scores, field.scores(pts), **_WORKER['contest']), our_scores)
+        done += b
+    return rnd, shard, acc, seconds
+
+def _round_tasks(rnd, n_round, n_shards, entropy):
+    # split a round's sims across shards deterministically
+    tasks = []
+    for s in range(n_shards):
+        share = n_round*(s+1)//n_shards - n_round*s//n_shards
+        if share > 0:
+            tasks.append((rnd, s, entropy, share))
+    return tasks
+
+def sharded_expected_value(sim, ours: LineupMatrix, field: LineupMatrix, contest: dict) -> RunningEV:
+    """EV accumulators for `ours` vs `field`, with sims sharded across a process pool.
+
+    Each (round, shard) draws from SeedSequence(rng_seed+7, spawn_key=(shard, round)) and
+    accumulators merge in (round, shard) order, so results are bit-identical for a given
+    seed and shard count. A round gives every shard sim_block_size sims; rounds only act as
+    barriers when early stopping is on (stream with ev_se_target, as in the serial path).
+    """
+    cfg = sim.cfg
+    n_workers = max(1, int(cfg.n_workers))
+    n_shards = int(cfg.n_shards) or n_workers
+    per_round = n_shards * max(1, int(cfg.sim_block_size))
+    entropy = cfg.rng_seed + 7
+
+    rounds = []
+    done = 0
+    while done < cfg.n_sims:
+        n_round = min(per_round, cfg.n_sims - done)
+        rounds.append(_round_tasks(len(rounds), n_round, n_shards, entropy))
+        done += n_round
+
+    acc = sim._accumulator(ours)
+    copula = isinstance(sim.sampler, CopulaSampler)
+    arrays = dict(our_idx=ours.idx, our_salary=ours.salary, our_own=ours.own,
+                  field_idx=field.idx, field_salary=field.salary, field_own=field.own)
+    for key in ('field_count', 'dup_adjust', 'prize_cum'):
+        if contest.get(key) is not None:
+            arrays[key] = contest[key]
+    if acc.control_mean is not None:
+        arrays['control_mean'] = acc.control_mean
+    if copula:
+        arrays.update(A=sim.sampler.A, q=sim.sampler.q, table=sim.sampler.table)
+        if sim.sampler.resid is not None:
+            arrays['resid'] = sim.sampler.resid
+    with SharedArrays(arrays) as shared, ProcessPoolExecutor(
+            max_workers=n_workers, initializer=_init_worker,
+            initargs=(shared.specs, ours.names, cfg, contest['prize'], None if copula else sim.sampler)) as pool:
+        seconds = 0.0
+        if not cfg.stream or cfg.ev_se_target <= 0:
+            # no barrier needed: submit everything, merge in order
+            for _, _, part, secs in pool.map(_run_shard, [t for tasks in rounds for t in tasks]):
+                acc.merge(part)
+                seconds += secs
+        else:
+            prev_top = None
+            for tasks in rounds:
+                for _, _, part, secs in pool.map(_run_shard, tasks):
+                    acc.merge(part)
+                    seconds += secs
+                stop, prev_top = sim._stop_early(acc, prev_top)
+                if stop:
+                    break
+    # points drawn in the workers (seconds summed over workers)
+    sim.stats['points_drawn'] += acc.n
+    sim.stats['points_seconds'] += seconds
+    return acc
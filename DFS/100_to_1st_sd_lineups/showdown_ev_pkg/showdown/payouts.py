@@ -0,0 +1,102 @@
+import numpy as np
+
+_TOL = 1e-9          # same tie tolerance as the first-place resolver
+_RANK_ROWS = 256     # sims per searchsorted pass (keeps row offsets small relative to float64 precision)
+
+def prize_curve(payouts) -> np.ndarray:
+    """((first_rank, last_rank, prize_each), ...) -> C, C[k] = total paid to ranks 1..k (C[0] = 0)."""
+    last = 0
+    for first, stop, prize in payouts:
+        if first < 1 or stop < first:
+            raise ValueError(f"Bad payout range {first}-{stop}")
+        last = max(last, int(stop))
+    by_rank = np.zeros(last)
+    paid = np.zeros(last, dtype=bool)
+    for first, stop, prize in payouts:
+        if paid[first-1:stop].any():
+            raise ValueError(f"Overlapping payout range {first}-{stop}")
+        by_rank[first-1:stop] = prize
+        paid[first-1:stop] = True
+    return np.concatenate([[0.0], np.cumsum(by_rank)])
+
+def contest_prizes(cfg):
+    # -> (first-place prize, cumulative curve or None); a table paying only rank 1 is prize_first
+    if not cfg.payouts:
+        return cfg.prize_first, None
+    C = prize_curve(cfg.payouts)
+    if len(C) == 2:
+        return float(C[1]), None
+    return cfg.prize_first, C
+
+def _placements(ours: np.ndarray, fs: np.ndarray, count: np.ndarray, n_reach: float, floor: np.ndarray = None):
+    """(ri, ci, ahead, field_ties) for our scores with fewer than n_reach weighted field entries ahead."""
+    # count: (n_field,) or (n_field, k) entry weights, the first column decides the cutoff; floor: per-sim minimum score
+    m, n_field = fs.shape
+    order = np.argsort(fs, axis=1)
+    fs = np.take_along_axis(fs, order, axis=1)
+    # cw[r, j]: field weight among the j lowest scores of sim r
+    cw = np.zeros((m, n_field + 1) + count.shape[1:])
+    np.cumsum(count[order], axis=1, out=cw[:, 1:])
+    total = cw[:, -1]
+    mass = cw if count.ndim == 1 else cw[..., 0]
+
+    # in reach only if fewer than n_reach entries can beat us: compare with the highest
+    # field score that still has >= n_reach weight at or above it
+    cut = (mass <= (mass[:, -1] - n_reach)[:, None]).sum(axis=1) - 1
+    has_cut = (cut >= 0) & (cut < n_field)
+    thresh = np.full(m, -np.inf)
+    thresh[has_cut] = fs[has_cut, cut[has_cut]] - _TOL
+    if floor is not None:
+        thresh = np.maximum(thresh, floor)
+    ri, ci = np.nonzero(ours >= thresh[:, None])
+    if len(ri) == 0 or n_field == 0:
+        zero = np.zeros((len(ri),) + count.shape[1:])
+        return ri, ci, zero, zero.copy()
+
+    # one searchsorted over all rows: shift row r by r*span so rows stay ordered
+    lo = min(fs.min(), ours.min())
+    span = max(fs.max(), ours.max()) - lo + 1.0
+    off = np.arange(m) * span - lo
+    flat = (fs + off[:, None]).ravel()
+    q = ours[ri, ci] + off[ri]
+    base = ri * n_field
+    below = np.searchsorted(flat, q - _TOL, side='left') - base
+    upto = below.copy()
+    # field entries within tolerance of our score (rare outside duplicates)
+    nxt = np.minimum(below, n_field - 1) + base
+    tied = (below < n_field) & (flat[nxt] <= q + _TOL)
+    if tied.any():
+        upto[tied] = np.searchsorted(flat, q[tied] + _TOL, side='right') - base[tied]
+    return ri, ci, total[ri] - cw[ri, upto], cw[ri, upto] - cw[ri, below]
+
+def split_prizes(ahead: np.ndarray, ties: np.ndarray, prize_cum: np.ndarray) -> np.ndarray:
+    # a tie group of `ties` entries behind `ahead` better ones shares ranks ahead+1..ahead+ties
+    ranks = np.arange(len(prize_cum), dtype=float)
+    return (np.interp(ahead + ties, ranks, prize_cum) - np.interp(ahead, ranks, prize_cum)) / ties
+
+def ranked_payouts(our_scores: np.ndarray, field_scores: np.ndarray, prize_cum: np.ndarray,
+                   field_count: np.ndarray = None, dup_adjust: np.ndarray = None, joint: bool = True) -> np.ndarray:
+    """Per-sim payout of each of our lineups ranked among the field and (joint) our other lineups."""
+    n_sims, n_ours = our_scores.shape
+    out = np.zeros((n_sims, n_ours), dtype=float)
+    if n_ours == 0 or n_sims == 0:
+        return out
+    n_field = field_scores.shape[1]
+    count = np.ones(n_field) if field_count is None else np.asarray(field_count, dtype=float)
+    if joint:
+        count = np.concatenate([count, np.ones(n_ours)])
+    n_paid = len(prize_cum) - 1
+    for a in range(0, n_sims, _RANK_ROWS):
+        ours = np.asarray(our_scores[a:a+_RANK_ROWS], dtype=np.float64)
+        fs = np.asarray(field_scores[a:a+_RANK_ROWS], dtype=np.float64)
+        if joint:
+            fs = np.concatenate([fs, ours], axis=1)
+        ri, ci, ahead, ties = _placements(ours, fs, count, n_paid)
+        if len(ri) == 0:
+            continue
+        if not joint:
+            ties = ties + 1.0
+        if dup_adjust is not None:
+            ties = ties + dup_adjust[ci]
+        out[a + ri, ci] = split_prizes(ahead, np.maximum(ties, 1.0), prize_cum)
+    return out
@@ -1,5 +1,7 @@
 import numpy as np
 
+_trapezoid = getattr(np, 'trapezoid', None) or np.trapz   # np.trapz is gone in numpy 2.4
+
 class QuantileSampler:
     """Piecewise-linear inverse CDF built from provided percentiles p000..p100."""
     def __init__(self, percentiles: dict):
@@ -35,4 +37,4 @@ class QuantileSampler:
     def mean(self) -> float:
         # approximate mean via trapezoidal integration of inverse CDF
         # E[X] = \int_0^1 Q(u) du ~ average of knots
-        return float(np.trapz(self.x, self.q) / (self.q[-1]-self.q[0] if self.q[-1]>self.q[0] else 1.0))
+        return float(_trapezoid(self.x, self.q) / (self.q[-1]-self.q[0] if self.q[-1]>self.q[0] else 1.0))
@@ -1,40 +1,156 @@
+import heapq
+
 import numpy as np
 import pandas as pd
+from .lineup import LineupMatrix, popcount
+
+_TOL = 1e-9            # same tie tolerance as the EV engine
+_GAIN_BLOCK = 4096     # candidates per block when computing standalone gains
+_LAZY_BATCH = 64       # stale heap entries refreshed together in one vectorized pass
+
+class _PortfolioState:
+    # Per-sim state of the lineups chosen so far vs the field's top score
+    def __init__(self, sims):
+        n = len(sims.field_max)
+        self.sims = sims
+        self.best = np.full(n, -np.inf)   # our best score per sim
+        self.n_best = np.zeros(n)         # how many of ours tie that best
+        self.adj_best = np.zeros(n)       # their summed dup adjustments (extra field copies in the tie)
+        self.payout = np.zeros(n)         # current portfolio payout per sim
+
+    def _with(self, s, adj):
+        # state after adding a lineup with per-sim scores s: (n_sims,) or (n_sims, m) for m alternatives;
+        # adj: its dup adjustment (scalar, or (m,))
+        sims = self.sims
+        expand = (lambda a: a[:, None]) if s.ndim == 2 else (lambda a: a)
+        cur_best, cur_n, cur_adj = expand(self.best), expand(self.n_best), expand(self.adj_best)
+        fmax, fties = expand(sims.field_max), expand(sims.field_ties)
+        best = np.maximum(cur_best, s)
+        keep = cur_best >= best - _TOL
+        tied = s >= best - _TOL
+        n_best = np.where(keep, cur_n, 0.0) + tied
+        adj_best = np.where(keep, cur_adj, 0.0) + np.where(tied, adj, 0.0)
+        top = np.maximum(best, fmax)
+        field_tied = np.where(fmax >= top - _TOL, fties, 0.0)
+        win = best >= top - _TOL
+        group = np.maximum(n_best + field_tied + adj_best, np.maximum(n_best, 1.0))
+        payout = np.where(win, sims.prize * n_best / group, 0.0)
+        return best, n_best, adj_best, payout
+
+    def gains(self, S, adj) -> np.ndarray:
+        # marginal payout of each column of S: (n_sims, m) -> (m,)
+        return (self._with(S, adj)[3] - self.payout[:, None]).mean(axis=0)
+
+    def add(self, s, adj):
+        self.best, self.n_best, self.adj_best, self.payout = self._with(s, adj)
 
-def _overlap(a_row, b_row):
-    a = set([a_row['CPT'], a_row['FLEX1'], a_row['FLEX2'], a_row['FLEX3'], a_row['FLEX4'], a_row['FLEX5']])
-    b = set([b_row['CPT'], b_row['FLEX1'], b_row['FLEX2'], b_row['FLEX3'], b_row['FLEX4'], b_row['FLEX5']])
-    return len(a & b)
+def _standalone_gains(sims, adj) -> np.ndarray:
+    # f({L}) for every candidate: an upper bound on any later marginal gain
+    n_sims, n = sims.our_scores.shape
+    out = np.empty(n)
+    fmax = sims.field_max[:, None]
+    for a in range(0, n, _GAIN_BLOCK):
+        s = sims.our_scores[:, a:a+_GAIN_BLOCK]
+        field_tied = np.where(fmax >= np.maximum(s, fmax) - _TOL, sims.field_ties[:, None], 0.0)
+        group = np.maximum(1.0 + field_tied + adj[a:a+_GAIN_BLOCK], 1.0)
+        out[a:a+_GAIN_BLOCK] = np.where(s >= fmax - _TOL, sims.prize / group, 0.0).mean(axis=0)
+    return out
 
 class PortfolioOptimizer:
     def __init__(self, cfg):
         self.cfg = cfg
+        self.stats = {}   # counters from the last select() (see instrument.py)
 
-    def select(self, candidates: pd.DataFrame, ev: pd.Series):
+    def _feasible(self, i, masks, chosen_masks, cpts, cpts_used) -> bool:
+        # overlap via popcount of bitset ANDs against every chosen lineup at once
+        if len(chosen_masks):
+            shared = popcount(chosen_masks & masks[i]).sum(axis=1)
+            if shared.max() > self.cfg.max_overlap:
+                return False
+        # Optional CPT uniqueness encouragement (not strict)
+        return not (self.cfg.enforce_unique_cpt and cpts[i] in cpts_used)
+
+    def select(self, candidates: LineupMatrix, ev: pd.Series, dups=None, sims=None):
         # Greedy submodular-like selection:
         # maximize EV while enforcing max overlap and mild CPT diversity, salary leave <= cfg.leave_salary_max
-        df = candidates.copy()
-        df = df.join(ev)
-        df = df.sort_values('EV', ascending=False).reset_index(drop=True)
+        # dups: expected field copies per candidate. EV already splits 1st with them (our_dups in
+        #       expected_value), and joint selection splits each sim's 1st with them too, so
+        #       dup_penalty (default 0) is only an extra risk discount per copy
+        # sims: SimScores from EVSimulator.selection_sims -> lazy greedy on marginal portfolio EV,
+        #       so lineups that take 1st place from each other in the same sims are not double counted
+        ev_arr = np.asarray(ev, dtype=float)
+        discount = np.ones(len(ev_arr))
+        if dups is not None and self.cfg.dup_penalty > 0:
+            discount = (1.0 - self.cfg.dup_penalty) ** np.asarray(dups, dtype=float)
+        masks = candidates.member_masks()
+        cpts = candidates.idx[:, 0].astype(int)
+
+        if sims is None:
+            chosen_idx, gains = self._select_standalone(ev_arr * discount, masks, cpts)
+        else:
+            # expected copies replace the ones the selection field happens to hold (as dup_adjust in EV)
+            adj = np.zeros(len(ev_arr))
+            if dups is not None:
+                adj = np.asarray(dups, dtype=float) - (sims.realized if sims.realized is not None else 0.0)
+            chosen_idx, gains = self._select_joint(sims, discount, masks, cpts, adj)
 
-        chosen_idx = []
-        cpts_used = set()
+        # DataFrame only at the output boundary
+        out = candidates.take(chosen_idx).to_frame()
+        out['EV'] = ev_arr[chosen_idx]
+        if sims is not None:
+            out['MarginalEV'] = gains
+        if dups is not None:
+            out['Dups'] = np.asarray(dups, dtype=float)[chosen_idx]
+        return out
 
-        for i, row in df.iterrows():
+    def _select_standalone(self, rank, masks, cpts):
+        chosen_idx, cpts_used = [], set()
+        skipped = 0
+        for i in np.argsort(-rank, kind='stable'):
             if len(chosen_idx) >= self.cfg.our_entries:
                 break
-            # overlap constraint
-            ok = True
-            for j in chosen_idx:
-                if _overlap(row, df.loc[j]) > self.cfg.max_overlap:
-                    ok = False; break
-            if not ok: 
-                continue
-            # Optional CPT uniqueness encouragement (not strict)
-            if self.cfg.enforce_unique_cpt and row['CPT'] in cpts_used:
+            if not self._feasible(i, masks, masks[chosen_idx], cpts, cpts_used):
+                skipped += 1
                 continue
+            chosen_idx.append(int(i))
+            cpts_used.add(cpts[i])
+        self.stats = dict(mode='standalone', chosen=len(chosen_idx), infeasible_skipped=skipped)
+        return chosen_idx, rank[chosen_idx]
 
-            chosen_idx.append(i)
-            cpts_used.add(row['CPT'])
-
-        return df.loc[chosen_idx].reset_index(drop=True)
+    def _select_joint(self, sims, discount, masks, cpts, adj):
+        # Lazy greedy: stale gains are upper bounds (diminishing returns), so a popped candidate
+        # whose gain is fresh for the current portfolio is the best feasible pick
+        state = _PortfolioState(sims)
+        bounds = _standalone_gains(sims, adj) * discount
+        heap = [(-g, int(i), 0) for i, g in enumerate(bounds)]
+        heapq.heapify(heap)
+        chosen_idx, gains, cpts_used = [], [], set()
+        skipped = refreshed = 0
+        while heap and len(chosen_idx) < self.cfg.our_entries:
+            k = len(chosen_idx)
+            chosen_masks = masks[chosen_idx]
+            neg, i, stamp = heapq.heappop(heap)
+            # constraints only tighten as we add lineups: infeasible now means infeasible forever
+            if not self._feasible(i, masks, chosen_masks, cpts, cpts_used):
+                skipped += 1
+                continue
+            if stamp == k:
+                state.add(sims.our_scores[:, i], adj[i])
+                chosen_idx.append(i)
+                gains.append(-neg)
+                cpts_used.add(cpts[i])
+                continue
+            # stale: refresh it together with the next stale bounds in one vectorized pass
+            stale = [i]
+            while heap and len(stale) < _LAZY_BATCH and heap[0][2] != k:
+                _, j, _ = heapq.heappop(heap)
+                if self._feasible(j, masks, chosen_masks, cpts, cpts_used):
+                    stale.append(j)
+                else:
+                    skipped += 1
+            refreshed += len(stale)
+            g = state.gains(sims.our_scores[:, stale], adj[stale]) * discount[stale]
+            for j, gj in zip(stale, g):
+                heapq.heappush(heap, (-gj, j, k))
+        self.stats = dict(mode='joint', chosen=len(chosen_idx), infeasible_skipped=skipped, gains_refreshed=refreshed)
+        return chosen_idx, np.array(gains)
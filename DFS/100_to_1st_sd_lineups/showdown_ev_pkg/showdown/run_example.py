@@ -1,37 +1,94 @@
 
 # Example runner for Colab using direct GitHub RAW links.
+import os
+import warnings
+
 import pandas as pd
 from .config import SimConfig
-from .data_io import load_projections, load_leverage, load_percentiles, merge_inputs
-from .lineup import validate_player_pool
+from .data_io import (load_projections, load_leverage, load_percentiles, load_dk_salaries, ingest,
+                      save_snapshot, load_snapshot, snapshot_sources, source_stamps)
 from .generator import CandidateGenerator
 from .correlation import build_correlation
 from .opponent import OpponentField
 from .ev import EVSimulator
+from .payouts import contest_prizes
 from .portfolio import PortfolioOptimizer
+from .instrument import Instrument, DISABLED
+
+def _snapshot_fresh(snapshot, sources) -> bool:
+    # fresh only if built from these inputs at their current size / mtime (URLs: same address);
+    # with no inputs given the snapshot is taken as is
+    if not os.path.exists(snapshot):
+        return False
+    if not any(sources):
+        return True
+    return snapshot_sources(snapshot) == source_stamps(sources)
 
-def run(proj_csv, lev_csv, pct_csv):
-    cfg = SimConfig()
+def load_players(proj_csv, lev_csv, pct_csv, dk_csv=None, snapshot=None):
+    # snapshot: .npz/.parquet path; reused while its inputs are unchanged, else (re)written after ingesting
+    if snapshot and _snapshot_fresh(snapshot, (proj_csv, lev_csv, pct_csv, dk_csv)):
+        return load_snapshot(snapshot)
     proj = load_projections(proj_csv)    # accepts local path or https raw link
     lev  = load_leverage(lev_csv)
     pct  = load_percentiles(pct_csv)
-    players = merge_inputs(proj, lev, pct)
-    players = validate_player_pool(players)
+    dk   = load_dk_salaries(dk_csv) if dk_csv else None
+    players, report = ingest(proj, lev, pct, dk)
+    if snapshot:
+        save_snapshot(players, snapshot, report, (proj_csv, lev_csv, pct_csv, dk_csv))
+    return players, report
 
-    gen = CandidateGenerator(players, cfg)
-    cands = gen.generate()
+def run(proj_csv, lev_csv, pct_csv, cfg=None, dk_csv=None, snapshot=None, instrument=None):
+    # instrument: an Instrument (hooks, timers, counters); one is made when cfg.run_report is set
+    cfg = cfg or SimConfig()
+    if instrument is None:
+        instrument = Instrument(memory=cfg.report_memory) if cfg.run_report else DISABLED
+    inst = instrument
 
-    C = build_correlation(players, cfg)
-    opp = OpponentField(players, cfg)
-    bank = opp.bank_field_lineups()
-    field = opp.sample_field_entries(bank, n_entries=cfg.field_size - cfg.our_entries)
+    with inst.stage('load') as rec:
+        players, report = load_players(proj_csv, lev_csv, pct_csv, dk_csv, snapshot)
+        rec.update(players=len(players), ingest_ok=report.ok() if report is not None else None)
+    if report is not None and not report.ok():
+        warnings.warn(report.summary(), stacklevel=2)
 
+    with inst.stage('correlation') as rec:
+        C = build_correlation(players, cfg)
+    with inst.stage('field') as rec:
+        opp = OpponentField(players, cfg)
+        bank = opp.bank_field_lineups()
+        n_field = cfg.field_size - cfg.our_entries
+        field = opp.sample_field_entries(bank, n_entries=n_field)
+        rec.update(opp.stats)
     sim = EVSimulator(players, C, cfg)
-    ev = sim.expected_value(cands, field)
 
-    port = PortfolioOptimizer(cfg)
-    chosen = port.select(cands, ev)
+    # candidate_mode="search" scores lineups on the simulator's copula against this field
+    with inst.stage('candidates') as rec:
+        gen = CandidateGenerator(players, cfg)
+        cands = gen.search(sim, field) if cfg.candidate_mode == "search" else gen.generate()
+        rec.update(gen.stats)
+
+    with inst.stage('expected_value') as rec:
+        dups = opp.expected_duplicates(cands, bank, n_field)
+        ev = sim.expected_value(cands, field, our_dups=dups)
+        rec.update(sim.stats, sims_completed=sim.sims_completed,
+                   ev_se_mean=float(sim.ev_se.mean()), ev_se_max=float(sim.ev_se.max()))
+        if sim.vr_factor is not None:
+            rec.update(vr_factor_median=float(sim.vr_factor[ev > 0].median()) if (ev > 0).any() else 1.0)
+
+    # joint selection accounts for our lineups taking 1st place from each other (winner-take-all only)
+    with inst.stage('selection_sims') as rec:
+        drawn = sim.stats['points_drawn']
+        joint = cfg.select_sims > 0 and contest_prizes(cfg)[1] is None
+        sims = sim.selection_sims(cands, field) if joint else None
+        rec.update(points_drawn=sim.stats['points_drawn'] - drawn)
+    with inst.stage('portfolio') as rec:
+        port = PortfolioOptimizer(cfg)
+        chosen = port.select(cands, ev, dups=dups, sims=sims)
+        rec.update(port.stats)
 
+    if inst.enabled:
+        inst.info.update(config=vars(cfg), n_players=len(players))
+        if cfg.run_report:
+            inst.save(cfg.run_report)
     return chosen, ev.sort_values(ascending=False).head(20)
 
 if __name__ == "__main__":
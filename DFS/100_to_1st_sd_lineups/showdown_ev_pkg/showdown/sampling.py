@@ -0,0 +1,159 @@
+import warnings
+
+import numpy as np
+from scipy.special import ndtr, ndtri
+from scipy.stats import qmc
+
+from .percentiles import _trapezoid
+from .factor import FactorCorrelation
+
+_ROW_CHUNK = 1 << 16   # sims per chunk when mapping normals -> points (bounds temporaries)
+_U_EPS = 1e-12         # keep quasi-random uniforms off 0/1 before ndtri
+
+def correlation_factor(corr: np.ndarray) -> np.ndarray:
+    # A with A @ A.T ~= corr (eigen-decomposition tolerates semidefinite input)
+    vals, vecs = np.linalg.eigh(corr)
+    vals = np.clip(vals, 1e-8, None)
+    return vecs * np.sqrt(vals)
+
+def stack_quantiles(samplers):
+    """Put every player's inverse CDF on one shared q-grid -> (q (m,), table (n_players, m))."""
+    q = np.unique(np.concatenate([s.q for s in samplers])) if samplers else np.array([0.0, 1.0])
+    table = np.vstack([np.interp(q, s.q, s.x) for s in samplers]) if samplers else np.zeros((0, len(q)))
+    return q, table
+
+class AntitheticNormals:
+    """Standard normals in antithetic pairs: a block of n is [Z, -Z] (odd n: one unpaired row)."""
+    def __init__(self, rng):
+        self.rng = rng
+
+    def standard_normal(self, size, dtype=np.float64):
+        n, d = size
+        half = (n + 1) // 2
+        Z = self.rng.standard_normal(size=(half, d), dtype=dtype)
+        return np.concatenate([Z, -Z[:n - half]])
+
+class SobolNormals:
+    """Scrambled Sobol points pushed through the normal inverse CDF.
+
+    Successive calls continue one sequence, so blocks of any size add up to the same points as one
+    big draw; totals that are powers of two keep Sobol's balance (scipy warns otherwise, silenced).
+    """
+    def __init__(self, d: int, rng):
+        try:
+            self.engine = qmc.Sobol(d, scramble=True, rng=rng)
+        except TypeError:   # scipy < 1.15
+            self.engine = qmc.Sobol(d, scramble=True, seed=rng)
+
+    def standard_normal(self, size, dtype=np.float64):
+        n, _ = size
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', UserWarning)
+            u = self.engine.random(n)
+        return ndtri(np.clip(u, _U_EPS, 1.0 - _U_EPS)).astype(dtype, copy=False)
+
+    def tell(self) -> int:
+        return int(self.engine.num_generated)
+
+    def seek(self, n: int):
+        self.engine.reset()
+        self.engine.fast_forward(n)
+
+def normal_source(method: str, d: int, rng):
+    # cfg.sim_variance -> object with rng-like standard_normal(size, dtype)
+    if method == "mc":
+        return rng
+    if method == "antithetic":
+        return AntitheticNormals(rng)
+    if method == "sobol":
+        return SobolNormals(d, rng)
+    raise ValueError(f"Unknown sim_variance {method!r} (expected 'mc', 'antithetic' or 'sobol')")
+
+class CopulaSampler:
+    """Gaussian-copula points engine: factorization and stacked quantile tables are built once.
+
+    corr: dense correlation matrix (A = its n x n factor) or a FactorCorrelation (A = its n x k
+    loadings plus per-player residual sd), where a sim draws k + n normals at O(n * k) cost.
+    """
+    def __init__(self, corr, samplers, dtype=np.float64):
+        dtype = np.dtype(dtype)
+        q, table = stack_quantiles(samplers)
+        if isinstance(corr, FactorCorrelation):
+            A, resid = corr.loadings.astype(dtype), corr.resid.astype(dtype)
+        else:
+            A, resid = correlation_factor(corr).astype(dtype), None
+        self._set_state(A, q.astype(dtype), np.ascontiguousarray(table, dtype=dtype), resid)
+
+    @classmethod
+    def from_state(cls, A: np.ndarray, q: np.ndarray, table: np.ndarray, resid: np.ndarray = None) -> 'CopulaSampler':
+        # Rebuild around precomputed arrays (e.g. views into shared memory)
+        self = cls.__new__(cls)
+        self._set_state(A, q, table, resid)
+        return self
+
+    def _set_state(self, A, q, table, resid=None):
+        self.dtype = A.dtype
+        self.n_players = A.shape[0]
+        self.A, self.q, self.table, self.resid = A, q, table, resid
+        # normals per sim: one per player, plus one per shared factor in factor mode
+        self.n_normals = self.n_players + (A.shape[1] if resid is not None else 0)
+        # equally spaced grids (the usual p000..p100 step 5) skip searchsorted
+        d = np.diff(q)
+        self._uniform_grid = len(d) > 0 and np.allclose(d, d[0])
+
+    def key_arrays(self) -> tuple:
+        # what a draw depends on, for EVSimulator's cache keys
+        return (self.A, self.resid if self.resid is not None else 'dense', self.q, self.table)
+
+    def normals(self, n_sims: int, rng) -> np.ndarray:
+        # rng: a Generator or a normal_source() wrapper (antithetic / Sobol)
+        Z = rng.standard_normal(size=(n_sims, self.n_normals), dtype=self.dtype)
+        if self.resid is None:
+            return Z @ self.A.T
+        k = self.A.shape[1]
+        X = Z[:, :k] @ self.A.T
+        X += Z[:, k:] * self.resid
+        return X
+
+    def uniforms(self, n_sims: int, rng) -> np.ndarray:
+        X = self.normals(n_sims, rng)
+        return ndtr(X, out=X)
+
+    def means(self) -> np.ndarray:
+        # exact E[points] per player: the integral of each piecewise-linear inverse CDF over q
+        return _trapezoid(self.table, self.q, axis=1) if len(self.table) else np.zeros(0)
+
+    def set_player(self, j: int, sampler=None):
+        # swap one player's inverse CDF (re-gridded onto the shared q); None = ruled out (0 points)
+        self.table[j] = 0.0 if sampler is None else np.interp(self.q, sampler.q, sampler.x)
+
+    def points_from_uniforms(self, U: np.ndarray, out: np.ndarray = None, players=None) -> np.ndarray:
+        """Batched piecewise-linear inverse CDF over all players: (n_sims, n_players) -> points.
+
+        players: map only these columns (U is then (n_sims, len(players)))."""
+        n_sims = U.shape[0]
+        table = self.table if players is None else self.table[players]
+        n_cols = len(table)
+        if out is None:
+            out = np.empty((n_sims, n_cols), dtype=self.dtype)
+        q = self.q
+        m = len(q)
+        flat = table.ravel()
+        base = (np.arange(n_cols) * m)[None, :]
+        for start in range(0, n_sims, _ROW_CHUNK):
+            u = np.clip(U[start:start+_ROW_CHUNK], 0.0, 1.0)
+            if self._uniform_grid:
+                k = ((u - q[0]) * ((m - 1) / (q[-1] - q[0]))).astype(np.intp)
+            else:
+                k = np.searchsorted(q, u, side='right') - 1
+            np.clip(k, 0, m - 2, out=k)
+            q0 = q[k]
+            w = (u - q0) / (q[k+1] - q0)
+            np.clip(w, 0.0, 1.0, out=w)
+            k += base
+            x0 = flat[k]
+            out[start:start+len(u)] = x0 + w * (flat[k+1] - x0)
+        return out
+
+    def sample(self, n_sims: int, rng) -> np.ndarray:
+        return self.points_from_uniforms(self.uniforms(n_sims, rng))
@@ -0,0 +1,163 @@
+import numpy as np
+import pandas as pd
+
+from .lineup import LineupMatrix, validate_rows, first_unique_rows
+from .payouts import contest_prizes, ranked_payouts, _TOL
+from .sampling import normal_source
+from .ev import _field_top
+
+_EVAL_BATCH = 4096   # lineups scored per sparse product against the search block
+_MIN_WEIGHT = 1e-4   # floor on CPT / FLEX weights so no player is ruled out for good
+
+def canonical(idx: np.ndarray) -> np.ndarray:
+    # CPT first, FLEX sorted by pool index (the CandidateGenerator row layout)
+    idx = np.asarray(idx, dtype=np.uint16)
+    return np.column_stack([idx[:, :1], np.sort(idx[:, 1:], axis=1)])
+
+def swap_neighbours(idx: np.ndarray, n_players: int):
+    # every lineup one player away (any slot, any pool player; illegal rows included)
+    # -> (canonical rows, index of the row each came from)
+    slot = np.arange(6)[:, None]
+    cand = np.arange(n_players, dtype=np.uint16)[None, :]
+    nb = np.broadcast_to(idx[:, None, None, :], (len(idx), 6, n_players, 6)).copy()
+    nb[:, slot, cand, slot] = cand
+    return canonical(nb.reshape(-1, 6)), np.repeat(np.arange(len(idx)), 6 * n_players)
+
+class CandidateSearch:
+    """Simulation-guided candidate search: cross-entropy rounds, then swap-one local search.
+
+    Every lineup is scored standalone against the sampled field on one fixed block of
+    cfg.search_sims sims (common random numbers, so lineups are compared on the same outcomes).
+    Each round samples lineups from a CPT distribution and FLEX weights (Gumbel top-5, as in
+    CandidateGenerator), keeps the top cfg.search_elite fraction by EV and moves both toward the
+    elite's player frequencies. The best cfg.search_local lineups found are then hill-climbed by
+    replacing one player (CPT or FLEX) under the salary cap / floor and two-team rule. The sims
+    come from their own stream, so EVSimulator's EV and selection draws are unchanged.
+    """
+    def __init__(self, pool: pd.DataFrame, sim, field_lineups: LineupMatrix, cfg):
+        self.pool = pool.reset_index(drop=True)
+        self.cfg = cfg
+        self.rng = np.random.default_rng(cfg.rng_seed + 13)
+        self.salary = self.pool['Salary'].to_numpy(dtype=np.int64)
+        self.team_id = pd.factorize(self.pool['Team'])[0]
+        self.min_salary = cfg.max_salary - cfg.leave_salary_max
+
+        draws = normal_source(cfg.sim_variance, sim.sampler.n_normals, self.rng)
+        self.pts = sim.sampler.sample(cfg.search_sims, draws)
+        fs = field_lineups.scores(self.pts)
+        self.count = field_lineups.multiplicity().astype(float)
+        self.prize, self.prize_cum = contest_prizes(cfg)
+        if self.prize_cum is not None:
+            self.field_scores = fs
+        elif fs.shape[1]:
+            self.field_max, self.field_ties = _field_top(fs, self.count)
+        else:
+            self.field_max, self.field_ties = np.full(len(fs), -np.inf), np.zeros(len(fs))
+
+        self.archive = {}   # lineup row bytes -> EV on the search block
+        self.stats = dict(search_sims=cfg.search_sims, evaluations=0, rounds=0, sampled=0, valid=0,
+                          local_moves=0, best_ev=0.0)
+
+    def payouts(self, S: np.ndarray, dup_adjust: np.ndarray = None) -> np.ndarray:
+        # each lineup alone against the field: (n_sims, m) scores -> (n_sims, m) payouts
+        # (dup_adjust: change to each lineup's tie count, as in ev._payouts)
+        if self.prize_cum is not None:
+            return ranked_payouts(S, self.field_scores, self.prize_cum, self.count, dup_adjust, joint=False)
+        fmax = self.field_max[:, None]
+        ties = np.where(S > fmax + _TOL, 1.0, self.field_ties[:, None] + 1.0)
+        if dup_adjust is not None:
+            ties = np.maximum(ties + dup_adjust[None, :], 1.0)
+        return np.where(S >= fmax - _TOL, self.prize / ties, 0.0)
+
+    def evaluate(self, idx: np.ndarray) -> np.ndarray:
+        # search-block EV of each row, scoring only rows not seen before
+        keys = [row.tobytes() for row in idx]
+        new = [i for i, k in enumerate(keys) if k not in self.archive]
+        new = np.array(new, dtype=np.intp)[first_unique_rows(idx[new])] if new else np.empty(0, dtype=np.intp)
+        for a in range(0, len(new), _EVAL_BATCH):
+            rows = new[a:a+_EVAL_BATCH]
+            S = LineupMatrix.from_indices(idx[rows], self.pool).scores(self.pts)
+            for i, ev in zip(rows, self.payouts(S).mean(axis=0)):
+                self.archive[keys[i]] = ev
+        self.stats['evaluations'] += len(new)
+        return np.array([self.archive[k] for k in keys], dtype=float)
+
+    def _valid(self, idx: np.ndarray) -> np.ndarray:
+        ok, _ = validate_rows(idx, self.salary, self.team_id, self.cfg.max_salary, self.min_salary)
+        return ok
+
+    def _sample(self, cpt_p: np.ndarray, flex_logw: np.ndarray, n: int) -> np.ndarray:
+        # up to n distinct legal lineups: CPT ~ cpt_p, FLEX = Gumbel top-5 of the rest
+        n_players = len(cpt_p)
+        out, got = [], 0
+        for _ in range(20):
+            cpt = self.rng.choice(n_players, size=n, p=cpt_p)
+            keys = flex_logw[None, :] + self.rng.gumbel(size=(n, n_players))
+            keys[np.arange(n), cpt] = -np.inf
+            flex = np.argpartition(-keys, 4, axis=1)[:, :5]
+            idx = canonical(np.column_stack([cpt, flex]))
+            ok = self._valid(idx)
+            self.stats['sampled'] += n
+            self.stats['valid'] += int(ok.sum())
+            out.append(idx[ok])
+            got += int(ok.sum())
+            if got >= n:
+                break
+        idx = np.concatenate(out)
+        return idx[first_unique_rows(idx)][:n]
+
+    def cross_entropy(self):
+        cfg = self.cfg
+        n_players = len(self.pool)
+        p50 = np.clip(np.nan_to_num(self.pool.get('p050', self.pool['ProjPts']).to_numpy(dtype=float)), 0, None)
+        cpt_p = p50 / p50.sum()
+        flex_w = 5.0 * cpt_p
+        for _ in range(cfg.search_iters):
+            lineups = self._sample(cpt_p, np.log(np.maximum(flex_w, _MIN_WEIGHT)), cfg.search_batch)
+            if len(lineups) == 0:
+                break
+            ev = self.evaluate(lineups)
+            self.stats['rounds'] += 1
+            elite = lineups[np.argsort(-ev, kind='stable')[:max(1, int(round(cfg.search_elite * len(lineups))))]]
+            cpt_freq = np.bincount(elite[:, 0], minlength=n_players) / len(elite)
+            flex_freq = np.bincount(elite[:, 1:].ravel(), minlength=n_players) / len(elite)
+            cpt_p = np.maximum((1 - cfg.search_smooth) * cpt_p + cfg.search_smooth * cpt_freq, _MIN_WEIGHT)
+            cpt_p /= cpt_p.sum()
+            flex_w = (1 - cfg.search_smooth) * flex_w + cfg.search_smooth * flex_freq
+
+    def local_search(self, idx: np.ndarray) -> np.ndarray:
+        # best-improvement swap-one hill climb from each row; rows that stop improving stay put
+        idx = idx.copy()
+        active = np.ones(len(idx), dtype=bool)
+        for _ in range(self.cfg.search_local_rounds):
+            rows = np.nonzero(active)[0]
+            if len(rows) == 0:
+                break
+            cur = self.evaluate(idx[rows])
+            nb, origin = swap_neighbours(idx[rows], len(self.pool))
+            ok = self._valid(nb)
+            nb, origin = nb[ok], origin[ok]
+            ev = self.evaluate(nb)
+            best = np.full(len(rows), -np.inf)
+            np.maximum.at(best, origin, ev)
+            better = best > cur + 1e-12
+            # first neighbour reaching each row's best
+            hit = np.nonzero(better[origin] & (ev == best[origin]))[0]
+            first = hit[np.unique(origin[hit], return_index=True)[1]]
+            idx[rows[origin[first]]] = nb[first]
+            active[rows[~better]] = False
+            self.stats['local_moves'] += len(first)
+        return idx
+
+    def run(self) -> LineupMatrix:
+        cfg = self.cfg
+        self.cross_entropy()
+        if cfg.search_local > 0 and self.archive:
+            top = sorted(self.archive.items(), key=lambda kv: -kv[1])[:cfg.search_local]
+            self.local_search(np.array([np.frombuffer(k, dtype=np.uint16) for k, _ in top]))
+        # best lineups seen anywhere in the search, ranked by their search-block EV
+        ranked = sorted(self.archive.items(), key=lambda kv: -kv[1])[:cfg.candidate_pool_size]
+        idx = np.array([np.frombuffer(k, dtype=np.uint16) for k, _ in ranked], dtype=np.uint16).reshape(-1, 6)
+        self.stats['best_ev'] = float(ranked[0][1]) if ranked else 0.0
+        self.stats['candidates'] = len(idx)
+        return LineupMatrix.from_indices(idx, self.pool)
@@ -0,0 +1,408 @@
+import argparse
+import asyncio
+import itertools
+import json
+import time
+from dataclasses import replace
+
+import numpy as np
+
+from .config import SimConfig
+from .correlation import build_correlation
+from .ev import EVSimulator
+from .lineup import LineupMatrix, validate_rows
+from .opponent import OpponentField
+from .payouts import _RANK_ROWS, _TOL
+from .search import CandidateSearch, canonical, swap_neighbours
+
+# Warm lineup-query service: one slate's copula, field and sim block stay in memory, and queries
+# arriving within a few milliseconds of each other are scored together in one sparse product.
+# Protocol: newline-delimited JSON over TCP, one object per request, answered with the same "id".
+#   {"id": 1, "op": "ev",   "lineups": [["CPT name", "FLEX", ...], ...]}   -> ev, se, salary
+#   {"id": 2, "op": "rank", "lineups": [...], "top": [1, 10, 100]}        -> p_top, mean_rank
+#   {"id": 3, "op": "swap", "lineup": [...], "n": 5}                      -> ev, swaps (best one-player changes)
+#   {"id": 4, "op": "info"}
+# Lineups are 6 player names or pool indices (pid), CPT first. EV is standalone: the lineup alone
+# against the sampled field, with expected field duplicates, on cfg.n_sims fixed sims.
+
+DEFAULT_PORT = 8765
+
+class WarmSlate:
+    """Everything a query needs, built once per slate: copula, field, sim block and sorted field scores."""
+    def __init__(self, players, cfg: SimConfig = None):
+        cfg = cfg or SimConfig()
+        t = time.perf_counter()
+        self.players = players.reset_index(drop=True)
+        self.cfg = cfg
+        self.names = self.players['Player'].astype(str).to_numpy()
+        self.pid_by_name = {nm: i for i, nm in enumerate(self.names)}
+        self.pid_by_name.update({nm.lower(): i for i, nm in enumerate(self.names)})
+
+        sim = EVSimulator(self.players, build_correlation(self.players, cfg), cfg)
+        opp = OpponentField(self.players, cfg)
+        bank = opp.bank_field_lineups()
+        n_field = cfg.field_size - cfg.our_entries
+        self.field = opp.sample_field_entries(bank, n_entries=n_field)
+        # expected field copies (bank rows) and realized ones (the sampled field), for dup_adjust
+        self.expected = dict(zip((row.tobytes() for row in bank.idx), opp.expected_duplicates(bank, bank, n_field)))
+        field = self.field.collapse()
+        self.realized = dict(zip((row.tobytes() for row in field.idx), field.multiplicity().astype(float)))
+
+        self.engine = CandidateSearch(self.players, sim, self.field, replace(cfg, search_sims=cfg.n_sims))
+        self.pts = self.engine.pts
+        # field scores sorted per sim, with cumulative entry weights, for rank queries
+        # (flattened per _RANK_ROWS chunk with row offsets, so a query is one searchsorted per chunk)
+        fs = self.field.scores(self.pts).astype(np.float64)
+        order = np.argsort(fs, axis=1)
+        fs = np.take_along_axis(fs, order, axis=1)
+        self.field_cw = np.zeros((len(fs), fs.shape[1] + 1))
+        np.cumsum(self.field.multiplicity().astype(float)[order], axis=1, out=self.field_cw[:, 1:])
+        self.lo, self.hi = (fs.min() - 1.0, fs.max() + 1.0) if fs.size else (-1.0, 1.0)
+        self.span = self.hi - self.lo + 1.0
+        self.field_flat = [(fs[a:a+_RANK_ROWS] + self._offsets(a, len(fs))[:, None]).ravel()
+                           for a in range(0, len(fs), _RANK_ROWS)]
+        self.build_seconds = time.perf_counter() - t
+
+    def parse(self, lineup) -> np.ndarray:
+        # 6 names / pids (CPT first) or {"CPT": name, "FLEX": [...]} -> canonical index row
+        if isinstance(lineup, dict):
+            lineup = [lineup['CPT']] + list(lineup['FLEX'])
+        if len(lineup) != 6:
+            raise ValueError(f"lineup needs 6 players (CPT first), got {len(lineup)}")
+        row = []
+        for p in lineup:
+            if isinstance(p, (int, np.integer)) and 0 <= p < len(self.names):
+                row.append(int(p))
+            elif isinstance(p, str) and (p in self.pid_by_name or p.lower() in self.pid_by_name):
+                row.append(self.pid_by_name.get(p, self.pid_by_name.get(p.lower())))
+            else:
+                raise ValueError(f"unknown player {p!r}")
+        row = canonical(np.array([row]))
+        ok, _ = validate_rows(row, self.engine.salary, self.engine.team_id, self.cfg.max_salary)
+        if not ok[0]:
+            raise ValueError("illegal lineup (repeated player, one team only, or over the salary cap)")
+        return row[0]
+
+    def dup_adjust(self, idx: np.ndarray) -> np.ndarray:
+        keys = [row.tobytes() for row in idx]
+        return np.array([self.expected.get(k, 0.0) - self.realized.get(k, 0.0) for k in keys])
+
+    def scores(self, idx: np.ndarray) -> np.ndarray:
+        return LineupMatrix.from_indices(idx, self.players).scores(self.pts)
+
+    def ev(self, idx: np.ndarray, S: np.ndarray):
+        # -> (EV, standard error) per column of S
+        pay = self.engine.payouts(S, self.dup_adjust(idx))
+        return pay.mean(axis=0), pay.std(axis=0, ddof=1) / np.sqrt(max(len(pay), 1))
+
+    def _offsets(self, a: int, n: int) -> np.ndarray:
+        # shift row r of a chunk by r*span so the chunk's rows stay ordered when flattened
+        return np.arange(min(_RANK_ROWS, n - a)) * self.span - self.lo
+
+    def ranks(self, S: np.ndarray) -> np.ndarray:
+        # finishing position per sim: 1 + field entries strictly ahead (ties share the better rank)
+        out = np.empty(S.shape)
+        n_field = self.field_cw.shape[1] - 1
+        for k, a in enumerate(range(0, len(S), _RANK_ROWS)):
+            # scores outside the field's range rank the same as at its edge
+            ours = np.clip(np.asarray(S[a:a+_RANK_ROWS], dtype=np.float64), self.lo, self.hi)
+            m = len(ours)
+            q = (ours + _TOL + self._offsets(a, len(S))[:, None]).ravel()
+            pos = np.searchsorted(self.field_flat[k], q, side='right').reshape(ours.shape)
+            pos -= (np.arange(m) * n_field)[:, None]
+            cw = self.field_cw[a:a+m]
+            out[a:a+m] = 1.0 + cw[:, -1:] - np.take_along_axis(cw, pos, axis=1)
+        return out
+
+class LineupService:
+    """Micro-batching front end for a WarmSlate.
+
+    submit() queues a request; a single batcher task waits up to window_ms for more (at most
+    max_batch), then scores every lineup of the batch (ev / rank lineups and each swap query's
+    legal neighbours) in one pass off the event loop.
+    """
+    def __init__(self, slate: WarmSlate, max_batch: int = 256, window_ms: float = 2.0):
+        self.slate = slate
+        self.max_batch = max_batch
+        self.window = window_ms / 1000.0
+        self.queue = None
+        self._batcher = None
+        self.stats = dict(requests=0, batches=0, lineups_scored=0, busy_seconds=0.0)
+        self.connections = set()   # open handle() tasks
+
+    async def submit(self, request: dict) -> dict:
+        if self._batcher is None:
+            self.queue = asyncio.Queue()
+            self._batcher = asyncio.create_task(self._run())
+        fut = asyncio.get_running_loop().create_future()
+        await self.queue.put((request, fut))
+        return await fut
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.window
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            try:
+                replies = await loop.run_in_executor(None, self.answer, [req for req, _ in batch])
+            except Exception as e:   # keep serving: every request of a failed batch gets the error
+                replies = [dict(error=f"{type(e).__name__}: {e}") for _ in batch]
+            for (req, fut), reply in zip(batch, replies):
+                if not fut.done():
+                    fut.set_result({'id': req.get('id') if isinstance(req, dict) else None, **reply})
+
+    def answer(self, requests: list) -> list:
+        # synchronous core: parse everything, score all lineups at once, split the results
+        t = time.perf_counter()
+        slate = self.slate
+        plans, rows = [], []
+        for req in requests:
+            try:
+                plans.append(self._plan(req, rows))
+            except (KeyError, TypeError, ValueError) as e:
+                plans.append(dict(error=str(e)))
+        idx = np.array(rows, dtype=np.uint16).reshape(-1, 6)
+        S = slate.scores(idx) if len(idx) else np.zeros((len(slate.pts), 0))
+        ev, se = slate.ev(idx, S)
+        rank_cols = [c for p in plans if p.get('op') == 'rank' for c in range(*p['cols'])]
+        ranks = dict(zip(rank_cols, slate.ranks(S[:, rank_cols]).T)) if rank_cols else {}
+
+        replies = []
+        for p in plans:
+            op = p.get('op')
+            if op is None:
+                replies.append(p)
+                continue
+            a, b = p.get('cols', (0, 0))
+            if op == 'ev':
+                replies.append(dict(ev=ev[a:b].tolist(), se=se[a:b].tolist(),
+                                    salary=LineupMatrix.from_indices(idx[a:b], slate.players).salary.tolist()))
+            elif op == 'rank':
+                r = np.array([ranks[c] for c in range(a, b)])
+                replies.append(dict(p_top={str(k): (r <= k).mean(axis=1).tolist() for k in p['top']},
+                                    mean_rank=r.mean(axis=1).tolist()))
+            elif op == 'swap':
+                gain = ev[a+1:b] - ev[a]
+                best = np.argsort(-gain, kind='stable')[:p['n']]
+                replies.append(dict(ev=float(ev[a]), swaps=[
+                    dict(slot=p['moves'][i][0], out=p['moves'][i][1], **{'in': p['moves'][i][2]},
+                         ev=float(ev[a+1+i]), gain=float(gain[i])) for i in best]))
+            elif op == 'info':
+                replies.append(dict(players=len(slate.players), n_sims=len(slate.pts), field_entries=int(slate.field.n_entries()),
+                                    build_seconds=slate.build_seconds, **self.stats))
+        self.stats['requests'] += len(requests)
+        self.stats['batches'] += 1
+        self.stats['lineups_scored'] += len(idx)
+        self.stats['busy_seconds'] += time.perf_counter() - t
+        return replies
+
+    def _plan(self, req: dict, rows: list) -> dict:
+        # append the request's lineups to rows -> how to read its answer back
+        op = req['op']
+        start = len(rows)
+        if op in ('ev', 'rank'):
+            rows.extend(self.slate.parse(lu) for lu in req['lineups'])
+            plan = dict(op=op, cols=(start, len(rows)))
+            if op == 'rank':
+                plan['top'] = [int(k) for k in req.get('top', (1, 10, 100))]
+            return plan
+        if op == 'swap':
+            base = self.slate.parse(req['lineup'])
+            nb, _ = swap_neighbours(base[None, :], len(self.slate.names))
+            # a move's slot and incoming player follow from its position in the (6, n_players) grid
+            ok, _ = validate_rows(nb, self.slate.engine.salary, self.slate.engine.team_id, self.slate.cfg.max_salary)
+            n = len(self.slate.names)
+            k = np.arange(len(nb))
+            ok &= base[k // n] != k % n   # not the player it replaces
+            pos = np.nonzero(ok)[0]
+            moves = [('CPT' if k // n == 0 else 'FLEX', self.slate.names[base[k // n]], self.slate.names[k % n]) for k in pos]
+            rows.append(base)
+            rows.extend(nb[ok])
+            return dict(op=op, cols=(start, len(rows)), moves=moves, n=int(req.get('n', 5)))
+        if op == 'info':
+            return dict(op=op)
+        raise ValueError(f"unknown op {op!r}")
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        # one connection: requests may interleave, replies go out as they finish
+        lock = asyncio.Lock()
+        tasks = set()
+        conn = asyncio.current_task()
+        self.connections.add(conn)
+
+        async def reply(line):
+            try:
+                req = json.loads(line)
+            except json.JSONDecodeError as e:
+                out = dict(id=None, error=f"bad JSON: {e}")
+            else:
+                out = await self.submit(req) if isinstance(req, dict) else dict(id=None, error="request must be an object")
+            async with lock:
+                writer.write((json.dumps(out) + '\n').encode())
+                await writer.drain()
+
+        try:
+            while line := await reader.readline():
+                if line.strip():
+                    task = asyncio.create_task(reply(line))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks)
+        finally:
+            self.connections.discard(conn)
+            writer.close()
+
+async def serve(slate: WarmSlate, host: str = '127.0.0.1', port: int = DEFAULT_PORT, ready=None, **kw):
+    # run until cancelled; ready (asyncio.Event) is set once the port is listening
+    service = LineupService(slate, **kw)
+    server = await asyncio.start_server(service.handle, host, port)
+    async with server:
+        if ready is not None:
+            ready.set()
+        await server.serve_forever()
+
+class ServiceClient:
+    """Async client: replies are matched to requests by id, so queries can run concurrently."""
+    def __init__(self, reader, writer):
+        self.reader, self.writer = reader, writer
+        self.pending = {}
+        self.ids = itertools.count(1)
+        self._listener = asyncio.create_task(self._listen())
+
+    @classmethod
+    async def connect(cls, host: str = '127.0.0.1', port: int = DEFAULT_PORT) -> 'ServiceClient':
+        return cls(*await asyncio.open_connection(host, port))
+
+    async def _listen(self):
+        while line := await self.reader.readline():
+            reply = json.loads(line)
+            fut = self.pending.pop(reply.get('id'), None)
+            if fut is not None and not fut.done():
+                fut.set_result(reply)
+        for fut in self.pending.values():
+            fut.set_exception(ConnectionError("service closed the connection"))
+
+    async def query(self, op: str, **kw) -> dict:
+        rid = next(self.ids)
+        fut = asyncio.get_running_loop().create_future()
+        self.pending[rid] = fut
+        self.writer.write((json.dumps(dict(id=rid, op=op, **kw)) + '\n').encode())
+        await self.writer.drain()
+        return await fut
+
+    async def close(self):
+        self.writer.close()
+        await self.writer.wait_closed()
+        self._listener.cancel()
+
+async def demo(slate: WarmSlate, n_queries: int = 200, concurrency: int = 16, port: int = 0):
+    # in-process server + client on a free local port: latency of single-lineup EV queries, one
+    # at a time and then `concurrency` at a time, plus one rank and one swap query
+    service = LineupService(slate)
+    server = await asyncio.start_server(service.handle, '127.0.0.1', port)
+    port = server.sockets[0].getsockname()[1]
+    client = await ServiceClient.connect('127.0.0.1', port)
+    try:
+        lineups = slate.field.take(np.arange(min(n_queries, len(slate.field))))
+        names = [list(row) for row in slate.names[lineups.idx]]
+        await client.query('ev', lineups=names[:1])   # warm-up
+        lat = []
+
+        async def one(lu):
+            t = time.perf_counter()
+            await client.query('ev', lineups=[lu])
+            lat.append(time.perf_counter() - t)
+
+        for lu in names[:20]:
+            await one(lu)
+        single, lat = lat, []
+        t = time.perf_counter()
+        for a in range(0, len(names), concurrency):
+            await asyncio.gather(*(one(lu) for lu in names[a:a+concurrency]))
+        wall = time.perf_counter() - t
+        rank = await client.query('rank', lineups=names[:1], top=[1, 10])
+        t = time.perf_counter()
+        swap = await client.query('swap', lineup=names[0], n=3)
+        swap_ms = (time.perf_counter() - t) * 1000
+        info = await client.query('info')
+    finally:
+        await client.close()
+        await asyncio.gather(*service.connections, return_exceptions=True)
+        server.close()
+        await server.wait_closed()
+    lat = np.array(lat) * 1000
+    return dict(single_ms_p50=float(np.percentile(np.array(single) * 1000, 50)),
+                queries=len(lat), concurrency=concurrency, wall_seconds=wall,
+                latency_ms_p50=float(np.percentile(lat, 50)), latency_ms_p95=float(np.percentile(lat, 95)),
+                swap_ms=swap_ms, rank=rank, swap=swap, info=info)
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Warm-state lineup EV service (newline-delimited JSON over TCP)")
+    sub = ap.add_subparsers(dest='cmd', required=True)
+    for name in ('serve', 'demo'):
+        p = sub.add_parser(name)
+        p.add_argument('--proj')
+        p.add_argument('--lev')
+        p.add_argument('--pct')
+        p.add_argument('--dk')
+        p.add_argument('--snapshot')
+        p.add_argument('--synthetic', type=int, default=0, help='use a synthetic slate of this many players')
+        p.add_argument('--sims', type=int, default=SimConfig.n_sims)
+        p.add_argument('--port', type=int, default=DEFAULT_PORT if name == 'serve' else 0)
+        p.add_argument('--host', default='127.0.0.1')
+    q = sub.add_parser('query')
+    q.add_argument('request', help='JSON request, e.g. \'{"op": "info"}\'')
+    q.add_argument('--port', type=int, default=DEFAULT_PORT)
+    q.add_argument('--host', default='127.0.0.1')
+    args = ap.parse_args(argv)
+
+    if args.cmd == 'query':
+        async def once():
+            client = await ServiceClient.connect(args.host, args.port)
+            req = json.loads(args.request)
+            try:
+                return await client.query(req.pop('op'), **{k: v for k, v in req.items() if k != 'id'})
+            finally:
+                await client.close()
+        print(json.dumps(asyncio.run(once()), indent=1))
+        return
+
+    cfg = SimConfig(n_sims=args.sims)
+    if args.synthetic:
+        from .synthetic import synthetic_slate
+        players = synthetic_slate(args.synthetic)
+    elif args.proj or args.snapshot:
+        from .run_example import load_players
+        players, report = load_players(args.proj, args.lev, args.pct, args.dk, args.snapshot)
+        if report is not None and not report.ok():
+            print(report.summary())
+    else:
+        from .bench import bundled_players
+        players = bundled_players()
+        if players is None:
+            ap.error("no slate: pass --proj/--lev/--pct, --snapshot or --synthetic N")
+    slate = WarmSlate(players, cfg)
+    print(f"slate ready: {len(players)} players, {cfg.n_sims} sims, {slate.field.n_entries()} field entries "
+          f"in {slate.build_seconds:.2f}s")
+    if args.cmd == 'demo':
+        out = asyncio.run(demo(slate, port=args.port))
+        print(json.dumps({k: v for k, v in out.items() if k not in ('rank', 'swap')}, indent=1))
+        print(json.dumps(out['swap'], indent=1))
+        return
+    print(f"listening on {args.host}:{args.port}")
+    try:
+        asyncio.run(serve(slate, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+from dataclasses import dataclass
+
+import numpy as np
+from scipy.special import gammaln
+
+from .lineup import LineupMatrix
+from .payouts import _RANK_ROWS, _TOL, _placements, split_prizes
+
+_TAIL_FRAC = 16    # upper-tail fit uses the best k / _TAIL_FRAC sampled members of each sim
+_TAIL_MIN = 32     # ... at least this many (no tail below it)
+_TAIL_SLACK = 3.0  # low band: tail count and scale grow by 1 + _TAIL_SLACK * z / sqrt(m - 1) (shape error too)
+_REACH_SLACK = 2   # pilot: a lineup "reaches" a sim when it is within the top 2 * n_paid field entries
+_POISSON_MAX = 20.0   # unseen lineups ahead: Poisson mixture up to this mean, plug-in past it
+_POISSON_TERMS = 64   # terms of that mixture (covers the mean + 9 sd at the cap)
+
+@dataclass
+class FieldSketch:
+    """Weighted sample of a huge field (exact members plus a count / pi weighted sample)."""
+    lineups: LineupMatrix    # count = weight, so it drops in wherever a collapsed field does
+    weight: np.ndarray       # field entries each member stands for (count / pi)
+    sampled: np.ndarray      # bool: member came from the sampled stratum (else exact)
+    pi: np.ndarray           # inclusion probability of each member (1 for exact)
+    n_entries: float         # total field entries represented
+    n_draws: int             # members in the sampled stratum (0 = sketch is exact)
+
+    def __len__(self) -> int:
+        return len(self.lineups)
+
+def _pilot_hits(scores: np.ndarray, count: np.ndarray, n_reach: float) -> np.ndarray:
+    # pilot field scores (P, n) -> sims in which each lineup is among the top n_reach entries
+    r = int(min(scores.shape[1], np.ceil(n_reach)))   # every lineup holds >= 1 entry
+    top = np.argpartition(-scores, r - 1, axis=1)[:, :r]
+    s = np.take_along_axis(scores, top, axis=1)
+    order = np.argsort(-s, axis=1)
+    s = np.take_along_axis(s, order, axis=1)
+    cum = np.cumsum(count[np.take_along_axis(top, order, axis=1)], axis=1)
+    j = np.minimum((cum < n_reach).sum(axis=1), r - 1)
+    thresh = s[np.arange(len(s)), j]
+    return (scores >= (thresh - _TOL)[:, None]).sum(axis=0)
+
+def _inclusion(a: np.ndarray, size: int) -> np.ndarray:
+    # pi = min(1, lam * a) with sum(pi) = size: lineups past the cap are taken whole, the rest rescaled
+    exact = np.zeros(len(a), dtype=bool)
+    while True:
+        lam = (size - exact.sum()) / a[~exact].sum()
+        new = ~exact & (a * lam >= 1.0)
+        if not new.any():
+            break
+        exact |= new
+    return np.where(exact, 1.0, a * lam)
+
+def build_field_sketch(field: LineupMatrix, size: int, rng, pilot: np.ndarray = None, n_paid: int = 1) -> FieldSketch:
+    """At most `size` weighted field lineups; pilot points favour lineups that reach the money."""
+    count = field.multiplicity().astype(float)
+    n = len(field)
+    if n <= size:
+        lineups = field.take(np.arange(n))
+        lineups.count = count
+        return FieldSketch(lineups, count, np.zeros(n, dtype=bool), np.ones(n), count.sum(), 0)
+    n_reach = _REACH_SLACK * max(n_paid, 1)
+    a = count.copy()
+    if pilot is not None and len(pilot):
+        # reach rate in the pilot, plus a floor that gives the bulk as much total weight as the money
+        hits = _pilot_hits(field.scores(pilot).astype(np.float64), count, n_reach)
+        a = count * (hits / len(pilot) + n_reach / count.sum())
+    pi = _inclusion(a, size)
+    exact = np.nonzero(pi >= 1.0)[0]
+    rest = np.nonzero(pi < 1.0)[0]
+    k = size - len(exact)
+    # systematic sampling over a random order: exactly k distinct members, P(j kept) = pi[j]
+    order = rng.permutation(rest)
+    cum = np.cumsum(pi[order])
+    picks = np.searchsorted(cum, rng.uniform() * cum[-1] / k + np.arange(k) * (cum[-1] / k), side='right')
+    members = np.unique(order[np.minimum(picks, len(order) - 1)])
+    keep = np.concatenate([exact, members])
+    lineups = field.take(keep)
+    sampled = np.concatenate([np.zeros(len(exact), dtype=bool), np.ones(len(members), dtype=bool)])
+    weight = count[keep] / pi[keep]
+    lineups.count = weight
+    return FieldSketch(lineups, weight, sampled, pi[keep], count.sum(), len(members))
+
+def _tail_fit(scores: np.ndarray, lineups: np.ndarray, entries: np.ndarray, m: int):
+    # GPD (method of moments) over the top m sampled members -> (u, sigma, xi, unseen lineups, entries)
+    top = min(m, scores.shape[1])
+    part = np.argpartition(-scores, top - 1, axis=1)[:, :top]
+    order = np.take_along_axis(part, np.argsort(-np.take_along_axis(scores, part, axis=1), axis=1), axis=1)
+    s = np.take_along_axis(scores, order, axis=1)
+    above = np.arange(top)[None, :] < top - 1
+    w = lineups[order] * above
+    u = s[:, -1]
+    n = np.maximum(w.sum(axis=1), 1e-12)
+    y = s - u[:, None]
+    mean = np.maximum((w * y).sum(axis=1) / n, 1e-9)
+    var = np.maximum((w * y**2).sum(axis=1) / n - mean**2, 1e-18)
+    ratio = mean**2 / var
+    # shape is noisy from m points: keep it near exponential (xi = 0)
+    xi = np.clip(0.5 * (1.0 - ratio), -0.25, 0.25)
+    sigma = 0.5 * mean * (ratio + 1.0)
+    return u, sigma, xi, w.sum(axis=1), (entries[order] * above).sum(axis=1)
+
+def _tail_share(y: np.ndarray, sigma: np.ndarray, xi: np.ndarray) -> np.ndarray:
+    # GPD survival at excess y (0 past the upper endpoint when xi < 0)
+    t = 1.0 + xi * y / sigma
+    small = np.abs(xi) < 1e-6
+    out = np.where(small, np.exp(-y / sigma), np.power(np.maximum(t, 0.0), -1.0 / np.where(small, 1.0, xi)))
+    return np.where((t <= 0) & ~small, 0.0, out)
+
+def _mixed_payouts(known: np.ndarray, lam: np.ndarray, size: np.ndarray, ties: np.ndarray,
+                   prize_cum: np.ndarray) -> np.ndarray:
+    # payout with `known` entries ahead plus Poisson(lam) unseen lineups of `size` entries each
+    out = split_prizes(known + lam * size, ties, prize_cum)
+    mix = (lam > 0) & (lam <= _POISSON_MAX)
+    if mix.any():
+        n = np.arange(_POISSON_TERMS, dtype=float)
+        lm = lam[mix, None]
+        pmf = np.exp(n * np.log(lm) - lm - gammaln(n + 1.0))
+        ahead = known[mix, None] + n * size[mix, None]
+        pay = split_prizes(ahead, ties[mix, None], prize_cum)
+        out[mix] = (pmf * pay).sum(axis=1) / pmf.sum(axis=1)
+    return out
+
+def sketch_payouts(our_scores: np.ndarray, sketch_scores: np.ndarray, sketch: FieldSketch,
+                   prize_cum: np.ndarray, dup_adjust: np.ndarray = None, z: float = 2.0):
+    """Payouts against a FieldSketch and our other lineups -> (estimate, low, high), each (n_sims, n_ours)."""
+    n_sims, n_ours = our_scores.shape
+    est = np.zeros((n_sims, n_ours))
+    low, high = np.zeros_like(est), np.zeros_like(est)
+    if n_ours == 0 or n_sims == 0:
+        return est, low, high
+    n_paid = len(prize_cum) - 1
+    w, pi = sketch.weight, sketch.pi
+    c = w * pi                        # the member's own entries
+    unseen = 1.0 / pi - 1.0           # left-out lineups it stands for
+    # columns: HT entries (decides reach), known entries, unseen entries / lineups, lineup variance
+    # our lineups rank as exact members, as in ranked_payouts
+    count = np.column_stack([w, c, w - c, unseen, unseen / pi])
+    count = np.vstack([count, np.tile([1.0, 1.0, 0.0, 0.0, 0.0], (n_ours, 1))])
+    k = sketch.n_draws
+    sampled = np.nonzero(sketch.sampled)[0]
+    # too few sampled members to fit a tail: they stand for few lineups, HT alone is close
+    m = max(k // _TAIL_FRAC, _TAIL_MIN) if k >= _TAIL_MIN else 0
+    grow = 1.0 + _TAIL_SLACK * z / np.sqrt(m - 1) if m > 1 else 1.0
+    # lineups the optimistic count (z sd below the estimate) could still put in the money
+    reach = 2 * n_paid + z * z * (w[sampled].max() if k else 0.0)
+    for a in range(0, n_sims, _RANK_ROWS):
+        ours = np.asarray(our_scores[a:a+_RANK_ROWS], dtype=np.float64)
+        fs = np.concatenate([np.asarray(sketch_scores[a:a+_RANK_ROWS], dtype=np.float64), ours], axis=1)
+        ri, ci, ahead, field_ties = _placements(ours, fs, count, reach)
+        if len(ri) == 0:
+            continue
+        ties = field_ties[:, 1]
+        if dup_adjust is not None:
+            ties = ties + dup_adjust[ci]
+        ties = np.maximum(ties, 1.0)
+        known, lam = ahead[:, 1], ahead[:, 3]
+        size = ahead[:, 2] / np.maximum(lam, 1e-12)
+        sd = np.sqrt(np.maximum(ahead[:, 4] - lam, 0.0))
+        lam_hi, lam_lo = lam + z * sd, np.maximum(lam - z * sd, 0.0)
+        if m > 1:
+            fss = fs[:, sampled]
+            beyond = ours[ri, ci] > fss.max(axis=1)[ri] + _TOL
+            if beyond.any():
+                u, sigma, xi, n_l, n_e = _tail_fit(fss, unseen[sampled], (w - c)[sampled], m)
+                t_ri = ri[beyond]
+                y = ours[t_ri, ci[beyond]] - u[t_ri]
+                sg, xs, nl = sigma[t_ri], xi[t_ri], n_l[t_ri]
+                size[beyond] = n_e[t_ri] / np.maximum(nl, 1e-12)
+                lam[beyond] = nl * _tail_share(y, sg, xs)
+                lam_hi[beyond] = nl * grow * _tail_share(y, sg * grow, xs)
+                lam_lo[beyond] = 0.0
+        est[a + ri, ci] = _mixed_payouts(known, lam, size, ties, prize_cum)
+        low[a + ri, ci] = _mixed_payouts(known, lam_hi, size, ties, prize_cum)
+        high[a + ri, ci] = _mixed_payouts(known, lam_lo, size, ties, prize_cum)
+    return est, low, high
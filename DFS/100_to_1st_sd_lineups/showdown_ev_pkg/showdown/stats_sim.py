@@ -0,0 +1,256 @@
+import numpy as np
+import pandas as pd
+
+from .factor import opponents
+
+# Stat-line columns from load_projections (per-game means)
+STAT_COLS = ['rushAtts', 'rushYds', 'rushTDs', 'recvTgts', 'recvRec', 'recYds', 'recTDs',
+             'passAtts', 'passComp', 'passYds', 'passTDs', 'ints']
+
+# DraftKings NFL classic scoring (showdown FLEX is the same; CPT is 1.5x in LineupMatrix.scores)
+DK = dict(pass_yd=0.04, pass_td=4.0, int=-1.0, pass_300=3.0,
+          rush_yd=0.1, rush_td=6.0, rush_100=3.0,
+          rec=1.0, rec_yd=0.1, rec_td=6.0, rec_100=3.0, fum_lost=-1.0,
+          fg=3.5, xp=1.0,   # kicker: average FG value over the 3 / 4 / 5 point distance bands
+          sack=1.0, def_int=2.0, fum_rec=2.0, def_td=6.0)
+# not modeled: 2-pt conversions (+2 to the passer / rusher / receiver; ~0.1 per team-game)
+# DST points allowed: (max allowed, points), first match wins; 35+ -> -4
+DK_PA_TIERS = ((0, 10.0), (6, 7.0), (13, 4.0), (20, 1.0), (27, 0.0), (34, -1.0))
+
+# league-average rates where a slate has no projection to derive them from
+_SACKS, _FUMBLES, _DEF_TDS = 2.4, 0.7, 0.12   # per team-game
+_XP_RATE = 0.95
+_PILOT_SIMS = 1 << 13   # sims per DST-fit pilot draw
+_MIN_DST_SCALE = 0.1    # floor on the fitted DST sack / TD rates (as a fraction of league average)
+
+def _lognormal(rng, sd, size):
+    # mean-one lognormal multiplier
+    return rng.lognormal(-0.5 * sd * sd, sd, size=size)
+
+_CHUNK = 500   # sims per counter-keyed generator (StatStream)
+
+class StatStream:
+    """Counter-keyed draws for StatSampler: any block sizes give the same sims."""
+    def __init__(self, rng):
+        self.key = int(rng.integers(1 << 63))
+        self.pos = 0
+
+    def chunk(self, c: int):
+        return np.random.default_rng([self.key, c])
+
+    def tell(self) -> int:
+        return self.pos
+
+    def seek(self, n: int):
+        self.pos = n
+
+class StatSampler:
+    """DraftKings points built from simulated stat lines (SimConfig.mode="stats")."""
+    def __init__(self, players_df: pd.DataFrame, cfg, dtype=np.float64):
+        missing = [c for c in STAT_COLS if c not in players_df]
+        if missing:
+            raise ValueError(f"mode='stats' needs the projection stat lines; missing {missing}")
+        df = players_df.reset_index(drop=True)
+        self.cfg = cfg
+        self.dtype = np.dtype(dtype)
+        self.n_players = self.n_normals = len(df)
+        self.resid = None
+        self._means = None
+
+        pos = df['Pos'].astype(str).str.upper().to_numpy()
+        team = df['Team'].astype(str).to_numpy()
+        stat = {c: np.nan_to_num(pd.to_numeric(df[c], errors='coerce').to_numpy(dtype=float)) for c in STAT_COLS}
+        teams = list(dict.fromkeys(team))
+        opp = opponents(df)
+        self.teams = teams
+        T = len(teams)
+        t_of = {t: i for i, t in enumerate(teams)}
+        self.opp = np.array([t_of.get(opp.get(t), -1) for t in teams])   # -1: opponent not on the slate
+
+        # (team, slot) layout: skill players (anyone with volume) by team; the last slot is 'other'
+        skill = (pos != 'K') & (pos != 'DST')
+        self.team_of = np.array([t_of[t] for t in team])
+        self.skill = np.nonzero(skill)[0]
+        slot = pd.Series(self.team_of[self.skill]).groupby(self.team_of[self.skill]).cumcount().to_numpy()
+        K = int(slot.max(initial=-1)) + 2
+        self.skill_cell = (self.team_of[self.skill], slot)
+
+        def grid(values, fill=0.0):
+            g = np.full((T, K), fill)
+            g[self.skill_cell] = values[self.skill]
+            return g
+
+        tgt, rec, ryd, rtd = grid(stat['recvTgts']), grid(stat['recvRec']), grid(stat['recYds']), grid(stat['recTDs'])
+        car, cyd, ctd = grid(stat['rushAtts']), grid(stat['rushYds']), grid(stat['rushTDs'])
+        qb = pos == 'QB'
+        pa0 = np.zeros(T)
+        ptd0 = np.zeros(T)
+        ints0 = np.zeros(T)
+        np.add.at(pa0, self.team_of[qb], stat['passAtts'][qb])
+        np.add.at(ptd0, self.team_of[qb], stat['passTDs'][qb])
+        np.add.at(ints0, self.team_of[qb], stat['ints'][qb])
+        pyd0 = np.zeros(T)
+        np.add.at(pyd0, self.team_of[qb], stat['passYds'][qb])
+
+        # 'other' slot: targets / yards / TDs the QB projection has beyond the listed receivers
+        listed = tgt[:, :-1].sum(axis=1)
+        pa0 = np.maximum(pa0, listed)
+        tgt[:, -1] = pa0 - listed
+        catch_team = np.where(listed > 0, rec.sum(axis=1) / np.maximum(listed, 1e-9), 0.65)
+        rec[:, -1] = tgt[:, -1] * catch_team
+        ypr_team = np.where(rec.sum(axis=1) > 0, ryd.sum(axis=1) / np.maximum(rec.sum(axis=1), 1e-9), 11.0)
+        ryd[:, -1] = np.maximum(pyd0 - ryd[:, :-1].sum(axis=1), rec[:, -1] * ypr_team)
+        rtd[:, -1] = np.maximum(ptd0 - rtd[:, :-1].sum(axis=1), 0.0)
+
+        self.pa0, self.ra0 = pa0, car.sum(axis=1)
+        self.tgt_share = tgt / np.maximum(tgt.sum(axis=1, keepdims=True), 1e-9)
+        self.car_share = car / np.maximum(car.sum(axis=1, keepdims=True), 1e-9)
+        self.catch = np.clip(rec / np.maximum(tgt, 1e-9), 0.0, 1.0)
+        self.ypr = ryd / np.maximum(rec, 1e-9)                  # yards per catch
+        self.ypc = cyd / np.maximum(car, 1e-9)                  # yards per carry
+        self.rec_td = rtd.sum(axis=1)                           # team TD totals (Poisson means)
+        self.rush_td = ctd.sum(axis=1)
+        self.rec_td_w = rtd / np.maximum(rec, 1e-9)             # TD weight per catch / carry
+        self.rush_td_w = ctd / np.maximum(car, 1e-9)
+        self.int_rate = ints0 / np.maximum(pa0, 1e-9)
+        self.fum_rate = _FUMBLES / np.maximum(rec.sum(axis=1) + self.ra0, 1.0)   # lost fumbles per touch
+
+        # kickers: FG mean from the kicker's projection net of expected XPs
+        proj = np.nan_to_num(pd.to_numeric(df.get('ProjPts', pd.Series(0.0, index=df.index)), errors='coerce').to_numpy(dtype=float))
+        self.k_idx = np.nonzero(pos == 'K')[0]
+        self.k_team = self.team_of[self.k_idx]
+        td0 = self.rec_td + self.rush_td
+        self.fg_rate = np.maximum(proj[self.k_idx] - DK['xp'] * _XP_RATE * td0[self.k_team], 0.3) / DK['fg']
+        self.fg_rate_team = np.zeros(T)
+        self.fg_rate_team[self.k_team] = self.fg_rate
+        self.fg_rate_team[self.fg_rate_team == 0] = 1.6
+        self.d_idx = np.nonzero(pos == 'DST')[0]
+        self.d_team = self.team_of[self.d_idx]
+        # the team's passing line goes to its QBs in proportion to projected attempts
+        self.qb_idx = np.nonzero(qb)[0]
+        self.qb_team = self.team_of[self.qb_idx]
+        self.qb_share = stat['passAtts'][qb] / np.maximum(pa0[self.qb_team], 1e-9)
+
+        # DSTs: sack / TD rates fitted to the projection from two fixed-seed pilots (rates off / league average)
+        self.dst_scale = np.ones(len(self.d_idx))
+        if len(self.d_idx) and 'ProjPts' in df:
+            base, full = (self._dst_pilot(scale) for scale in (0.0, 1.0))
+            rate = np.maximum(full - base, 1e-9)
+            self.dst_scale = np.maximum(proj[self.d_idx] - base, _MIN_DST_SCALE * rate) / rate
+
+    def _dst_pilot(self, scale: float) -> np.ndarray:
+        self.dst_scale = np.full(len(self.d_idx), scale)
+        return self._draw(_PILOT_SIMS, np.random.default_rng(self.cfg.rng_seed + 19))[:, self.d_idx].mean(axis=0)
+
+    def key_arrays(self) -> tuple:
+        # what a draw depends on, for EVSimulator's cache keys
+        cfg = self.cfg
+        knobs = np.array([cfg.stats_pace_cv, cfg.stats_team_cv, cfg.stats_script_sd, cfg.stats_eff_sd,
+                          cfg.stats_share_conc, cfg.stats_yds_shape])
+        return (self.tgt_share, self.car_share, self.catch, self.ypr, self.ypc, self.rec_td_w, self.rush_td_w,
+                self.pa0, self.ra0, self.rec_td, self.rush_td, self.int_rate, self.fum_rate, self.fg_rate_team,
+                self.dst_scale, self.opp, knobs)
+
+    def _shares(self, rng, share: np.ndarray, S: int) -> np.ndarray:
+        # Dirichlet draw around (T, K) mean shares -> (S, T, K)
+        w = rng.gamma(np.broadcast_to(self.cfg.stats_share_conc * share, (S,) + share.shape))
+        tot = w.sum(axis=2, keepdims=True)
+        return w / np.where(tot > 0, tot, 1.0)
+
+    @staticmethod
+    def _by_weight(weight: np.ndarray) -> np.ndarray:
+        # (S, T, K) weights -> per-sim shares (all zero where a team has no weight)
+        tot = weight.sum(axis=2, keepdims=True)
+        return weight / np.where(tot > 0, tot, 1.0)
+
+    def sample(self, n_sims: int, draws) -> np.ndarray:
+        # draws: a StatStream, or a plain Generator (parallel shards, search) wrapped in a fresh one
+        if isinstance(draws, np.random.Generator):
+            draws = StatStream(draws)
+        elif not isinstance(draws, StatStream):
+            raise ValueError("mode='stats' draws from the RNG directly: use sim_variance='mc'")
+        a, b = draws.pos, draws.pos + n_sims
+        draws.pos = b
+        if n_sims <= 0:
+            return np.zeros((0, self.n_players), dtype=self.dtype)
+        parts = [self._draw(_CHUNK, draws.chunk(c)) for c in range(a // _CHUNK, -(-b // _CHUNK))]
+        return np.concatenate(parts)[a % _CHUNK:a % _CHUNK + n_sims]
+
+    def _draw(self, n_sims: int, rng) -> np.ndarray:
+        cfg = self.cfg
+        S, T = n_sims, len(self.teams)
+        k = cfg.stats_yds_shape
+
+        # game pace (shared with the opponent), team volume, game script, efficiency
+        has_opp = self.opp >= 0
+        game = np.where(has_opp, np.minimum(np.arange(T), self.opp), np.arange(T))
+        pace = _lognormal(rng, cfg.stats_pace_cv, (S, T))[:, game]
+        vol = pace * _lognormal(rng, cfg.stats_team_cv, (S, T))
+        script = rng.normal(0.0, cfg.stats_script_sd, (S, T))
+        script[:, has_opp] = script[:, has_opp] - script[:, self.opp[has_opp]]
+        eff = _lognormal(rng, cfg.stats_eff_sd, (S, T))
+        plays0 = self.pa0 + self.ra0
+        pass_rate = np.clip(self.pa0 / np.maximum(plays0, 1e-9) + script, 0.05, 0.95)
+        # Poisson volume split by Dirichlet shares: targets sum to pass attempts, carries to rush attempts
+        tgt = rng.poisson((plays0 * vol * pass_rate)[:, :, None] * self._shares(rng, self.tgt_share, S))
+        car = rng.poisson((plays0 * vol * (1.0 - pass_rate))[:, :, None] * self._shares(rng, self.car_share, S))
+        pa = tgt.sum(axis=2)
+
+        # receiving: targets -> catches -> yards; rushing: carries -> yards
+        rec = rng.binomial(tgt, self.catch)
+        eff_y = np.sqrt(eff)[:, :, None]
+        ryd = rng.gamma(rec * k, 1.0) * (self.ypr / k) * eff_y
+        cyd = rng.gamma(car * k, 1.0) * (self.ypc / k) * eff_y
+
+        # TDs: team Poisson totals (scaled by volume and efficiency) thinned by each player's opportunity
+        rec_td = rng.poisson((self.rec_td * vol * eff)[:, :, None] * self._by_weight(rec * self.rec_td_w))
+        rush_td = rng.poisson((self.rush_td * vol * eff)[:, :, None] * self._by_weight(car * self.rush_td_w))
+        ints = rng.poisson(self.int_rate * pa / np.maximum(eff, 1e-9))
+        fum = rng.poisson(self.fum_rate[:, None] * (rec + car))
+
+        skill_pts = (DK['rec'] * rec + DK['rec_yd'] * ryd + DK['rec_td'] * rec_td + DK['rec_100'] * (ryd >= 100)
+                     + DK['rush_yd'] * cyd + DK['rush_td'] * rush_td + DK['rush_100'] * (cyd >= 100)
+                     + DK['fum_lost'] * fum)
+        out = np.zeros((S, self.n_players), dtype=self.dtype)
+        out[:, self.skill] = skill_pts[:, self.skill_cell[0], self.skill_cell[1]]
+
+        # QBs: the team's passing line
+        team_tds = rec_td.sum(axis=2) + rush_td.sum(axis=2)
+        if len(self.qb_idx):
+            pyd = ryd.sum(axis=2)
+            qb_pts = DK['pass_yd'] * pyd + DK['pass_td'] * rec_td.sum(axis=2) + DK['int'] * ints + DK['pass_300'] * (pyd >= 300)
+            out[:, self.qb_idx] += qb_pts[:, self.qb_team] * self.qb_share
+
+        # kickers: XPs on the team's TDs, FGs with pace
+        xp = rng.binomial(team_tds, _XP_RATE)
+        fg = rng.poisson(self.fg_rate_team * pace)
+        if len(self.k_idx):
+            out[:, self.k_idx] = DK['xp'] * xp[:, self.k_team] + DK['fg'] * fg[:, self.k_team]
+
+        # defenses: sacks / TDs at the fitted rates; INTs, fumbles and points allowed from the opponent
+        if len(self.d_idx):
+            o = self.opp[self.d_team]
+            known = o >= 0
+            allowed = np.full((S, len(self.d_idx)), 21.0)
+            allowed[:, known] = (6 * team_tds + xp + 3 * fg)[:, o[known]]
+            opp_ints = np.zeros((S, len(self.d_idx)))
+            opp_ints[:, known] = ints[:, o[known]]
+            fum_rec = rng.poisson(_FUMBLES, allowed.shape).astype(float)
+            fum_rec[:, known] = fum.sum(axis=2)[:, o[known]]
+            pressure = np.ones((S, len(self.d_idx)))
+            pressure[:, known] = pa[:, o[known]] / np.maximum(self.pa0[o[known]], 1.0)
+            sacks = rng.poisson(_SACKS * pressure * self.dst_scale)
+            pts = (DK['sack'] * sacks + DK['def_int'] * opp_ints + DK['fum_rec'] * fum_rec
+                   + DK['def_td'] * rng.poisson(_DEF_TDS * self.dst_scale, allowed.shape))
+            tiers = np.full(allowed.shape, -4.0)
+            for cap, value in reversed(DK_PA_TIERS):
+                tiers = np.where(allowed <= cap, value, tiers)
+            out[:, self.d_idx] = pts + tiers
+        return out
+
+    def means(self) -> np.ndarray:
+        # expected points per player: no closed form (bonuses, tiers), so one large fixed-seed draw
+        if self._means is None:
+            rng = np.random.default_rng(self.cfg.rng_seed + 17)
+            self._means = np.mean([self._draw(1 << 14, rng).mean(axis=0) for _ in range(4)], axis=0).astype(self.dtype)
+        return self._means
@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+from scipy.stats import gamma
+
+# Synthetic showdown slates shaped like the real inputs (after data_io.ingest): one row per
+# player with Salary, ProjPts, CPT/FLEX/Total rates and percentiles p000..p100.
+
+PCT_COLS = [f"p{q:03d}" for q in range(0, 101, 5)]
+
+# position -> (top projection, depth decay, coefficient of variation)
+_POS_MODEL = {
+    'QB':  (20.0, 0.10, 0.45),
+    'RB':  (15.0, 0.45, 0.60),
+    'WR':  (16.0, 0.60, 0.70),
+    'TE':  (9.0,  0.45, 0.80),
+    'K':   (8.0,  1.00, 0.55),
+    'DST': (6.5,  1.00, 0.90),
+}
+# share of a team's skill slots (after QB/K/DST) by position
+_SKILL_MIX = (('WR', 0.45), ('RB', 0.30), ('TE', 0.25))
+
+def _roster(n_per_team: int):
+    # positions for one team: QB, K, DST plus skill players in _SKILL_MIX proportions; QB2 past 12
+    fixed = ['QB', 'K', 'DST'] + (['QB'] if n_per_team > 12 else [])
+    n_skill = max(n_per_team - len(fixed), 3)
+    counts = {pos: max(1, int(round(n_skill * share))) for pos, share in _SKILL_MIX}
+    counts['WR'] += n_skill - sum(counts.values())
+    return fixed + [pos for pos, _ in _SKILL_MIX for _ in range(counts[pos])]
+
+def synthetic_slate(n_players: int = 40, rng_seed: int = 0, teams=('AWY', 'HOM'),
+                    max_salary: int = 50000) -> pd.DataFrame:
+    """Random slate of about n_players players: two teams (showdown) by default; more teams are
+    paired into games in order (teams[0] vs teams[1], ...), recorded in an 'Opp' column.
+
+    Projections fall off with depth chart rank; salaries track projection (DK-like $200 steps,
+    top player near a quarter of the cap); outcomes are gamma distributed around the projection
+    with position-specific spread (DST/TE boom-bust, QB steady), and CPT / FLEX rates follow
+    projection and value, summing to 1 and 5 like real ownership.
+    """
+    rng = np.random.default_rng(rng_seed)
+    rows = []
+    per_team = [n_players // len(teams) + (i < n_players % len(teams)) for i in range(len(teams))]
+    for team, n_team in zip(teams, per_team):
+        strength = rng.normal(1.0, 0.08)
+        depth = {}
+        for pos in _roster(n_team):
+            top, decay, cv = _POS_MODEL[pos]
+            rank = depth.get(pos, 0)
+            depth[pos] = rank + 1
+            proj = top * strength * decay ** rank * rng.lognormal(0.0, 0.12)
+            name = f"{team} {pos}{rank + 1}" if pos != 'DST' else f"{team} Defense"
+            rows.append((name, pos, team, max(proj, 0.3), cv))
+    df = pd.DataFrame(rows, columns=['Player', 'Pos', 'Team', 'ProjPts', 'cv'])
+    opp = {t: teams[i ^ 1] for i, t in enumerate(teams) if (i ^ 1) < len(teams)}
+    df.insert(3, 'Opp', df['Team'].map(opp))
+
+    proj = df['ProjPts'].to_numpy()
+    salary = 200 + proj / proj.max() * (0.24 * max_salary - 200) * rng.lognormal(0.0, 0.08, len(df))
+    df['Salary'] = (np.round(salary / 200) * 200).clip(200, 0.3 * max_salary).astype(np.int64)
+
+    # outcomes: gamma with the projection as mean (shape 1/cv^2), DST shifted to allow negatives
+    shape = 1.0 / df['cv'].to_numpy() ** 2
+    shift = np.where(df['Pos'] == 'DST', 3.0, 0.0)
+    qs = np.clip(np.arange(0, 101, 5) / 100.0, 0.002, 0.998)
+    pct = gamma.ppf(qs[None, :], shape[:, None], scale=((proj + shift) / shape)[:, None]) - shift[:, None]
+    df[PCT_COLS] = np.round(pct, 2)
+
+    # ownership: CPT concentrates on raw points, FLEX on points per dollar
+    value = proj / (df['Salary'].to_numpy() / 1000.0)
+    cpt_w = proj ** 3 * rng.lognormal(0.0, 0.3, len(df))
+    flex_w = proj * value ** 1.5 * rng.lognormal(0.0, 0.3, len(df))
+    df['CPT Rate'] = cpt_w / cpt_w.sum()
+    flex = 5.0 * flex_w / flex_w.sum()
+    for _ in range(10):
+        # cap at 95% and hand the excess to the rest
+        over = flex > 0.95
+        if not over.any():
+            break
+        flex[~over] += (flex[over] - 0.95).sum() * flex[~over] / flex[~over].sum()
+        flex[over] = 0.95
+    df['FLEX Rate'] = flex
+    df['Total Rate'] = df['CPT Rate'] + df['FLEX Rate']
+    df['Total Own'] = df['Total Rate']
+    df = df.drop(columns='cv')
+    df.insert(0, 'pid', np.arange(len(df), dtype=np.int64))
+    return df